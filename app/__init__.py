@@ -1,42 +1,59 @@
-from flask import Flask, render_template
-import os
-import glob
+from flask import Flask, Response, g, render_template, request
+from werkzeug.exceptions import RequestEntityTooLarge
+import importlib
+import time
+from app.features.shared.uploads import SpooledRequest, handle_request_too_large
+from app.config import config
+from app.features import FEATURES
+from app.features.shared.log_config import configure_logging
+from app.features.shared.metrics import REGISTRY
+from app.features.shared.utils import env_bool, env_int
 
 def create_app(config_name='default'):
     app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    configure_logging(app)
+
+    # Uploads are processed from memory, spilling to an anonymous temp file above the threshold
+    app.request_class = SpooledRequest
+    app.config['MAX_CONTENT_LENGTH'] = env_int('MAX_CONTENT_LENGTH', 32 * 1024 * 1024)
+    app.config['UPLOAD_SPOOL_MAX_MEMORY'] = env_int('UPLOAD_SPOOL_MAX_MEMORY', 8 * 1024 * 1024)
+    app.register_error_handler(RequestEntityTooLarge, handle_request_too_large)
+    # Limits of the /batch endpoints, on top of MAX_CONTENT_LENGTH
+    app.config['BATCH_MAX_FILES'] = env_int('BATCH_MAX_FILES', 100)
+    app.config['BATCH_MAX_EXTRACTED_BYTES'] = env_int('BATCH_MAX_EXTRACTED_BYTES', 256 * 1024 * 1024)
+    # Include a timing breakdown in upload responses without ?timings=1
+    app.config['UPLOAD_TIMINGS'] = env_bool('UPLOAD_TIMINGS', False)
     
-    # Configure upload folder
-    app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'uploads')
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    
-    # Import and register blueprints for features
-    from app.features.pdf_processor.views import pdf_processor_bp
-    from app.features.excel_processor.views import excel_processor_bp
-    
-    app.register_blueprint(pdf_processor_bp)
-    app.register_blueprint(excel_processor_bp)
+    # Register the blueprints listed in the feature manifest; views build their services on first use
+    for feature in FEATURES:
+        app.register_blueprint(getattr(importlib.import_module(feature.views), feature.blueprint))
+    features = [feature.name for feature in FEATURES]
+    available_features = {feature: feature + '.index' in app.view_functions for feature in features}
+
+    request_seconds = REGISTRY.histogram('http_request_duration_seconds', 'Duration of HTTP requests.',
+                                         label_names=('endpoint', 'method', 'status'))
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            request_seconds.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unknown',
+                                    method=request.method, status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Metrics of this worker process in the Prometheus text format."""
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
     
     # Register home page route
     @app.route('/')
     def home():
-        # Dynamically list all features
-        features_path = os.path.join(app.root_path, 'features')
-        features = []
-        
-        # Get all directories in the features folder that aren't __pycache__
-        for item in os.listdir(features_path):
-            full_path = os.path.join(features_path, item)
-            if os.path.isdir(full_path) and not item.startswith('__') and not item.startswith('.'):
-                # Check if this directory contains a views.py file (indicating it's a feature module)
-                if os.path.exists(os.path.join(full_path, 'views.py')):
-                    features.append(item)
-        
-        # Create a dictionary of available features with their route availability
-        available_features = {}
-        for feature in features:
-            route_name = feature + '.index'
-            available_features[feature] = route_name in app.view_functions
-        
         return render_template('home.html', features=features, available_features=available_features)
     
     return app
@@ -0,0 +1,45 @@
+import os
+
+from dotenv import load_dotenv
+
+from app.features.shared.utils import env_bool, env_float
+
+# Read before any setting, including those of services built on first use
+load_dotenv(override=True)
+
+
+class Config:
+    """Settings shared by every environment; LOG_* can be overridden through the environment."""
+
+    # 'text' lines or one 'json' object per record
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # Share of DEBUG and INFO records kept; warnings and errors are never dropped
+    LOG_SAMPLE_RATE = env_float('LOG_SAMPLE_RATE', 1.0)
+    # Hand records to a background thread, so request threads never wait on log writes
+    LOG_QUEUE = env_bool('LOG_QUEUE', True)
+    # Level of the chatty HTTP client loggers (httpx, httpcore, openai)
+    LOG_LIBRARY_LEVEL = os.getenv('LOG_LIBRARY_LEVEL', 'WARNING').upper()
+
+
+class DevelopmentConfig(Config):
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG').upper()
+
+
+class ProductionConfig(Config):
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+
+
+class TestingConfig(Config):
+    TESTING = True
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING').upper()
+    LOG_QUEUE = env_bool('LOG_QUEUE', False)
+
+
+config = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+    # FLASK_ENV is set by run.sh and render.yaml
+    'default': DevelopmentConfig if os.getenv('FLASK_ENV') == 'development' else ProductionConfig,
+}
@@ -1,7 +1,9 @@
+from pydantic import BaseModel, Field
 
 
-class MinimalDefect:
+class MinimalDefect(BaseModel):
     """Minimal Defect model for API response."""
 
     name: str
-    location: str
\ No newline at end of file
+    # Required: an answer without the defect's location is asked for again
+    location: str = Field(min_length=1)
@@ -0,0 +1,53 @@
+"""Manifest of the feature slices, registered by ``create_app`` in this order.
+
+Each feature lives in ``app/features/<name>/``; its ``views`` module defines
+the blueprint and is cheap to import, while its ``services`` module pulls in
+the heavy libraries (pandas, openpyxl, PyPDF2, the OpenAI SDK) and is only
+imported when the views first need a service. Add new features here.
+"""
+import importlib
+import logging
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Feature(NamedTuple):
+    name: str
+    views: str
+    blueprint: str
+    services: Optional[str] = None
+
+
+FEATURES = (
+    Feature('pdf_processor', 'app.features.pdf_processor.views', 'pdf_processor_bp',
+            'app.features.pdf_processor.services'),
+    Feature('excel_processor', 'app.features.excel_processor.views', 'excel_processor_bp',
+            'app.features.excel_processor.services'),
+    Feature('defect_store', 'app.features.defect_store.views', 'defect_store_bp',
+            'app.features.defect_store.services'),
+)
+
+
+def preload_features() -> None:
+    """Import the services modules of every feature, with the libraries they load.
+
+    Meant for a gunicorn master with ``preload_app``: forked workers start
+    with the modules loaded and share their memory copy-on-write. Importing
+    opens no files or connections, so it is safe before a fork.
+    """
+    for feature in FEATURES:
+        if feature.services:
+            importlib.import_module(feature.services)
+
+
+def warm_up_features() -> None:
+    """Run the ``warm_up()`` hook of every feature's views, building services before the first request."""
+    for feature in FEATURES:
+        hook = getattr(importlib.import_module(feature.views), 'warm_up', None)
+        if hook is None:
+            continue
+        try:
+            hook()
+        except Exception:
+            logger.exception("Warm-up of %s failed", feature.name)
@@ -0,0 +1,293 @@
+"""Persistent store of the defects of processed PDF reports, indexed for search.
+
+Each document is kept once per file (by SHA-256) with its report location,
+the building. Its defects are stored with their room, the defect location
+without the building prefix, and are indexed by an FTS5 table over name,
+room and building that folds case and diacritics, so "sciana" finds
+"Ściana". Exact building, room and document filters use plain indexes, and
+pages are cut with a keyset cursor on the defect id (newest first), which
+stays as fast on the last page as on the first.
+
+Documents are recorded by putting them on a queue; a background writer
+thread commits whatever has accumulated in one transaction, so recording
+costs the request only a queue put and bursts of documents share a commit.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.features.shared.cache import default_cache_dir, hash_key
+from app.features.shared.metrics import record_span, span
+from app.features.shared.utils import env_int
+
+QUERY_TOKEN_PATTERN = re.compile(r'\w+')
+ROOM_SEPARATORS = ' ,;:-–'
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS documents ('
+    ' id INTEGER PRIMARY KEY,'
+    ' file_hash TEXT NOT NULL UNIQUE,'
+    ' filename TEXT NOT NULL,'
+    ' building TEXT NOT NULL,'
+    ' defect_count INTEGER NOT NULL,'
+    ' defects_hash TEXT NOT NULL,'
+    ' processed_at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS documents_building ON documents (building COLLATE NOCASE, id)',
+    'CREATE TABLE IF NOT EXISTS defects ('
+    ' id INTEGER PRIMARY KEY,'
+    ' document_id INTEGER NOT NULL REFERENCES documents (id),'
+    ' building TEXT NOT NULL,'
+    ' room TEXT NOT NULL,'
+    ' location TEXT NOT NULL,'
+    ' name TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS defects_document ON defects (document_id, id)',
+    'CREATE INDEX IF NOT EXISTS defects_building ON defects (building COLLATE NOCASE, id)',
+    'CREATE INDEX IF NOT EXISTS defects_room ON defects (room COLLATE NOCASE, id)',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS defects_fts USING fts5('
+    " name, room, building, content='defects', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS defects_fts_insert AFTER INSERT ON defects BEGIN'
+    ' INSERT INTO defects_fts (rowid, name, room, building) VALUES (new.id, new.name, new.room, new.building);'
+    ' END',
+    'CREATE TRIGGER IF NOT EXISTS defects_fts_delete AFTER DELETE ON defects BEGIN'
+    " INSERT INTO defects_fts (defects_fts, rowid, name, room, building)"
+    " VALUES ('delete', old.id, old.name, old.room, old.building);"
+    ' END',
+)
+
+DEFECT_COLUMNS = ('d.id, d.name, d.location, d.room, d.building, documents.file_hash AS document,'
+                  ' documents.filename')
+
+
+def split_room(location: str, building: str) -> str:
+    """The part of a defect location after the report's building, or the whole location."""
+    location = location.strip()
+    if building and location.lower().startswith(building.lower()):
+        return location[len(building):].strip(ROOM_SEPARATORS) or location
+    return location
+
+
+def match_expression(query: str, **phrases: Optional[str]) -> Optional[str]:
+    """FTS5 query matching every word of ``query``; FTS5 operators are not exposed.
+
+    ``phrases`` also require a column to contain a phrase, e.g. ``building='Sąd
+    Rejonowy'``, which lets the index skip rows an exact filter would reject.
+    """
+    terms = [f'"{token}"' for token in QUERY_TOKEN_PATTERN.findall(query)]
+    if not terms:
+        return None
+    for column, phrase in phrases.items():
+        tokens = QUERY_TOKEN_PATTERN.findall(phrase or '')
+        if tokens:
+            terms.append(f'{column} : "{" ".join(tokens)}"')
+    return ' '.join(terms)
+
+
+class DefectStore:
+    """SQLite store of processed documents and their defects, written by a background thread."""
+
+    def __init__(self, path: str, batch_size: int = 100):
+        self.path = path
+        # Most documents committed in one transaction
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._pending = 0
+        self._pending_changed = threading.Condition()
+        self._queue: queue.Queue = queue.Queue()
+        self._pid = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection; connections are not shared across threads or a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _ensure_writer(self) -> None:
+        """Start the writer thread once per process (threads do not survive a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Documents queued by the parent are the parent's to write
+            self._queue = queue.Queue()
+            self._pending_changed = threading.Condition()
+            self._pending = 0
+            self._pid = os.getpid()
+            threading.Thread(target=self._write_batches, name='defect-store-writer', daemon=True).start()
+
+    def record_document(self, file_hash: str, filename: str, building: str, defects: Iterable[Dict[str, Any]]) -> None:
+        """Queue a processed document and its defects, replacing an earlier record of the same file."""
+        self._ensure_writer()
+        with self._pending_changed:
+            self._pending += 1
+        self._queue.put((file_hash, filename, building.strip(), list(defects), time.time()))
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued document is written; returns False on timeout."""
+        if self._pid != os.getpid():
+            return True
+        with self._pending_changed:
+            return self._pending_changed.wait_for(lambda: self._pending == 0, timeout)
+
+    def _write_batches(self) -> None:
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Documents queued while the previous batch was committed share the next transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            started = time.perf_counter()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                for document in batch:
+                    self._write_document(conn, *document)
+                conn.execute('COMMIT')
+            except Exception:
+                logger.exception("Could not write %d documents to the defect store", len(batch))
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+            record_span('defect_store_write', time.perf_counter() - started)
+            with self._pending_changed:
+                self._pending -= len(batch)
+                self._pending_changed.notify_all()
+
+    @staticmethod
+    def _write_document(conn: sqlite3.Connection, file_hash: str, filename: str, building: str,
+                        defects: List[Dict[str, Any]], processed_at: float) -> None:
+        defects_hash = hash_key(building, json.dumps(defects, ensure_ascii=False, sort_keys=True))
+        row = conn.execute('SELECT id, defects_hash FROM documents WHERE file_hash = ?', (file_hash,)).fetchone()
+        if row is not None and row['defects_hash'] == defects_hash:
+            # Already stored, e.g. recorded again from the result cache
+            return
+        if row is not None:
+            conn.execute('DELETE FROM defects WHERE document_id = ?', (row['id'],))
+            conn.execute('DELETE FROM documents WHERE id = ?', (row['id'],))
+        document_id = conn.execute(
+            'INSERT INTO documents (file_hash, filename, building, defect_count, defects_hash, processed_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (file_hash, filename, building, len(defects), defects_hash, processed_at),
+        ).lastrowid
+        conn.executemany(
+            'INSERT INTO defects (document_id, building, room, location, name) VALUES (?, ?, ?, ?, ?)',
+            [(document_id, building, split_room(defect.get('location', ''), building), defect.get('location', ''),
+              defect.get('name', '')) for defect in defects],
+        )
+
+    def search(self, query: str = None, building: str = None, room: str = None, document: str = None,
+               limit: int = 50, before: int = None) -> List[Dict[str, Any]]:
+        """Defects matching every word of ``query`` and the exact filters, newest first.
+
+        At most ``limit`` rows are returned, all with an id below ``before`` when given.
+        """
+        clauses, params = [], []
+        match = match_expression(query, building=building, room=room) if query else None
+        if match:
+            # Walk the full-text index newest first, so a page stops after ``limit`` matches
+            source = 'defects_fts JOIN defects d ON d.id = defects_fts.rowid'
+            clauses.append('defects_fts MATCH ?')
+            params.append(match)
+            id_column = 'defects_fts.rowid'
+        else:
+            source = 'defects d'
+            id_column = 'd.id'
+        if building:
+            clauses.append('d.building = ? COLLATE NOCASE')
+            params.append(building.strip())
+        if room:
+            clauses.append('d.room = ? COLLATE NOCASE')
+            params.append(room.strip())
+        if document:
+            clauses.append('d.document_id = (SELECT id FROM documents WHERE file_hash = ?)')
+            params.append(document)
+        if before is not None:
+            clauses.append(f'{id_column} < ?')
+            params.append(before)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        with span('defect_search'):
+            rows = self._connect().execute(
+                f'SELECT {DEFECT_COLUMNS} FROM {source} JOIN documents ON documents.id = d.document_id{where}'
+                f' ORDER BY {id_column} DESC LIMIT ?',
+                (*params, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_documents(self, building: str = None, limit: int = 50, before: int = None) -> List[Dict[str, Any]]:
+        """Up to ``limit`` recorded documents below id ``before``, newest first."""
+        clauses, params = [], []
+        if building:
+            clauses.append('building = ? COLLATE NOCASE')
+            params.append(building.strip())
+        if before is not None:
+            clauses.append('id < ?')
+            params.append(before)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connect().execute(
+            'SELECT id, file_hash AS document, filename, building, defect_count, processed_at'
+            f' FROM documents{where} ORDER BY id DESC LIMIT ?',
+            (*params, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_document(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """A recorded document with all of its defects, in report order."""
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT id, file_hash AS document, filename, building, defect_count, processed_at'
+            ' FROM documents WHERE file_hash = ?',
+            (file_hash,),
+        ).fetchone()
+        if row is None:
+            return None
+        defects = conn.execute(
+            'SELECT id, name, location, room FROM defects WHERE document_id = ? ORDER BY id', (row['id'],)
+        ).fetchall()
+        return {**dict(row), 'defects': [dict(defect) for defect in defects]}
+
+
+def create_defect_store() -> DefectStore:
+    """Create a store in ``DEFECT_STORE_DB``, by default next to the caches."""
+    return DefectStore(
+        os.getenv('DEFECT_STORE_DB') or os.path.join(default_cache_dir(), 'defects.sqlite3'),
+        batch_size=env_int('DEFECT_STORE_BATCH_SIZE', 100),
+    )
+
+
+_store: Optional[DefectStore] = None
+_store_lock = threading.Lock()
+
+
+def get_defect_store() -> DefectStore:
+    """The defect store of this process, shared by the PDF service and the search views."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_defect_store()
+            # Write documents still queued when the worker exits
+            atexit.register(_store.flush, 5.0)
+        return _store
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional
+
+from app.features.defect_store.models import DefectStore
+
+MAX_PAGE_SIZE = 100
+
+
+class DefectStoreService:
+    """Paginated search over the defects of processed reports."""
+
+    def __init__(self, store: DefectStore):
+        self.store = store
+
+    @staticmethod
+    def page(items, key: str, limit: int) -> Dict[str, Any]:
+        """Wrap a page of rows with the ``next`` cursor, ``None`` on the last page."""
+        return {key: items, 'next': items[-1]['id'] if len(items) == limit else None}
+
+    def search(self, query: str = None, building: str = None, room: str = None, document: str = None,
+               limit: int = 50, before: int = None) -> Dict[str, Any]:
+        """Return ``{'defects': [...], 'next': cursor}``; pass ``next`` as ``before`` for the following page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        defects = self.store.search(query=query, building=building, room=room, document=document,
+                                    limit=limit, before=before)
+        return self.page(defects, 'defects', limit)
+
+    def list_documents(self, building: str = None, limit: int = 50, before: int = None) -> Dict[str, Any]:
+        """Return ``{'documents': [...], 'next': cursor}``, newest first."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        return self.page(self.store.list_documents(building=building, limit=limit, before=before), 'documents', limit)
+
+    def get_document(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_document(file_hash.lower())
@@ -0,0 +1,59 @@
+document.addEventListener('DOMContentLoaded', function () {
+    const form = document.getElementById('search-form');
+    const resultSection = document.getElementById('result-section');
+    const errorSection = document.getElementById('error-section');
+    const defectList = document.getElementById('defect-list');
+    const moreButton = document.getElementById('more-button');
+    const errorMessage = document.querySelector('.error-message');
+    let params = null;
+    let next = null;
+
+    form.addEventListener('submit', function (e) {
+        e.preventDefault();
+        params = new URLSearchParams();
+        for (const [name, value] of new FormData(form)) {
+            if (value.trim()) {
+                params.set(name, value.trim());
+            }
+        }
+        defectList.innerHTML = '';
+        loadPage(null);
+    });
+
+    moreButton.addEventListener('click', function () {
+        loadPage(next);
+    });
+
+    async function loadPage(before) {
+        errorSection.style.display = 'none';
+        const query = new URLSearchParams(params);
+        if (before !== null) {
+            query.set('before', before);
+        }
+
+        try {
+            const response = await fetch('/defects/search?' + query.toString());
+            const data = await response.json();
+
+            if (!response.ok) {
+                showError(data.error || 'An error occurred while searching');
+                return;
+            }
+            for (const defect of data.defects) {
+                const item = document.createElement('li');
+                item.textContent = `${defect.name} (${defect.location}) - ${defect.filename}`;
+                defectList.appendChild(item);
+            }
+            next = data.next;
+            moreButton.style.display = next === null ? 'none' : 'inline-block';
+            resultSection.style.display = 'block';
+        } catch (error) {
+            showError('An error occurred while searching');
+        }
+    }
+
+    function showError(message) {
+        errorMessage.textContent = message;
+        errorSection.style.display = 'block';
+    }
+});
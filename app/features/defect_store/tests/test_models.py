@@ -0,0 +1,26 @@
+from app.features.defect_store.models import DefectStore, split_room
+
+BUILDING = 'Sąd Rejonowy w Zamościu'
+
+
+def defect(name, room):
+    return {'name': name, 'location': f'{BUILDING} {room}'}
+
+
+def test_split_room():
+    assert split_room(f'{BUILDING} - P.29A', BUILDING) == 'P.29A'
+    assert split_room('Kiosk I - sala rozpraw nr 30', BUILDING) == 'Kiosk I - sala rozpraw nr 30'
+
+
+def test_recording_a_document_again_replaces_its_defects(tmp_path):
+    store = DefectStore(str(tmp_path / 'defects.sqlite3'))
+    store.record_document('a' * 64, 'protokol.pdf', BUILDING, [defect('Okno do regulacji', 'P.29A')])
+    store.record_document('a' * 64, 'protokol.pdf', BUILDING, [defect('Okno do regulacji', 'P.29A')])
+    store.record_document('a' * 64, 'protokol-2.pdf', BUILDING, [defect('Drzwi do regulacji', 'P.30')])
+    assert store.flush(timeout=5)
+
+    assert store.search('okno') == []
+    document = store.get_document('a' * 64)
+    assert document['filename'] == 'protokol-2.pdf'
+    assert [row['name'] for row in document['defects']] == ['Drzwi do regulacji']
+    assert store.list_documents()[0]['defect_count'] == 1
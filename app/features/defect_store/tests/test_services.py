@@ -0,0 +1,38 @@
+from app.features.defect_store.models import DefectStore
+from app.features.defect_store.services import DefectStoreService
+
+BUILDING = 'Sąd Rejonowy w Zamościu'
+
+
+def defect(name, room):
+    return {'name': name, 'location': f'{BUILDING} {room}'}
+
+
+def test_search_folds_diacritics_filters_and_paginates(tmp_path):
+    store = DefectStore(str(tmp_path / 'defects.sqlite3'))
+    store.record_document('a' * 64, 'protokol.pdf', BUILDING, [
+        defect('Okno do regulacji', 'P.29A'),
+        defect('Zawilgocenie ściany przy oknie', 'P.29A'),
+        defect('Pęknięcie płytek', 'WC8'),
+    ])
+    store.record_document('b' * 64, 'przeglad.pdf', 'Sąd Okręgowy w Lublinie', [
+        {'name': 'Okno nie domyka się', 'location': 'Sąd Okręgowy w Lublinie, sala 12'},
+    ])
+    assert store.flush(timeout=5)
+    service = DefectStoreService(store)
+
+    found = service.search('sciany')
+    assert [row['name'] for row in found['defects']] == ['Zawilgocenie ściany przy oknie']
+    assert found['defects'][0]['room'] == 'P.29A' and found['next'] is None
+
+    assert len(service.search('okno')['defects']) == 2
+    assert [row['filename'] for row in service.search('okno', building=BUILDING)['defects']] == ['protokol.pdf']
+    assert [row['filename'] for row in service.search('okno', building='sąd okręgowy w lublinie')['defects']] \
+        == ['przeglad.pdf']
+    assert [row['name'] for row in service.search(room='wc8')['defects']] == ['Pęknięcie płytek']
+
+    first = service.search(document='a' * 64, limit=2)
+    second = service.search(document='a' * 64, limit=2, before=first['next'])
+    assert [row['name'] for row in first['defects'] + second['defects']] == [
+        'Pęknięcie płytek', 'Zawilgocenie ściany przy oknie', 'Okno do regulacji']
+    assert second['next'] is None
@@ -0,0 +1,62 @@
+from flask import Blueprint, render_template, request, jsonify
+from app.features.defect_store.models import get_defect_store
+from app.features.defect_store.services import MAX_PAGE_SIZE, DefectStoreService
+from app.features.shared.lazy import Lazy
+
+defect_store_bp = Blueprint('defect_store', __name__,
+                            url_prefix='/defects',
+                            template_folder='template',
+                            static_folder='template')  # Serve static files from template directory
+
+# The store opens its database on first use
+get_service = Lazy(lambda: DefectStoreService(get_defect_store())).get
+
+
+def page_arguments():
+    """``limit`` and ``before`` query arguments, or raise ValueError."""
+    limit = request.args.get('limit', 50, type=int)
+    before = request.args.get('before', type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit, before
+
+
+@defect_store_bp.route('/')
+def index():
+    return render_template('defect_store.html')
+
+
+@defect_store_bp.route('/search')
+def search():
+    """Defects of processed reports matching ``q`` and the ``building``, ``room`` and ``document`` filters."""
+    try:
+        limit, before = page_arguments()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(get_service().search(
+        query=request.args.get('q'),
+        building=request.args.get('building'),
+        room=request.args.get('room'),
+        document=request.args.get('document'),
+        limit=limit,
+        before=before,
+    ))
+
+
+@defect_store_bp.route('/documents')
+def list_documents():
+    """Processed reports, newest first, optionally of one ``building``."""
+    try:
+        limit, before = page_arguments()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(get_service().list_documents(building=request.args.get('building'), limit=limit, before=before))
+
+
+@defect_store_bp.route('/documents/<file_hash>')
+def get_document(file_hash):
+    """A processed report with all of its defects."""
+    document = get_service().get_document(file_hash)
+    if document is None:
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify(document)
@@ -0,0 +1,63 @@
+"""Fast reading of CSV and TSV uploads, optionally gzip-compressed."""
+import logging
+from typing import Any, BinaryIO, Dict, Optional
+
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+try:
+    import pyarrow  # noqa: F401 (optional, multi-threaded CSV parser)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DELIMITERS = {'.csv': ',', '.tsv': '\t'}
+
+
+def get_delimited_options(filename: str) -> Optional[Dict[str, Any]]:
+    """``read_csv`` options for a delimited file name, or None for other files."""
+    name = filename.lower()
+    compression = None
+    if name.endswith('.gz'):
+        name, compression = name[:-3], 'gzip'
+    for extension, sep in DELIMITERS.items():
+        if name.endswith(extension):
+            return {'sep': sep, 'compression': compression}
+    return None
+
+
+def infer_dtypes(f: BinaryIO, sample_rows: int, **options) -> Dict[str, str]:
+    """Parse the first rows and type their numeric columns as float64, so later NaNs still fit."""
+    sample = pd.read_csv(f, nrows=sample_rows, **options)
+    f.seek(0)
+    if sample.columns.duplicated().any():
+        return {}
+    return {
+        column: 'float64' for column, dtype in sample.dtypes.items()
+        if is_numeric_dtype(dtype) and not is_bool_dtype(dtype)
+    }
+
+
+def read_delimited(f: BinaryIO, options: Dict[str, Any], engine: str = 'auto',
+                   sample_rows: int = 1000) -> pd.DataFrame:
+    """Read a whole delimited file, with pyarrow when it is installed (``engine='auto'``).
+
+    pyarrow gets the numeric dtypes of a sample, so it does not infer them
+    again. A file that does not match its sample (e.g. text further down a
+    numeric column) is read again by the C engine.
+    """
+    if engine == 'auto':
+        engine = 'pyarrow' if PYARROW_AVAILABLE else 'c'
+    if engine != 'pyarrow':
+        # Explicit dtypes make the C parser slower than its own inference
+        return pd.read_csv(f, engine='c', **options)
+
+    dtypes = infer_dtypes(f, sample_rows, **options)
+    try:
+        return pd.read_csv(f, engine='pyarrow', dtype=dtypes or None, **options)
+    except ValueError as e:  # pyarrow's ArrowInvalid is a ValueError
+        logger.debug("Typed pyarrow read failed (%s), falling back to the C engine.", e)
+        f.seek(0)
+        return pd.read_csv(f, engine='c', **options)
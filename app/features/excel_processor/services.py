@@ -1,8 +1,156 @@
+import io
 import logging
+import os
+import posixpath
+import time
+import zipfile
 import pandas as pd
-from openpyxl import load_workbook
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from openpyxl import load_workbook
+from typing import Dict, Any, List, Optional, Tuple, Union
+from xml.etree import ElementTree
+from app.features.excel_processor.delimited import get_delimited_options, read_delimited
+from app.features.excel_processor.statistics import StreamingSummary, iter_csv_chunks, iter_sheet_chunks
+from app.features.shared.cache import MemoryLRUCache, SQLiteCache, default_cache_dir, hash_key
+from app.features.shared.metrics import REGISTRY, SIZE_BUCKETS, count_cache_lookup, record_span, span
+from app.features.shared.pools import get_process_pool
+from app.features.shared.uploads import Source, hash_source, open_source, read_source, source_name, source_size
+from app.features.shared.utils import env_bool, env_int
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODES = ('auto', 'exact', 'streaming')
+PACKAGE_RELATIONSHIPS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+DOCUMENT_RELATIONSHIPS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+SPREADSHEET_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+# Bump when the summary format changes so cached analyses are recomputed
+SUMMARY_VERSION = 1
+
+FILE_SIZE = REGISTRY.histogram('upload_size_bytes', 'Size of processed files.', SIZE_BUCKETS, label_names=('feature',))
+
+
+def summarize_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """Generate a summary from a DataFrame."""
+    sheet_summary = {
+        'rows': len(df),
+        'columns': len(df.columns),
+        'column_names': df.columns.tolist(),
+        'numeric_columns': df.select_dtypes(include=['number']).columns.tolist(),
+        'non_null_counts': df.count().to_dict(),
+    }
+    
+    # Add basic statistics for numeric columns
+    if len(sheet_summary['numeric_columns']) > 0:
+        stats = df[sheet_summary['numeric_columns']].describe().to_dict()
+        sheet_summary['statistics'] = stats
+    
+    return sheet_summary
+
+
+def get_active_sheet(workbook: pd.ExcelFile) -> str:
+    """Name of the sheet that was active when the workbook was saved."""
+    book = workbook.book
+    if hasattr(book, 'active'):  # openpyxl
+        return book.active.title
+    # xlrd keeps no active sheet for legacy .xls files
+    return workbook.sheet_names[0]
+
+
+def summarize_workbook(source: Union[Source, bytes], sheet_names: List[str] = None, streaming: bool = False,
+                       chunk_rows: int = 50000) -> Dict[str, Any]:
+    """Summarize the given sheets (default: all) of a workbook, opening it only once.
+
+    Also runs in pool workers, which get a path or the workbook bytes and
+    each open their own read-only copy.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with open_source(source) as f:
+        if streaming:
+            # openpyxl's read-only mode parses rows lazily, so sheets are never loaded whole
+            workbook = load_workbook(f, read_only=True, data_only=True)
+            try:
+                summary = {
+                    'sheet_names': workbook.sheetnames,
+                    'active_sheet': workbook.active.title,
+                    'sheet_summaries': {}
+                }
+                for sheet_name in sheet_names or workbook.sheetnames:
+                    logger.debug("Streaming sheet: %s", sheet_name)
+                    accumulator = StreamingSummary()
+                    with span('stream_sheet'):
+                        for chunk in iter_sheet_chunks(workbook[sheet_name], chunk_rows):
+                            accumulator.update(chunk)
+                        summary['sheet_summaries'][sheet_name] = accumulator.to_summary()
+            finally:
+                workbook.close()
+            return summary
+
+        # Open the workbook once: sheet names, shared strings and styles are
+        # loaded a single time and each sheet is then parsed exactly once
+        with pd.ExcelFile(f) as workbook:
+            summary = {
+                'sheet_names': workbook.sheet_names,
+                'active_sheet': get_active_sheet(workbook),
+                'sheet_summaries': {}
+            }
+            
+            # One sheet in memory at a time keeps peak memory at the largest sheet
+            for sheet_name in sheet_names or workbook.sheet_names:
+                logger.debug("Reading sheet: %s", sheet_name)
+                with span('read_excel'):
+                    df = workbook.parse(sheet_name=sheet_name)
+                with span('summarize_sheet'):
+                    summary['sheet_summaries'][sheet_name] = summarize_dataframe(df)
+        return summary
+
+
+def sheet_part_sizes(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """Uncompressed size of each sheet's XML part by sheet name, resolved through the workbook's relationships."""
+    root_rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+    workbook_path = next(rel.get('Target') for rel in root_rels.iter(f'{{{PACKAGE_RELATIONSHIPS}}}Relationship')
+                         if rel.get('Type', '').endswith('/officeDocument')).lstrip('/')
+    directory, name = posixpath.split(workbook_path)
+    rels = ElementTree.fromstring(archive.read(posixpath.join(directory, '_rels', f'{name}.rels')))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{{{PACKAGE_RELATIONSHIPS}}}Relationship')}
+
+    sizes = {}
+    for sheet in ElementTree.fromstring(archive.read(workbook_path)).iter(f'{{{SPREADSHEET_MAIN}}}sheet'):
+        target = targets[sheet.get(f'{{{DOCUMENT_RELATIONSHIPS}}}id')]
+        path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(directory, target))
+        sizes[sheet.get('name')] = archive.getinfo(path).file_size
+    return sizes
+
+
+def balance_sheets(sizes: Dict[str, int], groups: int) -> List[List[str]]:
+    """Split sheets into groups of similar total size, largest sheets first."""
+    buckets = [[0, []] for _ in range(min(groups, len(sizes)))]
+    for sheet_name in sorted(sizes, key=sizes.get, reverse=True):
+        bucket = min(buckets, key=lambda candidate: candidate[0])
+        bucket[0] += sizes[sheet_name]
+        bucket[1].append(sheet_name)
+    return [names for _, names in buckets if names]
+
+
+def create_result_cache() -> MemoryLRUCache:
+    """Create the cache of analyses, persisted to disk unless EXCEL_RESULT_CACHE_PERSIST is off."""
+    backing = None
+    if env_bool('EXCEL_RESULT_CACHE_PERSIST', True):
+        backing = SQLiteCache(
+            os.path.join(default_cache_dir(), 'excel_results.sqlite3'),
+            max_entries=env_int('EXCEL_RESULT_CACHE_MAX_ENTRIES', 500),
+            max_bytes=env_int('EXCEL_RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+            ttl_seconds=env_int('EXCEL_RESULT_CACHE_TTL_SECONDS', 30 * 24 * 3600),
+        )
+    return MemoryLRUCache(env_int('EXCEL_RESULT_CACHE_MEMORY_ENTRIES', 64), backing)
+
+
+def analyze_in_worker(settings: Dict[str, Any], data: bytes, filename: str) -> Tuple[Dict[str, Any], float]:
+    """Analyze one file of a batch inside a pool worker; returns the analysis and the seconds it took."""
+    started = time.perf_counter()
+    service = ExcelProcessorService(workers=1, result_cache=MemoryLRUCache(0), **settings)
+    return service._analyze(io.BytesIO(data), filename), time.perf_counter() - started
+
 
 @dataclass
 class ExcelDocument:
@@ -10,48 +158,214 @@ class ExcelDocument:
     summary: Dict[str, Any]
 
 class ExcelProcessorService:
-    def process_excel(self, file_path: str) -> Dict[str, Any]:
+    def __init__(self, summary_mode: str = None, streaming_threshold_bytes: int = None,
+                 streaming_chunk_rows: int = None, workers: int = None, parallel_min_bytes: int = None,
+                 result_cache: MemoryLRUCache = None, csv_engine: str = None):
+        """
+        Args:
+            summary_mode: 'exact' loads each sheet into a DataFrame, 'streaming' summarizes
+                it chunk by chunk in bounded memory and 'auto' streams files larger than
+                ``streaming_threshold_bytes``
+            workers: Processes summarizing the sheets of workbooks of at least
+                ``parallel_min_bytes``; smaller workbooks are summarized in the request
+        """
+        self.summary_mode = summary_mode or os.getenv('EXCEL_SUMMARY_MODE', 'auto')
+        if self.summary_mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode {self.summary_mode!r}, expected one of {SUMMARY_MODES}")
+        self.streaming_threshold_bytes = streaming_threshold_bytes or env_int('EXCEL_STREAMING_THRESHOLD_BYTES', 20 * 1024 * 1024)
+        self.streaming_chunk_rows = streaming_chunk_rows or env_int('EXCEL_STREAMING_CHUNK_ROWS', 50000)
+        self.workers = workers or env_int('EXCEL_WORKERS', os.cpu_count() or 1)
+        self.parallel_min_bytes = parallel_min_bytes if parallel_min_bytes is not None else \
+            env_int('EXCEL_PARALLEL_MIN_BYTES', 2 * 1024 * 1024)
+        # 'auto' (pyarrow when installed), 'pyarrow' or 'c'
+        self.csv_engine = csv_engine or os.getenv('EXCEL_CSV_ENGINE', 'auto')
+        self.result_cache = result_cache if result_cache is not None else create_result_cache()
+
+    def get_cache_key(self, content_hash: str, filename: str) -> str:
+        """Key of the analysis of a file with this SHA-256 under the current settings.
+
+        The file type comes from the name, as the same bytes parse differently as CSV
+        or TSV. The settings that can change the numbers are part of the key.
+        """
+        options = get_delimited_options(filename)
+        file_type = (options['sep'], options['compression']) if options else os.path.splitext(filename)[1].lower()
+        return hash_key(content_hash, file_type, SUMMARY_VERSION, self.summary_mode,
+                        self.streaming_threshold_bytes, self.streaming_chunk_rows, self.csv_engine)
+
+    def get_cached_analysis(self, content_hash: str, filename: str) -> Optional[Dict[str, Any]]:
+        return self.result_cache.get(self.get_cache_key(content_hash, filename))
+
+    def use_streaming(self, source: Source, filename: str) -> bool:
+        if filename.lower().endswith('.xls'):
+            # Legacy workbooks can only be read whole, by xlrd
+            return False
+        if self.summary_mode == 'auto':
+            return source_size(source) > self.streaming_threshold_bytes
+        return self.summary_mode == 'streaming'
+
+    def use_parallel(self, source: Source, filename: str) -> bool:
+        return self.workers > 1 and filename.lower().endswith('.xlsx') and source_size(source) >= self.parallel_min_bytes
+
+    def process_excel(self, source: Source, filename: str = None, content_hash: str = None) -> Dict[str, Any]:
         """
         Process an Excel file and extract useful information.
         
         Args:
-            file_path: Path to the uploaded Excel file
+            source: Path to the Excel file or a binary file object, e.g. the upload stream
+            filename: Name of the uploaded file, used to detect CSV/TSV (optionally .gz) files
+            content_hash: SHA-256 of the file when the caller already computed it
             
         Returns:
             Dictionary containing summary information about the Excel file
         """
-        logging.debug(f"Processing file: {file_path}")
-        if file_path.endswith('.csv'):
-            # Read CSV file
-            logging.debug("Reading CSV file.")
-            df = pd.read_csv(file_path)
-            summary = self._generate_summary_from_dataframe(df, 'CSV')
+        filename = filename or source_name(source)
+        cache_key = self.get_cache_key(content_hash or hash_source(source), filename)
+        cached = self.result_cache.get(cache_key)
+        count_cache_lookup('excel_results', cached is not None)
+        if cached is not None:
+            logger.debug("Returning cached analysis of %s", filename)
+            return cached
+
+        FILE_SIZE.observe(source_size(source), feature='excel')
+        with span('process_excel'):
+            analysis = self._analyze(source, filename)
+        self._cache_analysis(cache_key, filename, analysis)
+        return analysis
+
+    def _cache_analysis(self, cache_key: str, filename: str, analysis: Dict[str, Any]) -> None:
+        try:
+            self.result_cache.set(cache_key, analysis)
+        except (TypeError, ValueError) as e:
+            # e.g. date column headers, which have no JSON form
+            logger.warning("Could not cache the analysis of %s: %s", filename, e)
+
+    def process_batch(self, files: List[Tuple[str, Source]]) -> List[Dict[str, Any]]:
+        """Analyze several files, spreading those not in the cache over the shared process pool.
+
+        Returns, in the order of ``files``, ``{'filename', 'content_hash', 'cached',
+        'seconds', 'analysis'}`` for each file, or ``{'filename', 'error'}`` when it
+        could not be processed.
+        """
+        results, misses = [], []
+        for filename, source in files:
+            started = time.perf_counter()
+            content_hash = hash_source(source)
+            cached = self.get_cached_analysis(content_hash, filename)
+            count_cache_lookup('excel_results', cached is not None)
+            results.append({'filename': filename, 'content_hash': content_hash, 'cached': cached is not None,
+                            'seconds': time.perf_counter() - started, 'analysis': cached})
+            if cached is None:
+                misses.append((len(results) - 1, source))
+
+        if self.workers > 1 and len(misses) > 1:
+            settings = {'summary_mode': self.summary_mode, 'streaming_threshold_bytes': self.streaming_threshold_bytes,
+                        'streaming_chunk_rows': self.streaming_chunk_rows, 'csv_engine': self.csv_engine}
+            pool = get_process_pool('excel-summaries', self.workers, modules=(__name__,))
+            futures = [(index, pool.submit(analyze_in_worker, settings, read_source(source), results[index]['filename']))
+                       for index, source in misses]
+            outcomes = []
+            for index, future in futures:
+                try:
+                    analysis, seconds = future.result()
+                    # Spans inside pool workers stay in their processes
+                    record_span('process_excel', seconds)
+                    outcomes.append((index, analysis, seconds))
+                except Exception as e:
+                    outcomes.append((index, e, 0.0))
         else:
-            # Load the workbook to get sheet names and metadata
-            logging.debug("Loading Excel workbook.")
-            workbook = load_workbook(file_path, read_only=True, data_only=True)
-            
-            # Get basic information
-            summary = {
-                'sheet_names': workbook.sheetnames,
-                'active_sheet': workbook.active.title,
-                'sheet_summaries': {}
-            }
-            
-            # Use pandas to read each sheet and get statistics
-            for sheet_name in workbook.sheetnames:
-                # Read sheet with pandas
-                logging.debug(f"Reading sheet: {sheet_name}")
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                sheet_summary = self._generate_summary_from_dataframe(df, sheet_name)
-                summary['sheet_summaries'][sheet_name] = sheet_summary
+            outcomes = []
+            for index, source in misses:
+                started = time.perf_counter()
+                try:
+                    with span('process_excel'):
+                        analysis = self._analyze(source, results[index]['filename'])
+                except Exception as e:
+                    analysis = e
+                outcomes.append((index, analysis, time.perf_counter() - started))
+
+        for index, analysis, seconds in outcomes:
+            result = results[index]
+            if isinstance(analysis, Exception):
+                logger.error("Error processing %s: %s", result['filename'], analysis)
+                results[index] = {'filename': result['filename'], 'error': f"Failed to process Excel: {analysis}"}
+                continue
+            result['analysis'] = analysis
+            result['seconds'] += seconds
+            self._cache_analysis(self.get_cache_key(result['content_hash'], result['filename']),
+                                 result['filename'], analysis)
+        return results
+
+    def _analyze(self, source: Source, filename: str) -> Dict[str, Any]:
+        logger.debug("Processing file: %s", filename)
+        streaming = self.use_streaming(source, filename)
+        delimited_options = get_delimited_options(filename)
+        if delimited_options:
+            # Read CSV/TSV file
+            logger.debug("Reading delimited file.")
+            with open_source(source) as f:
+                if streaming:
+                    accumulator = StreamingSummary()
+                    with span('stream_csv'):
+                        for chunk in iter_csv_chunks(f, self.streaming_chunk_rows, **delimited_options):
+                            accumulator.update(chunk)
+                        summary = accumulator.to_summary()
+                else:
+                    with span('read_csv'):
+                        df = read_delimited(f, delimited_options, engine=self.csv_engine)
+                    with span('summarize_sheet'):
+                        summary = self._generate_summary_from_dataframe(df, 'CSV')
+        elif self.use_parallel(source, filename):
+            logger.debug("Summarizing sheets with %d processes.", self.workers)
+            summary = self._summarize_workbook_in_parallel(source, streaming)
+        else:
+            logger.debug("Loading Excel workbook.")
+            summary = summarize_workbook(source, streaming=streaming, chunk_rows=self.streaming_chunk_rows)
         
-        logging.debug(f"Generated summary before return: {summary}")
+        logger.debug("Generated summary before return: %s", summary)
         # Generate a text summary without using AI
-        text_summary = self._generate_simple_text_summary(summary)
-        logging.debug(f"Generated text summary: {text_summary}")
+        with span('text_summary'):
+            text_summary = self._generate_simple_text_summary(summary)
+        logger.debug("Generated text summary: %s", text_summary)
         return {'summary': summary, 'text_summary': text_summary}
 
+    def _summarize_workbook_in_parallel(self, source: Source, streaming: bool) -> Dict[str, Any]:
+        """Summarize groups of sheets in pool workers; ``sheet_summaries`` keeps the workbook order."""
+        with open_source(source) as f:
+            workbook = load_workbook(f, read_only=True, data_only=True)
+            try:
+                # Chartsheets hold no cells, and pandas leaves them out as well
+                sheet_names = [worksheet.title for worksheet in workbook.worksheets]
+                active_sheet = workbook.active.title
+            finally:
+                workbook.close()
+            # Balance the groups by the uncompressed size of each sheet's XML
+            try:
+                with zipfile.ZipFile(f) as archive:
+                    part_sizes = sheet_part_sizes(archive)
+            except (KeyError, StopIteration, ElementTree.ParseError) as e:
+                logger.warning("Could not size the sheets of the workbook, summarizing them in one process: %s", e)
+                part_sizes = {}
+            sizes = {sheet_name: part_sizes[sheet_name] for sheet_name in sheet_names if sheet_name in part_sizes}
+
+        if len(sizes) < 2 or len(sizes) < len(sheet_names):
+            return summarize_workbook(source, streaming=streaming, chunk_rows=self.streaming_chunk_rows)
+
+        # Workers open paths themselves; uploads are sent as bytes
+        payload = source if isinstance(source, (str, os.PathLike)) else read_source(source)
+        pool = get_process_pool('excel-summaries', self.workers, modules=(__name__,))
+        futures = [
+            pool.submit(summarize_workbook, payload, group, streaming, self.streaming_chunk_rows)
+            for group in balance_sheets(sizes, self.workers)
+        ]
+        sheet_summaries = {}
+        for future in futures:
+            sheet_summaries.update(future.result()['sheet_summaries'])
+        return {
+            'sheet_names': sheet_names,
+            'active_sheet': active_sheet,
+            'sheet_summaries': {sheet_name: sheet_summaries[sheet_name] for sheet_name in sheet_names},
+        }
+
     def _generate_simple_text_summary(self, summary: Dict[str, Any]) -> str:
         """Generate a simple text summary without using external APIs."""
         if 'sheet_names' in summary:
@@ -116,17 +430,4 @@ class ExcelProcessorService:
 
     def _generate_summary_from_dataframe(self, df, sheet_name):
         """Generate a summary from a DataFrame."""
-        sheet_summary = {
-            'rows': len(df),
-            'columns': len(df.columns),
-            'column_names': df.columns.tolist(),
-            'numeric_columns': df.select_dtypes(include=['number']).columns.tolist(),
-            'non_null_counts': df.count().to_dict(),
-        }
-        
-        # Add basic statistics for numeric columns
-        if len(sheet_summary['numeric_columns']) > 0:
-            stats = df[sheet_summary['numeric_columns']].describe().to_dict()
-            sheet_summary['statistics'] = stats
-        
-        return sheet_summary
+        return summarize_dataframe(df)
@@ -0,0 +1,241 @@
+"""Constant-memory sheet summaries built from chunks of rows.
+
+The summary has the same structure as ``ExcelProcessorService._generate_summary_from_dataframe``
+on the whole sheet: counts, min, max, mean and standard deviation are exact
+(merged with Welford/Chan updates) and quartiles come from a mergeable KLL
+sketch, which is exact until a column holds more than ``sketch_size`` values.
+"""
+import math
+import random
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang and Liberty, 2016).
+
+    Items live in levels of compactors; level ``h`` items weigh ``2**h``.
+    A full level is sorted and every other item, starting at a random
+    offset, moves one level up. The rank error is about ``1.7 / k``.
+    """
+
+    def __init__(self, k: int = 256, seed: Optional[int] = None):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self._random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: np.ndarray) -> None:
+        """Add a batch of non-NaN float values."""
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so the total weight is preserved
+                kept, items = (items[-1:], items[:-1]) if len(items) % 2 else (np.empty(0), items)
+                promoted = items[self._random.randint(0, 1)::2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        """Quantiles with linear interpolation (as pandas) while exact, weighted ranks afterwards."""
+        qs = list(qs)
+        if self.count == 0:
+            return [math.nan] * len(qs)
+        if self.is_exact:
+            return [float(value) for value in np.quantile(self.levels[0], qs)]
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        total = cumulative[-1]
+        return [float(items[min(np.searchsorted(cumulative, q * total, side='left'), len(items) - 1)]) for q in qs]
+
+
+class ColumnStatistics:
+    """Exact moments and a quantile sketch of one numeric column."""
+
+    def __init__(self, sketch_size: int = 256):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = KLLSketch(sketch_size, seed=0)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        # Chan et al. pairwise update of the running mean and sum of squared deviations
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        delta = mean - self.mean
+        total = self.count + count
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sketch.update(values)
+
+    def describe(self) -> Dict[str, float]:
+        """Same keys and order as ``DataFrame.describe()`` for a numeric column."""
+        if self.count == 0:
+            return {'count': 0.0, 'mean': math.nan, 'std': math.nan, 'min': math.nan,
+                    '25%': math.nan, '50%': math.nan, '75%': math.nan, 'max': math.nan}
+        quartiles = self.sketch.quantiles(DESCRIBE_PERCENTILES)
+        return {
+            'count': float(self.count),
+            'mean': self.mean,
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan,
+            'min': self.min,
+            '25%': quartiles[0],
+            '50%': quartiles[1],
+            '75%': quartiles[2],
+            'max': self.max,
+        }
+
+
+class StreamingSummary:
+    """Accumulates DataFrame chunks of one sheet into a summary of the whole sheet."""
+
+    def __init__(self, sketch_size: int = 256):
+        self.sketch_size = sketch_size
+        self.rows = 0
+        self.column_names: Optional[List[Any]] = None
+        self.non_null_counts: Dict[Any, int] = {}
+        self.numeric: Dict[Any, bool] = {}
+        self.seen_numeric = set()
+        self.statistics: Dict[Any, ColumnStatistics] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.column_names is None:
+            self.column_names = chunk.columns.tolist()
+            self.non_null_counts = {column: 0 for column in self.column_names}
+            self.numeric = {column: True for column in self.column_names}
+            self.statistics = {column: ColumnStatistics(self.sketch_size) for column in self.column_names}
+
+        self.rows += len(chunk)
+        for column, count in chunk.count().items():
+            self.non_null_counts[column] += int(count)
+
+        numeric_columns = set(chunk.select_dtypes(include=['number']).columns)
+        for column in self.column_names:
+            if not self.numeric[column]:
+                continue
+            if column in numeric_columns:
+                if len(chunk):
+                    self.seen_numeric.add(column)
+                self.statistics[column].update(chunk[column].to_numpy(dtype=float, na_value=np.nan))
+            elif chunk[column].notna().any():
+                # Like pandas on the whole sheet, one non-numeric value makes the column non-numeric
+                self.numeric[column] = False
+                del self.statistics[column]
+
+    def to_summary(self) -> Dict[str, Any]:
+        column_names = self.column_names or []
+        numeric_columns = [column for column in column_names if self.numeric[column] and column in self.seen_numeric]
+        summary = {
+            'rows': self.rows,
+            'columns': len(column_names),
+            'column_names': column_names,
+            'numeric_columns': numeric_columns,
+            'non_null_counts': self.non_null_counts,
+        }
+        if numeric_columns:
+            summary['statistics'] = {column: self.statistics[column].describe() for column in numeric_columns}
+        return summary
+
+
+def iter_csv_chunks(f: BinaryIO, chunksize: int, **read_csv_options) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(f, chunksize=chunksize, **read_csv_options) as reader:
+        yield from reader
+
+
+def _header_names(header: tuple) -> List[Any]:
+    """Column names as pandas gives them: 'Unnamed: i' for blanks and '.n' suffixes for duplicates."""
+    names, seen = [], {}
+    for index, name in enumerate(header):
+        name = f'Unnamed: {index}' if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _rows_to_frame(rows: List[tuple], columns: List[Any]) -> pd.DataFrame:
+    frame = pd.DataFrame(rows, columns=columns)
+    if len(frame):
+        # Empty cells are NaN floats when pandas parses the whole sheet, not None objects
+        empty = frame.columns[frame.isna().all()]
+        frame[empty] = frame[empty].astype(float)
+    return frame
+
+
+def iter_sheet_chunks(worksheet, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read an openpyxl read-only worksheet as DataFrames of ``chunksize`` rows.
+
+    The first row is the header. Trailing empty rows are dropped and rows
+    are cut to the header width, as ``pd.read_excel`` does for ordinary sheets.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = list(header)
+    while header and header[-1] is None:
+        header.pop()
+    columns = _header_names(tuple(header))
+    width = len(columns)
+
+    chunk, empty_rows = [], []
+    for row in rows:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if all(value is None for value in row):
+            empty_rows.append(row)
+            continue
+        chunk.extend(empty_rows)
+        empty_rows = []
+        chunk.append(row)
+        if len(chunk) >= chunksize:
+            yield _rows_to_frame(chunk, columns)
+            chunk = []
+    # Also reports the columns of a sheet that only has a header
+    yield _rows_to_frame(chunk, columns)
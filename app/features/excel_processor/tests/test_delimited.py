@@ -0,0 +1,42 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from app.features.excel_processor.delimited import PYARROW_AVAILABLE, get_delimited_options, read_delimited
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.shared.cache import MemoryLRUCache
+
+NO_CACHE = MemoryLRUCache(0)
+
+ENGINES = ['c', pytest.param('pyarrow', marks=pytest.mark.skipif(not PYARROW_AVAILABLE, reason='pyarrow not installed'))]
+
+
+def test_get_delimited_options():
+    assert get_delimited_options('rooms.csv') == {'sep': ',', 'compression': None}
+    assert get_delimited_options('ROOMS.TSV.GZ') == {'sep': '\t', 'compression': 'gzip'}
+    assert get_delimited_options('rooms.xlsx') is None
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_gzipped_tsv_summary_matches_plain_read_csv(engine):
+    frame = pd.DataFrame({'room': ['P.1', 'P.2', None], 'area': [12, None, 7], 'ok': [True, False, True]})
+    data = gzip.compress(frame.to_csv(sep='\t', index=False).encode())
+    service = ExcelProcessorService(summary_mode='exact', result_cache=NO_CACHE)
+    service.csv_engine = engine
+
+    summary = service.process_excel(io.BytesIO(data), 'rooms.tsv.gz')['summary']
+
+    expected = service._generate_summary_from_dataframe(pd.read_csv(io.BytesIO(data), sep='\t', compression='gzip'), 'CSV')
+    assert summary == expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_text_after_the_sample_falls_back_to_full_inference(engine):
+    data = ("area\n" + "1.5\n" * 20 + "brak\n").encode()
+
+    df = read_delimited(io.BytesIO(data), {'sep': ',', 'compression': None}, engine=engine, sample_rows=10)
+
+    assert df['area'].dtype == object
+    assert len(df) == 21
@@ -0,0 +1,125 @@
+import io
+import zipfile
+
+import pandas as pd
+
+from app.features.excel_processor.services import ExcelProcessorService, sheet_part_sizes
+from app.features.shared.cache import MemoryLRUCache, SQLiteCache, sha256_hexdigest
+
+NO_CACHE = MemoryLRUCache(0)
+
+
+def make_workbook(sheets, active=0):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        writer.book.active = active
+    return output.getvalue()
+
+
+def test_process_excel_reads_every_sheet_in_one_pass(monkeypatch):
+    data = make_workbook({
+        'Parter': pd.DataFrame({'room': ['P.1', 'P.2'], 'area': [12.5, 20.0]}),
+        'Piętro': pd.DataFrame({'room': ['1.1', '1.2', '1.3'], 'area': [10.0, 11.0, 12.0]}),
+    }, active=1)
+    opened = []
+    original_init = pd.ExcelFile.__init__
+
+    def counting_init(self, *args, **kwargs):
+        opened.append(args)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(pd.ExcelFile, '__init__', counting_init)
+    result = ExcelProcessorService(result_cache=NO_CACHE).process_excel(io.BytesIO(data), filename='budynek.xlsx')
+
+    summary = result['summary']
+    assert len(opened) == 1
+    assert summary['sheet_names'] == ['Parter', 'Piętro']
+    assert summary['active_sheet'] == 'Piętro'
+    assert summary['sheet_summaries']['Piętro']['rows'] == 3
+    assert summary['sheet_summaries']['Parter']['statistics']['area']['max'] == 20.0
+    assert "Total of 5 rows across all sheets." in result['text_summary']
+
+
+def test_parallel_summaries_match_serial_and_keep_sheet_order():
+    sheets = {f'Arkusz{n}': pd.DataFrame({'area': range(n * 100)}) for n in range(1, 6)}
+    data = make_workbook(sheets)
+
+    serial = ExcelProcessorService(workers=1, result_cache=NO_CACHE).process_excel(
+        io.BytesIO(data), filename='budynek.xlsx')
+    parallel = ExcelProcessorService(workers=3, parallel_min_bytes=0, result_cache=NO_CACHE).process_excel(
+        io.BytesIO(data), filename='budynek.xlsx')
+
+    assert list(parallel['summary']['sheet_summaries']) == list(sheets)
+    assert parallel == serial
+
+
+def test_parallel_summaries_skip_chartsheets():
+    from openpyxl import Workbook
+    from openpyxl.chart import BarChart, Reference
+
+    workbook = Workbook()
+    for n, sheet in enumerate([workbook.active, workbook.create_sheet()]):
+        sheet.title = f'Arkusz{n}'
+        sheet.append(['area'])
+        for value in range(10 * (n + 1)):
+            sheet.append([value])
+    chart = BarChart()
+    chart.add_data(Reference(workbook['Arkusz0'], min_col=1, min_row=1, max_row=11), titles_from_data=True)
+    workbook.create_chartsheet('Wykres').add_chart(chart)
+    output = io.BytesIO()
+    workbook.save(output)
+
+    serial = ExcelProcessorService(workers=1, result_cache=NO_CACHE).process_excel(
+        io.BytesIO(output.getvalue()), filename='budynek.xlsx')
+    parallel = ExcelProcessorService(workers=2, parallel_min_bytes=0, result_cache=NO_CACHE).process_excel(
+        io.BytesIO(output.getvalue()), filename='budynek.xlsx')
+
+    assert list(parallel['summary']['sheet_summaries']) == ['Arkusz0', 'Arkusz1']
+    assert parallel == serial
+    # Resolved without openpyxl's private worksheet paths
+    with zipfile.ZipFile(output) as archive:
+        assert set(sheet_part_sizes(archive)) == {'Arkusz0', 'Arkusz1', 'Wykres'}
+
+
+def test_repeated_uploads_are_answered_from_the_result_cache(monkeypatch, tmp_path):
+    data = make_workbook({'Parter': pd.DataFrame({'area': [12.5, 20.0]})})
+    cache = MemoryLRUCache(backing=SQLiteCache(str(tmp_path / 'results.sqlite3')))
+    first = ExcelProcessorService(result_cache=cache).process_excel(io.BytesIO(data), filename='budynek.xlsx')
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the workbook was parsed again')
+
+    monkeypatch.setattr('app.features.excel_processor.services.summarize_workbook', fail)
+    service = ExcelProcessorService(result_cache=MemoryLRUCache(backing=cache.backing))
+    assert service.process_excel(io.BytesIO(data), filename='budynek.xlsx') == first
+    assert service.get_cached_analysis(sha256_hexdigest(data), 'budynek.xlsx') == first
+    # Settings that change the numbers are part of the key
+    assert ExcelProcessorService(summary_mode='streaming', result_cache=cache).get_cached_analysis(
+        sha256_hexdigest(data), 'budynek.xlsx') is None
+
+
+def test_process_batch_matches_single_files_and_reports_failures(tmp_path):
+    workbooks = [(f'budynek{n}.xlsx', make_workbook({'Parter': pd.DataFrame({'area': range(n * 10)})}))
+                 for n in range(1, 4)]
+    expected = [ExcelProcessorService(result_cache=NO_CACHE).process_excel(io.BytesIO(data), filename)
+                for filename, data in workbooks]
+    cache = MemoryLRUCache()
+    service = ExcelProcessorService(workers=2, result_cache=cache)
+    files = [(filename, io.BytesIO(data)) for filename, data in workbooks]
+    files.append(('zepsuty.xlsx', io.BytesIO(b'nie arkusz')))
+
+    results = service.process_batch(files)
+
+    assert [result.get('analysis') for result in results[:3]] == expected
+    assert results[3]['filename'] == 'zepsuty.xlsx' and 'error' in results[3]
+    assert [result['cached'] for result in service.process_batch(files[:3])] == [True] * 3
+
+
+def test_file_types_are_detected_regardless_of_case():
+    service = ExcelProcessorService(summary_mode='streaming', result_cache=NO_CACHE)
+
+    assert not service.use_streaming(io.BytesIO(b''), 'RAPORT.XLS')
+    assert service.use_streaming(io.BytesIO(b''), 'RAPORT.XLSX')
+    assert ExcelProcessorService(workers=2, parallel_min_bytes=0).use_parallel(io.BytesIO(b''), 'RAPORT.XLSX')
@@ -0,0 +1,83 @@
+import io
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.excel_processor.statistics import KLLSketch
+from app.features.shared.cache import MemoryLRUCache
+
+NO_CACHE = MemoryLRUCache(0)
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    area = rng.normal(50, 15, rows)
+    area[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'room': [f'P.{n}' for n in range(rows)],
+        'area': area,
+        'floor': rng.integers(0, 5, rows),
+        'note': [None if n % 3 else 'pęknięcie' for n in range(rows)],
+        'empty': [None] * rows,
+    })
+
+
+def assert_same_summary(streaming, exact, quantile_tolerance=1e-12):
+    for key in ('rows', 'columns', 'column_names', 'numeric_columns', 'non_null_counts'):
+        assert streaming[key] == exact[key], key
+    for column, expected in exact.get('statistics', {}).items():
+        actual = streaming['statistics'][column]
+        assert list(actual) == list(expected)
+        for stat, value in expected.items():
+            tolerance = quantile_tolerance if stat.endswith('%') else 1e-9
+            assert (math.isnan(value) and math.isnan(actual[stat])) or \
+                math.isclose(actual[stat], value, rel_tol=tolerance, abs_tol=tolerance), (column, stat)
+
+
+def test_streaming_csv_summary_matches_exact_summary():
+    data = make_frame(250).to_csv(index=False).encode()
+    exact = ExcelProcessorService(summary_mode='exact', result_cache=NO_CACHE).process_excel(
+        io.BytesIO(data), 'rooms.csv')
+    streaming = ExcelProcessorService(summary_mode='streaming', streaming_chunk_rows=64,
+                                      result_cache=NO_CACHE).process_excel(io.BytesIO(data), 'rooms.csv')
+
+    # Under the sketch size every value is kept, so even the quartiles are exact
+    assert_same_summary(streaming['summary'], exact['summary'])
+    assert streaming['text_summary'] == exact['text_summary']
+
+
+def test_streaming_workbook_summary_matches_exact_summary():
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        make_frame(2000).to_excel(writer, sheet_name='Parter', index=False)
+        make_frame(50, seed=1).to_excel(writer, sheet_name='Piętro', index=False)
+        pd.DataFrame(columns=['room', 'area']).to_excel(writer, sheet_name='Pusty', index=False)
+    data = output.getvalue()
+
+    exact = ExcelProcessorService(summary_mode='exact', result_cache=NO_CACHE).process_excel(
+        io.BytesIO(data), 'rooms.xlsx')['summary']
+    streaming = ExcelProcessorService(summary_mode='streaming', streaming_chunk_rows=300,
+                                      result_cache=NO_CACHE).process_excel(io.BytesIO(data), 'rooms.xlsx')['summary']
+
+    assert streaming['sheet_names'] == exact['sheet_names']
+    assert streaming['active_sheet'] == exact['active_sheet']
+    for sheet_name in exact['sheet_names']:
+        assert_same_summary(streaming['sheet_summaries'][sheet_name], exact['sheet_summaries'][sheet_name],
+                            quantile_tolerance=2.0)
+
+
+def test_kll_sketch_rank_error_is_bounded():
+    values = np.random.default_rng(0).lognormal(size=200_000)
+    sketch, other = KLLSketch(k=256, seed=0), KLLSketch(k=256, seed=1)
+    for chunk in np.array_split(values[:100_000], 7):
+        sketch.update(chunk)
+    for chunk in np.array_split(values[100_000:], 3):
+        other.update(chunk)
+    sketch.merge(other)
+
+    ordered = np.sort(values)
+    for q, estimate in zip((0.01, 0.25, 0.5, 0.75, 0.99), sketch.quantiles((0.01, 0.25, 0.5, 0.75, 0.99))):
+        rank = np.searchsorted(ordered, estimate) / len(values)
+        assert abs(rank - q) < 0.02
@@ -1,77 +1,129 @@
-import os
 import logging
-from flask import Blueprint, render_template, request, jsonify, current_app
-
-logging.basicConfig(level=logging.DEBUG)
+import time
+from flask import Blueprint, current_app, render_template, request, jsonify
 from werkzeug.utils import secure_filename
-from app.features.excel_processor.services import ExcelProcessorService
+from app.features.shared.batch import BatchError, collect_batch_files, summarize_batch
+from app.features.shared.lazy import Lazy
+from app.features.shared.metrics import collect_timings, span
+from app.features.shared.uploads import hash_source, timings_requested
+
+logger = logging.getLogger(__name__)
 
 excel_processor_bp = Blueprint('excel_processor', __name__, 
                             url_prefix='/excel-processor',
                             template_folder='template',
                             static_folder='template')  # Serve static files from template directory
 
-service = ExcelProcessorService()
+def create_service():
+    # Imported on first use: the service loads pandas and openpyxl
+    from app.features.excel_processor.services import ExcelProcessorService
+    return ExcelProcessorService()
+
+get_service = Lazy(create_service).get
+
+def __getattr__(name):
+    # ``views.service``, e.g. for benchmarks swapping the result cache
+    if name == 'service':
+        return get_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up():
+    """Build the service before the first request needs it (see ``app.features.warm_up_features``)."""
+    get_service()
 
-ALLOWED_EXTENSIONS = {'xls', 'xlsx'}
+ALLOWED_EXTENSIONS = {'xls', 'xlsx', 'csv', 'tsv', 'csv.gz', 'tsv.gz'}
 
 def allowed_file(filename):
-    """Check if the file has an allowed extension."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    """Check if the file has an allowed extension, including compound ones such as .csv.gz."""
+    return '.' in filename and any(filename.lower().endswith('.' + extension) for extension in ALLOWED_EXTENSIONS)
 
 @excel_processor_bp.route('/')
 def index():
     """Render the index page for Excel processing."""
     return render_template('index.html')
 
+def analysis_response(filename, content_hash, analysis, timings=None):
+    """JSON analysis tagged with the cache key, answering 304 to a matching If-None-Match."""
+    body = {
+        'filename': filename,
+        'content_hash': content_hash,
+        'analysis': analysis
+    }
+    if timings is not None:
+        body['timings'] = timings
+    response = jsonify(body)
+    response.set_etag(get_service().get_cache_key(content_hash, filename))
+    return response.make_conditional(request)
+
+@excel_processor_bp.route('/results/<content_hash>')
+def cached_result(content_hash):
+    """Return the cached analysis of a file by its SHA-256, so known files need not be uploaded.
+
+    The ``filename`` query parameter gives the file type, as for uploads.
+    HEAD requests only tell whether the analysis is cached.
+    """
+    filename = secure_filename(request.args.get('filename', ''))
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    analysis = get_service().get_cached_analysis(content_hash.lower(), filename)
+    if analysis is None:
+        return jsonify({'error': 'Analysis not cached'}), 404
+    return analysis_response(filename, content_hash.lower(), analysis)
+
+@excel_processor_bp.route('/batch', methods=['POST'])
+def upload_batch():
+    """Analyze many spreadsheets (``files`` fields, or zip archives of them) in one request."""
+    try:
+        files, rejected = collect_batch_files(request.files.getlist('files'), allowed_file,
+                                              current_app.config['BATCH_MAX_FILES'],
+                                              current_app.config['BATCH_MAX_EXTRACTED_BYTES'])
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    if not files and not rejected:
+        return jsonify({'error': 'No files'}), 400
+
+    started = time.perf_counter()
+    results = get_service().process_batch(files)
+    wall_seconds = time.perf_counter() - started
+    file_seconds = [result['seconds'] for result in results if 'error' not in result]
+    return jsonify(summarize_batch(results + rejected, file_seconds, wall_seconds))
+
+@excel_processor_bp.route('/cache/stats')
+def cache_stats():
+    """Expose result cache hit/miss counters."""
+    return jsonify(get_service().result_cache.stats())
+
 @excel_processor_bp.route('/upload', methods=['POST'])
 def upload_excel():
     """Handle Excel file upload and processing."""
-    logging.debug("Received request to upload file.")
+    logger.debug("Received request to upload file.")
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
         
     file = request.files['file']
-    logging.debug("Checking if a file is selected.")
+    logger.debug("Checking if a file is selected.")
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
         
-    logging.debug(f"File selected: {file.filename}")
+    logger.debug("File selected: %s", file.filename)
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
         
-        # Make sure the upload folder exists
-        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        try:
-            file.save(file_path)
-            logging.debug(f"File saved to {file_path}")
-        except Exception as e:
-            logging.error(f"Error saving file: {e}")
-            return jsonify({'error': 'Failed to save file'}), 500
-        
         try:
-            logging.debug("Processing file...")
-            analysis = service.process_excel(file_path)
-            logging.debug(f"File processed successfully. Analysis: {analysis}")
+            logger.debug("Processing file...")
+            with collect_timings() as spans:
+                with span('hash_upload'):
+                    content_hash = hash_source(file.stream)
+                # Read straight from the upload stream instead of saving it to UPLOAD_FOLDER first
+                analysis = get_service().process_excel(file.stream, filename=filename, content_hash=content_hash)
+            logger.debug("File processed successfully. Analysis: %s", analysis)
             
-            # Only remove the file if it exists
-            if os.path.exists(file_path):
-                os.remove(file_path)  # Clean up the uploaded file
-            
-            return jsonify({
-                'filename': filename,
-                'analysis': analysis
-            })
+            return analysis_response(filename, content_hash, analysis,
+                                     {'spans': spans} if timings_requested() else None)
         except Exception as e:
-            logging.error(f"Error processing file: {e}")
-            
-            # Try to clean up the file even if processing failed
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            logger.exception("Error processing file %s", filename)
                 
             return jsonify({'error': f"Failed to process Excel: {str(e)}"}), 500
     
-    logging.debug("Invalid file type.")
+    logger.debug("Invalid file type.")
     return jsonify({'error': 'Invalid file type'}), 400
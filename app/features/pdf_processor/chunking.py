@@ -0,0 +1,109 @@
+import math
+import re
+from typing import Iterable, Iterator, List
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+# Room/area headings such as "P.29A", "sala rozpraw nr 30", "Kiosk I" or "Piwnica:"
+HEADING_PATTERN = re.compile(
+    r'^\s*(?:P\.\s*\d+\w*\s*$|(?:pomieszczenie|pok[oó]j|sala|kiosk|klatka|korytarz|piwnica|'
+    r'parter|pi[eę]tro|kondygnacja|dach|elewacja|budynek)\b[^-–:]{0,60}:?\s*$|.{1,60}:\s*$)',
+    re.IGNORECASE,
+)
+
+# Lines that open a new defect entry: bullets, numbering, a room code or a capital letter
+ENTRY_START_PATTERN = re.compile(r'^\s*(?:[-–•*]\s|\d+[.)]\s|P\.\s*\d|[A-ZĄĆĘŁŃÓŚŹŻ])')
+
+# Extracted lines at least this long were most likely wrapped by the PDF layout
+WRAPPED_LINE_LENGTH = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in ``text`` without a tokenizer library.
+
+    Each word or punctuation mark counts as one token, long words add one
+    token per four characters which matches BPE behaviour on Polish text.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in TOKEN_PATTERN.findall(text))
+
+
+def is_heading(line: str) -> bool:
+    return bool(HEADING_PATTERN.match(line))
+
+
+def is_continuation(line: str, previous_line: str) -> bool:
+    """A lowercase line following a long, unterminated line is a wrapped part of the same entry."""
+    previous = previous_line.rstrip()
+    return (
+        not ENTRY_START_PATTERN.match(line)
+        and len(previous) >= WRAPPED_LINE_LENGTH
+        and not previous.endswith(('.', ';', ':'))
+        and not is_heading(previous_line)
+    )
+
+
+def iter_entries(lines: Iterable[str], max_entry_tokens: int = 1200) -> Iterator[List[str]]:
+    """Group lines into entries, attaching wrapped continuation lines to the entry they belong to."""
+    entry: List[str] = []
+    entry_tokens = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        line_tokens = estimate_tokens(line)
+        if entry and is_continuation(line, entry[-1]) and entry_tokens + line_tokens <= max_entry_tokens:
+            entry.append(line)
+            entry_tokens += line_tokens
+        else:
+            if entry:
+                yield entry
+            entry = [line]
+            entry_tokens = line_tokens
+    if entry:
+        yield entry
+
+
+def split_entries(lines: Iterable[str], max_entry_tokens: int = 1200) -> List[List[str]]:
+    return list(iter_entries(lines, max_entry_tokens))
+
+
+def iter_chunks(lines: Iterable[str], target_tokens: int = 1200, overlap_lines: int = 0) -> Iterator[str]:
+    """Lazily split a stream of lines into chunks of roughly ``target_tokens`` tokens.
+
+    Chunks only break between entries, never directly after a room heading,
+    and repeat the last ``overlap_lines`` lines of the previous chunk so an
+    entry near a seam keeps its context. Defects found twice because of the
+    overlap are removed with ``deduplicate_defects``. Each chunk is yielded
+    as soon as the next entry overflows it, so chunking can run while the
+    lines are still being extracted.
+    """
+    current: List[List[str]] = []
+    current_tokens = 0
+    previous_lines: List[str] = []
+
+    def emit(entries):
+        nonlocal previous_lines
+        chunk_lines = [line for entry in entries for line in entry]
+        overlap = previous_lines[-overlap_lines:] if overlap_lines else []
+        previous_lines = chunk_lines
+        return '\n'.join(overlap + chunk_lines)
+
+    for entry in iter_entries(lines, max_entry_tokens=target_tokens):
+        entry_tokens = estimate_tokens('\n'.join(entry))
+        if current and current_tokens + entry_tokens > target_tokens:
+            # Carry trailing headings over so they stay with the entries they introduce
+            carried: List[List[str]] = []
+            while len(current) > 1 and is_heading(current[-1][0]) and len(current[-1]) == 1:
+                carried.insert(0, current.pop())
+            yield emit(current)
+            current = carried
+            current_tokens = sum(estimate_tokens('\n'.join(e)) for e in carried)
+        current.append(entry)
+        current_tokens += entry_tokens
+
+    if current:
+        yield emit(current)
+
+
+def chunk_text(text: str, target_tokens: int = 1200, overlap_lines: int = 0) -> List[str]:
+    """Split ``text`` into chunks of roughly ``target_tokens`` tokens (see ``iter_chunks``)."""
+    return list(iter_chunks(text.split('\n'), target_tokens, overlap_lines))
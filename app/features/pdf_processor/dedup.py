@@ -0,0 +1,144 @@
+"""Duplicate detection for extracted defects.
+
+Defects are compared on folded text: casefolded, without diacritics
+("Zamościu" and "zamosciu" match) and with punctuation and whitespace
+collapsed. A hash of the folded name and location finds exact duplicates;
+near duplicates are found among defects that share their identifiers
+(room numbers such as "P.29A", codes such as "WC8" or "Wejście E") and
+whose names land in the same MinHash band, and are confirmed by a Jaccard
+similarity of character trigrams weighted by rarity, so the building name
+repeated in every location counts for little.
+"""
+import math
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+import numpy as np
+
+from app.domain.models import MinimalDefect
+
+# Letters that Unicode does not decompose into a base letter and a diacritic
+FOLDED_LETTERS = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ħ': 'h', 'ı': 'i'})
+# Words with a digit, or of one to four letters that are neither lower case nor digits
+IDENTIFIER_PATTERN = re.compile(r'(?<!\w)(?:\w*\d\w*|[^\W\d_a-ząćęłńóśźż]{1,4})(?!\w)')
+NON_WORD_PATTERN = re.compile(r'[^\w]+')
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+@lru_cache(maxsize=65536)
+def fold_text(text: str) -> str:
+    """Casefold, strip diacritics and collapse punctuation and whitespace."""
+    text = str(text).casefold()
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text.translate(FOLDED_LETTERS))
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(NON_WORD_PATTERN.sub(' ', text).split())
+
+
+@lru_cache(maxsize=65536)
+def shingle_hash(shingle: str) -> int:
+    return zlib.crc32(shingle.encode())
+
+
+def identifier_tokens(text: str) -> FrozenSet[str]:
+    """Words naming a specific place: with digits ("P.29A", "WC8") or short and upper case ("E", "IV")."""
+    return frozenset(fold_text(word) for word in IDENTIFIER_PATTERN.findall(str(text)))
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    padded = f' {text} '
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+def defect_key(defect: MinimalDefect) -> Tuple[str, str]:
+    """Identity of a defect for exact duplicate detection."""
+    return fold_text(defect.get('name', '')), fold_text(defect.get('location', ''))
+
+
+class DefectIndex:
+    """In-process index of unique defects, answering whether a new defect is a duplicate.
+
+    ``threshold`` is the weighted trigram similarity from which two defects
+    with the same identifiers are near duplicates; 1 or more disables the
+    fuzzy pass. The name MinHash has ``bands * rows`` values.
+    """
+
+    def __init__(self, threshold: float = 0.8, bands: int = 8, rows: int = 4, seed: int = 0):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        # a * crc32 + b stays below 2**64, so the universal hashes do not overflow
+        self._a = rng.integers(1, 1 << 31, bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, bands * rows, dtype=np.uint64)
+        self.defects: List[MinimalDefect] = []
+        self._exact: set = set()
+        self._shingles: List[FrozenSet[str]] = []
+        self._buckets: Dict[Tuple, List[int]] = {}
+        self._document_frequency: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self.defects)
+
+    def _signature(self, shingles: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter(map(shingle_hash, shingles), dtype=np.uint64)
+        if len(hashes) == 0:
+            return np.zeros(self.bands * self.rows, dtype=np.uint64)
+        products = self._a[:, None] * hashes[None, :] + self._b[:, None]
+        return (products % MERSENNE_PRIME).min(axis=1)
+
+    def _weights(self, shingles: FrozenSet[str]) -> Dict[str, float]:
+        count = len(self.defects)
+        frequency = self._document_frequency
+        return {shingle: math.log(1 + count / (frequency[shingle] or 1)) for shingle in shingles}
+
+    def similarity(self, first: FrozenSet[str], second: FrozenSet[str]) -> float:
+        """Jaccard similarity of two trigram sets, each trigram weighted by how rare it is in the index."""
+        weights = self._weights(first | second)
+        union = sum(weights.values())
+        if not union:
+            return 1.0
+        return sum(weights[shingle] for shingle in first & second) / union
+
+    def add(self, defect: MinimalDefect) -> bool:
+        """Add a defect unless it duplicates one already in the index; returns whether it was added."""
+        name, location = key = defect_key(defect)
+        if key in self._exact:
+            return False
+
+        fuzzy = self.threshold < 1
+        if fuzzy:
+            identifiers = identifier_tokens(f"{defect.get('name', '')} {defect.get('location', '')}")
+            shingles = trigrams(f'{name} {location}')
+            signature = self._signature(trigrams(name))
+            bucket_keys = [
+                (identifiers, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            candidates = {index for bucket_key in bucket_keys for index in self._buckets.get(bucket_key, ())}
+            for index in sorted(candidates):
+                if self.similarity(shingles, self._shingles[index]) >= self.threshold:
+                    return False
+
+        self._exact.add(key)
+        if fuzzy:
+            position = len(self.defects)
+            self._shingles.append(shingles)
+            self._document_frequency.update(shingles)
+            for bucket_key in bucket_keys:
+                self._buckets.setdefault(bucket_key, []).append(position)
+        self.defects.append(defect)
+        return True
+
+
+def deduplicate_defects(defects: Iterable[MinimalDefect], threshold: float = 0.8) -> List[MinimalDefect]:
+    """Drop defects reported more than once (e.g. from overlapping chunks), keeping the first."""
+    index = DefectIndex(threshold)
+    for defect in defects:
+        index.add(defect)
+    return index.defects
@@ -0,0 +1,98 @@
+import io
+import math
+import os
+from concurrent.futures import Executor
+from typing import Iterator, List
+
+from PyPDF2 import PdfReader
+
+from app.features.shared.cache import SQLiteCache, default_cache_dir, hash_key
+from app.features.shared.pools import get_process_pool
+from app.features.shared.utils import env_int
+
+# Bump when the extraction logic changes so cached pages are re-extracted
+EXTRACTOR_VERSION = 'pypdf2-3'
+
+
+def extract_page_range(data: bytes, start: int, stop: int) -> List[str]:
+    """Extract the text of pages ``start:stop``; runs inside pool worker processes."""
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[index].extract_text() or '' for index in range(start, stop)]
+
+
+def create_page_cache() -> SQLiteCache:
+    """Create the persistent cache of extracted page texts."""
+    return SQLiteCache(
+        os.path.join(default_cache_dir(), 'pdf_pages.sqlite3'),
+        max_entries=env_int('PDF_PAGE_CACHE_MAX_ENTRIES', 100000),
+        max_bytes=env_int('PDF_PAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+        ttl_seconds=env_int('PDF_PAGE_CACHE_TTL_SECONDS', 30 * 24 * 3600),
+    )
+
+
+def get_page_cache_key(file_hash: str, page_index: int) -> str:
+    return hash_key(file_hash, page_index, EXTRACTOR_VERSION)
+
+
+def iter_pdf_pages(data: bytes, file_hash: str = None, page_cache: SQLiteCache = None,
+                   workers: int = 1, pages_per_task: int = None, min_parallel_pages: int = 16,
+                   executor: Executor = None) -> Iterator[str]:
+    """Yield the text of every page of a PDF in order, as soon as it is available.
+
+    Pages found in ``page_cache`` (keyed by ``file_hash`` and page index) are
+    not extracted again. Documents with at least ``min_parallel_pages``
+    uncached pages are split into ranges of ``pages_per_task`` pages that are
+    extracted in parallel by a pool of ``workers`` processes. Newly extracted
+    pages are cached a range at a time.
+    """
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    use_cache = page_cache is not None and file_hash is not None
+
+    cached_pages = {}
+    if use_cache:
+        keys = {get_page_cache_key(file_hash, index): index for index in range(page_count)}
+        cached_pages = {keys[key]: page_text for key, page_text in page_cache.get_many(list(keys)).items()}
+
+    missing = [index for index in range(page_count) if index not in cached_pages]
+    parallel = len(missing) >= min_parallel_pages and (workers > 1 or executor is not None)
+    if pages_per_task is None:
+        # A few ranges per worker balances the load without re-sending the PDF too often
+        pages_per_task = max(4, math.ceil(len(missing) / (workers * 4))) if parallel else 8
+
+    ranges = []
+    for index in missing:
+        if ranges and ranges[-1][1] == index and ranges[-1][1] - ranges[-1][0] < pages_per_task:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+
+    if parallel:
+        pool = executor or get_process_pool('pdf-extraction', workers, modules=(__name__,))
+        pending = {start: pool.submit(extract_page_range, data, start, stop) for start, stop in ranges}
+        extract = lambda start, stop: pending.pop(start).result()
+    else:
+        extract = lambda start, stop: [reader.pages[index].extract_text() or '' for index in range(start, stop)]
+
+    range_starts = {start: stop for start, stop in ranges}
+    index = 0
+    try:
+        while index < page_count:
+            if index in cached_pages:
+                yield cached_pages[index]
+                index += 1
+                continue
+            stop = range_starts[index]
+            page_texts = extract(index, stop)
+            if use_cache:
+                page_cache.set_many({
+                    get_page_cache_key(file_hash, index + offset): page_text
+                    for offset, page_text in enumerate(page_texts)
+                })
+            yield from page_texts
+            index = stop
+    finally:
+        # Closed early, e.g. a cancelled job or a disconnected client: drop the ranges nobody will read
+        if parallel:
+            for future in pending.values():
+                future.cancel()
@@ -0,0 +1,348 @@
+import asyncio
+import concurrent.futures
+import io
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+from app.features.shared.cache import default_cache_dir
+from app.features.shared.event_loop import get_event_loop
+from app.features.shared.utils import env_int
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation has been requested."""
+
+
+class JobStore:
+    """Durable queue of PDF processing jobs kept in a local SQLite file.
+
+    Uploaded bytes are stored with the job, so queued and interrupted jobs
+    survive a worker restart. Running jobs hold a lease that their worker
+    renews; jobs whose lease expires are put back in the queue.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' filename TEXT NOT NULL,'
+            ' data BLOB,'
+            ' status TEXT NOT NULL,'
+            ' progress_done INTEGER NOT NULL DEFAULT 0,'
+            ' progress_total INTEGER NOT NULL DEFAULT 0,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' cancel_requested INTEGER NOT NULL DEFAULT 0,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' worker_id TEXT,'
+            ' lease_expires_at REAL,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at)')
+
+    def create(self, filename: str, data: bytes) -> str:
+        """Queue a new job for an uploaded PDF and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, filename, data, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, filename, data, QUEUED, now, now),
+            )
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it with its data."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, worker_id = ?, lease_expires_at = ?, attempts = attempts + 1,'
+                    ' updated_at = ? WHERE id = ?',
+                    (RUNNING, worker_id, now + lease_seconds, now, row['id']),
+                )
+                job = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return dict(job)
+
+    def renew_leases(self, worker_id: str, lease_seconds: float, job_ids: Iterable[str]) -> None:
+        """Extend the leases of the given running jobs of ``worker_id``."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE jobs SET lease_expires_at = ? WHERE worker_id = ? AND status = ?'
+                f' AND id IN ({",".join("?" * len(job_ids))})',
+                (time.time() + lease_seconds, worker_id, RUNNING, *job_ids),
+            )
+
+    def requeue_expired(self, max_attempts: int) -> int:
+        """Put running jobs whose worker died back in the queue; give up after ``max_attempts``."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Worker stopped while processing the job', updated_at = ?"
+                ' WHERE status = ? AND lease_expires_at < ? AND attempts >= ?',
+                (FAILED, now, RUNNING, now, max_attempts),
+            )
+            cursor = self._conn.execute(
+                'UPDATE jobs SET status = ?, worker_id = NULL, progress_done = 0, updated_at = ?'
+                ' WHERE status = ? AND lease_expires_at < ?',
+                (QUEUED, now, RUNNING, now),
+            )
+        return cursor.rowcount
+
+    def update_progress(self, job_id: str, done: int, total: int) -> bool:
+        """Record chunk progress and return whether cancellation has been requested."""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET progress_done = ?, progress_total = ?, updated_at = ? WHERE id = ?',
+                (done, total, time.time(), job_id),
+            )
+            row = self._conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def finish(self, job_id: str, status: str, result: Dict[str, Any] = None, error: str = None) -> None:
+        """Store the outcome of a job and drop its uploaded data."""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, data = NULL, lease_expires_at = NULL,'
+                ' updated_at = ? WHERE id = ?',
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 time.time(), job_id),
+            )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job; queued jobs stop immediately, running ones within their worker's poll interval."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                status = row['status']
+                if status == QUEUED:
+                    status = CANCELLED
+                    self._conn.execute(
+                        'UPDATE jobs SET status = ?, data = NULL, updated_at = ? WHERE id = ?',
+                        (CANCELLED, time.time(), job_id),
+                    )
+                elif status == RUNNING:
+                    self._conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return status
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the public state of a job, without its uploaded data."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, filename, status, progress_done, progress_total, result, error, cancel_requested,'
+                ' created_at, updated_at FROM jobs WHERE id = ?',
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def purge_finished(self, older_than_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                f'DELETE FROM jobs WHERE status IN ({",".join("?" * len(FINISHED_STATUSES))}) AND updated_at < ?',
+                (*FINISHED_STATUSES, time.time() - older_than_seconds),
+            )
+
+
+def create_job_store() -> JobStore:
+    """Create the job store shared by every worker process."""
+    return JobStore(os.getenv('PDF_JOB_DB') or os.path.join(default_cache_dir(), 'pdf_jobs.sqlite3'))
+
+
+class JobWorkerPool:
+    """Background threads that take jobs from a JobStore and run them through the PDF service.
+
+    ``service`` may also be a function returning the service, called when
+    the first job runs, so that starting the workers does not build it.
+    """
+
+    def __init__(self, service, store: JobStore, workers: int = 2, poll_interval: float = 1.0,
+                 lease_seconds: float = 120.0, max_attempts: int = 3, retention_seconds: float = 7 * 24 * 3600):
+        self.service = service
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self.worker_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._pid = None
+        # Jobs being run by this pool; only their leases are renewed
+        self._running = set()
+
+    @classmethod
+    def from_env(cls, service, store: JobStore) -> 'JobWorkerPool':
+        return cls(
+            service,
+            store,
+            workers=env_int('PDF_JOB_WORKERS', 2),
+            lease_seconds=env_int('PDF_JOB_LEASE_SECONDS', 120),
+            max_attempts=env_int('PDF_JOB_MAX_ATTEMPTS', 3),
+            retention_seconds=env_int('PDF_JOB_RETENTION_SECONDS', 7 * 24 * 3600),
+        )
+
+    def ensure_started(self) -> None:
+        """Start the worker threads once per process (threads do not survive a fork)."""
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [threading.Thread(target=self._maintain, name='pdf-job-maintenance', daemon=True)]
+            self._threads += [
+                threading.Thread(target=self._work, name=f'pdf-job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been queued."""
+        self._wakeup.set()
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.poll_interval * 2 ** failures, self.lease_seconds / 4)
+
+    def _maintain(self) -> None:
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                self.store.renew_leases(self.worker_id, self.lease_seconds, list(self._running))
+                if self.store.requeue_expired(self.max_attempts):
+                    self._wakeup.set()
+                self.store.purge_finished(self.retention_seconds)
+                failures = 0
+            except Exception:
+                # E.g. "database is locked"; the thread must outlive it, as it is only started once
+                failures += 1
+                logger.exception("PDF job maintenance failed, retrying")
+                self._stopping.wait(self._backoff(failures))
+                continue
+            self._stopping.wait(self.lease_seconds / 4)
+
+    def _work(self) -> None:
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim(self.worker_id, self.lease_seconds)
+                if job is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._running.add(job['id'])
+                try:
+                    self.run_job(job)
+                finally:
+                    # A job whose outcome could not be stored is requeued once its lease expires
+                    self._running.discard(job['id'])
+                failures = 0
+            except Exception:
+                failures += 1
+                logger.exception("PDF job worker failed, retrying")
+                self._stopping.wait(self._backoff(failures))
+
+    def run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job['id']
+        # The callback runs on the shared event loop, so progress is written to the store from this thread
+        progress: queue.Queue = queue.Queue()
+
+        try:
+            service = self.service() if callable(self.service) else self.service
+            future = asyncio.run_coroutine_threadsafe(
+                service.process_pdf(io.BytesIO(job['data']), filename=job['filename'],
+                                    progress_callback=lambda done, total: progress.put((done, total))),
+                get_event_loop(),
+            )
+            future.add_done_callback(lambda _: progress.put(None))
+            finished = False
+            while not finished:
+                try:
+                    updates = [progress.get(timeout=self.poll_interval)]
+                except queue.Empty:
+                    updates = []
+                while not progress.empty():
+                    updates.append(progress.get_nowait())
+                finished = None in updates
+                updates = [update for update in updates if update is not None]
+                if updates:
+                    cancel_requested = self.store.update_progress(job_id, *updates[-1])
+                else:
+                    # Nothing reported yet, e.g. while pages are extracted or the location is requested
+                    cancel_requested = self.store.is_cancel_requested(job_id)
+                if cancel_requested:
+                    future.cancel()
+                    raise JobCancelled(job_id)
+            document = future.result()
+            self.store.finish(job_id, COMPLETED, result={'filename': document.filename, 'summary': document.summary})
+        except JobCancelled:
+            self.store.finish(job_id, CANCELLED)
+        except Exception as e:
+            logger.error("Error processing PDF job %s: %s", job_id, e)
+            self.store.finish(job_id, FAILED, error=str(e))
@@ -0,0 +1,30 @@
+import importlib.util
+
+import httpx
+
+from app.features.shared.utils import env_bool, env_float, env_int
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)."""
+    return importlib.util.find_spec('h2') is not None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create the connection pool for OpenAI requests, configured through LLM_HTTP_* variables.
+
+    Connections are kept alive between requests, so they only pay the TCP
+    and TLS handshakes once as long as the client is used from one event
+    loop (see ``app.features.shared.event_loop``).
+    """
+    return httpx.AsyncClient(
+        http2=env_bool('LLM_HTTP2', True) and http2_available(),
+        limits=httpx.Limits(
+            max_connections=env_int('LLM_HTTP_MAX_CONNECTIONS', 32),
+            max_keepalive_connections=env_int('LLM_HTTP_MAX_KEEPALIVE', 16),
+            keepalive_expiry=env_float('LLM_HTTP_KEEPALIVE_SECONDS', 60.0),
+        ),
+        # The scheduler enforces the overall request timeout
+        timeout=httpx.Timeout(env_float('LLM_HTTP_CONNECT_TIMEOUT', 10.0), read=None),
+        follow_redirects=True,
+    )
@@ -1,7 +1,8 @@
 class PDFDocument:
     """Model for PDF document processing."""
     
-    def __init__(self, filename, content, summary=None):
+    def __init__(self, filename, content, summary=None, timings=None):
         self.filename = filename
         self.content = content
-        self.summary = summary 
\ No newline at end of file
+        self.summary = summary
+        self.timings = timings or {} 
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Parsing of the model's defect list answers into validated defects.
+
+Defects are validated with the ``MinimalDefect`` model and passed on as
+plain dicts, which is how they are cached and serialized.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.domain.models import MinimalDefect
+
+logger = logging.getLogger(__name__)
+
+DEFECT_LIST_ADAPTER = TypeAdapter(List[MinimalDefect])
+
+# Markdown code fences around the whole answer, e.g. ```json ... ```
+CODE_FENCE_PATTERN = re.compile(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$')
+NO_ANSWER_PATTERN = re.compile(r"^\W*I don'?t know\W*$", re.IGNORECASE)
+
+
+def load_json_response(raw_response: str) -> Any:
+    """Decode the JSON value of an answer, ignoring code fences and text around it.
+
+    Raises ``ValueError`` when the answer holds no JSON value.
+    """
+    text = CODE_FENCE_PATTERN.sub('', raw_response)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    # e.g. "Here are the defects: [...]"
+    starts = [index for index in (text.find('{'), text.find('[')) if index >= 0]
+    if not starts:
+        raise ValueError('No JSON value in the answer')
+    value, _ = json.JSONDecoder().raw_decode(text, min(starts))
+    return value
+
+
+def validate_defects(value: Any) -> List[Dict[str, str]]:
+    """Validate a list of defects; raises ``ValidationError`` when any of them is malformed."""
+    return [defect.model_dump() for defect in DEFECT_LIST_ADAPTER.validate_python(value)]
+
+
+def parse_defect_list(raw_response: str) -> Optional[List[Dict[str, str]]]:
+    """Parse a chunk answer, ``{"defects": [...]}`` or a bare list, or return None if it is not valid."""
+    if NO_ANSWER_PATTERN.match(raw_response):
+        return []
+    try:
+        value = load_json_response(raw_response)
+        if isinstance(value, dict):
+            value = value.get('defects')
+        if not isinstance(value, list):
+            logger.warning("Unexpected result: %s", raw_response)
+            return None
+        return validate_defects(value)
+    except (ValueError, ValidationError) as e:
+        # JSONDecodeError is a ValueError
+        logger.warning("Invalid defect list: %s", e)
+        logger.debug("Raw defect list: %s", raw_response)
+        return None
+
+
+def parse_keyed_defect_lists(raw_response: str, chunk_count: int) -> Dict[int, List[Dict[str, str]]]:
+    """Parse a batched answer into ``{chunk position: defects}``.
+
+    Sections missing from the answer or with malformed defects are left out,
+    so that only they are asked for again one by one.
+    """
+    try:
+        keyed = load_json_response(raw_response)
+    except ValueError as e:
+        logger.warning("Invalid batched response: %s", e)
+        return {}
+    if not isinstance(keyed, dict):
+        logger.warning("Unexpected batched result: %s", raw_response)
+        return {}
+
+    parsed = {}
+    for index in range(chunk_count):
+        try:
+            parsed[index] = validate_defects(keyed[str(index)])
+        except (KeyError, ValidationError):
+            continue
+    return parsed
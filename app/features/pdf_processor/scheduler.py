@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import openai
+
+from app.features.pdf_processor.chunking import estimate_tokens
+from app.features.shared.utils import env_float, env_int
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+# Failures worth retrying; anything else (bad request, auth) is returned to the caller immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Local token estimate for a chat request, including per-message overhead."""
+    return sum(estimate_tokens(message.get('content') or '') for message in messages) + 4 * len(messages)
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Return the server-requested delay in seconds from a rate limit error, if any."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate_per_minute``.
+
+    Callers reserve capacity up front and then sleep for their share of the
+    deficit, so waiting requests are served in arrival order and the bucket
+    works from any event loop.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock=time.monotonic):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens and return how long the caller must wait before using them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    async def acquire(self, amount: float = 1) -> None:
+        delay = self.reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class LLMRequestScheduler:
+    """Runs LLM requests with bounded concurrency, rate limits, timeouts and retries.
+
+    The concurrency limit applies per event loop; the requests/min and
+    tokens/min budgets are shared by everything using the scheduler.
+    """
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: float = 500,
+                 tokens_per_minute: float = 200000, max_retries: int = 5,
+                 request_timeout: Optional[float] = 60.0, backoff_base: float = 1.0,
+                 backoff_max: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'rate_limited': 0, 'timeouts': 0, 'failures': 0}
+
+    @classmethod
+    def from_env(cls) -> 'LLMRequestScheduler':
+        """Build a scheduler configured through LLM_* environment variables."""
+        return cls(
+            max_concurrency=env_int('LLM_MAX_CONCURRENCY', 8),
+            requests_per_minute=env_float('LLM_REQUESTS_PER_MINUTE', 500),
+            tokens_per_minute=env_float('LLM_TOKENS_PER_MINUTE', 200000),
+            max_retries=env_int('LLM_MAX_RETRIES', 5),
+            request_timeout=env_float('LLM_REQUEST_TIMEOUT', 60.0),
+            backoff_base=env_float('LLM_BACKOFF_BASE', 1.0),
+            backoff_max=env_float('LLM_BACKOFF_MAX', 30.0),
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Delay before retry ``attempt``: Retry-After when given, else jittered exponential backoff.
+
+        Both are capped at ``backoff_max``.
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after + random.uniform(0, self.backoff_base / 4), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def submit(self, request_factory: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """Run ``request_factory()`` under the limits, retrying retryable failures."""
+        self._count('requests')
+        attempt = 0
+        while True:
+            async with self._semaphore():
+                await self.request_bucket.acquire(1)
+                if estimated_tokens:
+                    await self.token_bucket.acquire(estimated_tokens)
+                self._count('attempts')
+                try:
+                    if self.request_timeout:
+                        return await asyncio.wait_for(request_factory(), self.request_timeout)
+                    return await request_factory()
+                except RETRYABLE_ERRORS as e:
+                    error = e
+                    if isinstance(e, openai.RateLimitError):
+                        self._count('rate_limited')
+                    elif isinstance(e, asyncio.TimeoutError):
+                        self._count('timeouts')
+
+            retry_after = get_retry_after(error)
+            if attempt >= self.max_retries or (retry_after is not None and retry_after > self.backoff_max):
+                # A server asking to wait longer than backoff_max fails the request rather than parking it
+                self._count('failures')
+                raise error
+            delay = self.backoff_delay(attempt, error)
+            attempt += 1
+            self._count('retries')
+            logger.warning("LLM request failed (%s), retry %d/%d in %.1fs", type(error).__name__, attempt, self.max_retries, delay)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats)
@@ -1,16 +1,36 @@
 import os
-from typing import List, Dict, Any
-from PyPDF2 import PdfReader
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple, Union
 from openai import OpenAI, AsyncOpenAI
-from dotenv import load_dotenv
+from app.features.defect_store.models import DefectStore
 from app.features.pdf_processor.models import PDFDocument
+from app.features.pdf_processor.chunking import chunk_text, iter_chunks
+from app.features.pdf_processor.dedup import DefectIndex, deduplicate_defects
+from app.features.pdf_processor.extraction import create_page_cache, iter_pdf_pages
+from app.features.pdf_processor.llm_client import create_http_client
+from app.features.pdf_processor.responses import parse_defect_list, parse_keyed_defect_lists
+from app.features.pdf_processor.scheduler import LLMRequestScheduler, estimate_message_tokens
+from app.features.shared.cache import SQLiteCache, default_cache_dir, hash_key, sha256_hexdigest
+from app.features.shared.metrics import (COUNT_BUCKETS, REGISTRY, SIZE_BUCKETS, TOKEN_BUCKETS, count_cache_lookup,
+                                         record_span, span)
+from app.features.shared.uploads import Source, read_source, source_name
+from app.features.shared.utils import env_bool, env_float, env_int
 from app.domain.models import MinimalDefect
 import asyncio
+from contextlib import aclosing
 import json
+import logging
 import re
+import threading
+import time
 
-# Load environment variables
-load_dotenv(override=True)  # Add override=True to force reload
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gpt-4o-mini"
+
+LLM_TOKENS = REGISTRY.histogram('llm_tokens', 'Tokens per LLM request, as reported by the API.', TOKEN_BUCKETS,
+                                label_names=('direction',))
+PDF_CHUNKS = REGISTRY.histogram('pdf_chunks', 'Chunks per processed PDF.', COUNT_BUCKETS)
+FILE_SIZE = REGISTRY.histogram('upload_size_bytes', 'Size of processed files.', SIZE_BUCKETS, label_names=('feature',))
 
 ASSISTANT_SYSTEM_PROMPT = """
                     You are a helpful assistant that searches through documents and finds relevant info for the user. 
@@ -55,16 +75,18 @@ P.29A - okno do regulacji
 </defect-examples>
 
 Your answer should strictly follow a json format:
-[
-    {
-        "name": "Latarnia doświetleniowa - zmurszenie blachy (dziura) przy oknie",
-        "location":"Sąd Rejonowy w Zamości Kiosk I - sala rozpraw nr 30"
-    },
-    {
-        "name": "Okno do regulacji",
-        "location":"Sąd Rejonowy w Zamości P.29A"
-    }
-]
+{
+    "defects": [
+        {
+            "name": "Latarnia doświetleniowa - zmurszenie blachy (dziura) przy oknie",
+            "location":"Sąd Rejonowy w Zamości Kiosk I - sala rozpraw nr 30"
+        },
+        {
+            "name": "Okno do regulacji",
+            "location":"Sąd Rejonowy w Zamości P.29A"
+        }
+    ]
+}
 
 Destructure the defect in the document as in the example above.
 
@@ -81,41 +103,173 @@ def get_defect_list_instructions(location_prompt: str) -> str:
 
     """
 
+BATCHED_DEFECT_LIST_INSTRUCTIONS = """\n
+The document below is split into sections delimited with <chunk id="..."> and </chunk> tags.
+List the defects of every section separately and answer with a single json object
+mapping each section id to the list of its defects (instead of a "defects" list), e.g.:
+{"0": [{"name": "Okno do regulacji", "location": "Sąd Rejonowy w Zamości P.29A"}], "1": []}
+
+Include every section id, with an empty list for sections without defects.
+"""
+
+# Asked of the model when an answer is not a valid defect list
+INVALID_ANSWER_PROMPT = "Your answer is not a valid json object in the required format. Answer again with the json object only."
+
+# JSON mode: the model can only answer with a json object
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
 def get_document_delimited(text: str) -> str:
     return f"<document>{text}</document>"
 
+def get_chunks_delimited(chunks: List[str]) -> str:
+    """Sections of a batched request, identified by their position in ``chunks``."""
+    sections = "".join(f'<chunk id="{index}">\n{chunk}\n</chunk>\n' for index, chunk in enumerate(chunks))
+    return get_document_delimited(sections)
+
+def get_prompt_version(*settings: Any) -> str:
+    """Fingerprint of the prompts, model and the processing ``settings``, so changing any invalidates cached results."""
+    return hash_key(
+        MODEL_NAME,
+        ASSISTANT_SYSTEM_PROMPT,
+        DEFECTS_LOCATION_INSTRUCTIONS,
+        DEFECT_LIST_INSTRUCTIONS,
+        BATCHED_DEFECT_LIST_INSTRUCTIONS,
+        get_defect_list_instructions("{location}"),
+        *settings,
+    )
+
+def get_instructions_version() -> str:
+    """Fingerprint of the defect list prompts and model used for each chunk."""
+    return hash_key(MODEL_NAME, ASSISTANT_SYSTEM_PROMPT, DEFECT_LIST_INSTRUCTIONS, BATCHED_DEFECT_LIST_INSTRUCTIONS,
+                    get_defect_list_instructions("{location}"))
+
+def normalize_chunk(chunk: str) -> str:
+    """Collapse whitespace so re-extracted but otherwise unchanged chunks share a cache key."""
+    return "\n".join(" ".join(line.split()) for line in chunk.split("\n") if line.strip())
+
+def get_chunk_cache_key(chunk: str, location_prompt: str) -> str:
+    return hash_key(normalize_chunk(chunk), location_prompt.strip(), get_instructions_version(), MODEL_NAME)
+
+# "...budynku Sądu Okręgowego i Rejonowego w Zamościu przeprowadzonego w dniach..."
+BUILDING_PATTERN = re.compile(
+    r'\bbudynk(?:u|ów)\s+(.{5,120}?)(?=\s+(?:przeprowadzon\w*|sporządzon\w*|w\s+dniach|w\s+dniu|w\s+okresie|dnia)\b|[,.;]|$)',
+    re.IGNORECASE | re.MULTILINE,
+)
+# "Zamość, dnia 08 kwietnia 2022 r."
+PLACE_AND_DATE_PATTERN = re.compile(r'^\s*([A-ZĄĆĘŁŃÓŚŹŻ][\w\- ]{1,40}?),\s*(?:dnia|dn\.)', re.MULTILINE)
+
+# Number of lines at the beginning of a report searched for its location
+GUESS_MAX_LINES = 40
+
+NO_TEXT_MESSAGE = "No readable text found in the PDF. The document might be scanned or contain only images."
+
+def guess_report_location(text: str, max_lines: int = GUESS_MAX_LINES) -> Optional[str]:
+    """Cheap guess of the report location from the first lines, used before the LLM answers."""
+    head = " ".join(line.strip() for line in text.split("\n")[:max_lines])
+    match = BUILDING_PATTERN.search(head)
+    if match:
+        return match.group(1).strip()
+    match = PLACE_AND_DATE_PATTERN.search("\n".join(text.split("\n")[:max_lines]))
+    if match:
+        return match.group(1).strip()
+    return None
+
+def is_valid_location(location: Optional[str]) -> bool:
+    """Whether an LLM location answer names a place, rather than reporting an error or no answer."""
+    answer = (location or "").strip()
+    return bool(answer) and not answer.startswith("Error") and answer.rstrip(".") != "I don't know"
+
+def relabel_defects(defects: List[MinimalDefect], guessed_location: str, location: str) -> List[MinimalDefect]:
+    """Replace the guessed building name in defect locations with the location found by the LLM."""
+    pattern = re.compile(re.escape(guessed_location), re.IGNORECASE)
+    return [
+        {**defect, 'location': pattern.sub(location, str(defect.get('location', '')))}
+        for defect in defects
+    ]
+
+def create_result_cache() -> SQLiteCache:
+    """Create the persistent cache of processed PDF results."""
+    return SQLiteCache(
+        os.path.join(default_cache_dir(), 'pdf_results.sqlite3'),
+        max_entries=env_int('PDF_RESULT_CACHE_MAX_ENTRIES', 500),
+        max_bytes=env_int('PDF_RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+        ttl_seconds=env_int('PDF_RESULT_CACHE_TTL_SECONDS', 30 * 24 * 3600),
+    )
+
+def create_chunk_cache() -> SQLiteCache:
+    """Create the persistent cache of per-chunk defect lists, shared by all workers."""
+    return SQLiteCache(
+        os.path.join(default_cache_dir(), 'pdf_chunks.sqlite3'),
+        max_entries=env_int('PDF_CHUNK_CACHE_MAX_ENTRIES', 50000),
+        max_bytes=env_int('PDF_CHUNK_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+        ttl_seconds=env_int('PDF_CHUNK_CACHE_TTL_SECONDS', 30 * 24 * 3600),
+    )
+
 
 class PDFProcessorService:
     """Service for processing PDFs and generating summaries."""
     
-    def __init__(self):
-        api_key = os.getenv('OPENAI_API_KEY')
-        print(f"Loading OpenAI API key: {'Found' if api_key else 'Not found'}")
+    def __init__(self, result_cache: SQLiteCache = None, chunk_cache: SQLiteCache = None,
+                 scheduler: LLMRequestScheduler = None, api_key: str = None, base_url: str = None,
+                 page_cache: SQLiteCache = None, defect_store: DefectStore = None):
+        self.result_cache = result_cache if result_cache is not None else create_result_cache()
+        self.chunk_cache = chunk_cache if chunk_cache is not None else create_chunk_cache()
+        self.page_cache = page_cache if page_cache is not None else create_page_cache()
+        # Processed documents are recorded here when given, e.g. by the views
+        self.defect_store = defect_store
+        self.extraction_workers = env_int('PDF_EXTRACTION_WORKERS', os.cpu_count() or 1)
+        self.scheduler = scheduler if scheduler is not None else LLMRequestScheduler.from_env()
+        self.chunk_target_tokens = env_int('PDF_CHUNK_TARGET_TOKENS', 1200)
+        self.chunk_overlap_lines = env_int('PDF_CHUNK_OVERLAP_LINES', 1)
+        self.speculative_location = env_bool('PDF_SPECULATIVE_LOCATION', True)
+        self.batch_concurrency = env_int('PDF_BATCH_CONCURRENCY', 4)
+        # Chunks sent together in one defect list request; 1 sends every chunk on its own
+        self.chunks_per_request = env_int('PDF_CHUNKS_PER_REQUEST', 1)
+        # Request JSON mode for defect lists; off for OpenAI-compatible servers without it
+        self.json_mode = env_bool('PDF_JSON_MODE', True)
+        # Extra requests for a chunk whose answer is not a valid defect list
+        self.chunk_parse_retries = env_int('PDF_CHUNK_PARSE_RETRIES', 2)
+        # Similarity from which defects with the same room identifiers are merged; 1 only drops exact duplicates
+        self.dedup_threshold = env_float('PDF_DEDUP_THRESHOLD', 0.8)
+
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        logger.info("Loading OpenAI API key: %s", 'Found' if api_key else 'Not found')
         if not api_key:
-            print("WARNING: OPENAI_API_KEY environment variable is not set")
+            logger.warning("OPENAI_API_KEY environment variable is not set")
             # We'll initialize without the key, but operations will fail
             self.client = None
             self.client_async = None
         else:
-            self.client = OpenAI(api_key=api_key)
-            self.client_async = AsyncOpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, base_url=base_url)
+            # Retries are handled by the scheduler, which also honours Retry-After
+            self.client_async = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                            http_client=create_http_client())
     
-    def read_pdf(self, file_path):
-        """Read a PDF file and extract its text content."""
+    def get_result_cache_key(self, file_hash: str) -> str:
+        """Result cache key of a document, covering the settings that change its prompts, chunks and deduplication."""
+        return hash_key(file_hash, get_prompt_version(self.chunk_target_tokens, self.chunk_overlap_lines,
+                                                      self.chunks_per_request, self.dedup_threshold,
+                                                      self.speculative_location, self.json_mode))
+
+    def iter_pdf_text(self, data: bytes, file_hash: str = None) -> Iterator[str]:
+        """Yield the text of each page that has any, extracting large documents in parallel."""
+        for page_text in iter_pdf_pages(data, file_hash or sha256_hexdigest(data), self.page_cache,
+                                        workers=self.extraction_workers):
+            if page_text:  # Only add if text was successfully extracted
+                yield page_text + "\n"
+
+    def read_pdf(self, source: Source):
+        """Read a PDF file (path or binary file object) and extract its text content."""
         try:
-            reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:  # Only add if text was successfully extracted
-                    text += page_text + "\n"
+            with span('read_pdf'):
+                text = "".join(self.iter_pdf_text(read_source(source)))
             
             if not text.strip():
-                return "No readable text found in the PDF. The document might be scanned or contain only images."
+                return NO_TEXT_MESSAGE
                 
             return text
         except Exception as e:
-            print(f"Error reading PDF: {str(e)}")
+            logger.error("Error reading PDF: %s", e)
             return f"Error reading PDF: {str(e)}"
     
     def ask_llm(self, text, messages, max_length=500):
@@ -130,15 +284,15 @@ class PDFProcessorService:
             
         try:
             response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+                model=MODEL_NAME,
                 messages=messages
             )
             return response.choices[0].message.content
         except Exception as e:
-            print(f"OpenAI API error: {str(e)}")
+            logger.error("OpenAI API error: %s", e)
             return f"Error asking llm: {str(e)}"
         
-    async def ask_llm_async(self, text, messages, max_length=500):
+    async def ask_llm_async(self, text, messages, max_length=500, response_format=None):
         """Ask llms questions about text using OpenAI's API."""
         if not self.client:
             return "Error: OpenAI API key not configured. Please set the OPENAI_API_KEY environment variable."
@@ -149,13 +303,21 @@ class PDFProcessorService:
             text = text[:max_text_length] + "... [text truncated due to length]"
             
         try:
-            response = await self.client_async.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages
-            )
+            with span('ask_llm'):
+                response = await self.scheduler.submit(
+                    lambda: self.client_async.chat.completions.create(
+                        model=MODEL_NAME,
+                        messages=messages,
+                        **({'response_format': response_format} if response_format else {})
+                    ),
+                    estimated_tokens=estimate_message_tokens(messages),
+                )
+            if response.usage is not None:
+                LLM_TOKENS.observe(response.usage.prompt_tokens, direction='in')
+                LLM_TOKENS.observe(response.usage.completion_tokens, direction='out')
             return response.choices[0].message.content
         except Exception as e:
-            print(f"OpenAI API error: {str(e)}")
+            logger.error("OpenAI API error: %s", e)
             return f"Error asking llm: {str(e)}"
 
     def generate_report_location(self, text) -> str:
@@ -163,59 +325,401 @@ class PDFProcessorService:
                     { "role": "system", "content": ASSISTANT_SYSTEM_PROMPT},
                     {"role": "user", "content": DEFECTS_LOCATION_INSTRUCTIONS + get_document_delimited(text)},
                 ]) + "\n\n"
-    
-    async def generate_defect_list(self, text: str, location_prompt: str) -> List[MinimalDefect]:
-        lines = text.split("\n")
-        chunk_size = 15
 
-        async def process_chunk(chunk):
-            """Asynchronously process a single chunk."""
-            return await self.ask_llm_async(chunk, [
+    async def generate_report_location_async(self, text) -> str:
+        with span('generate_report_location'):
+            return await self.ask_llm_async(text, [
+                        { "role": "system", "content": ASSISTANT_SYSTEM_PROMPT},
+                        {"role": "user", "content": DEFECTS_LOCATION_INSTRUCTIONS + get_document_delimited(text)},
+                    ]) + "\n\n"
+
+    async def extract_chunk_defects(self, chunk: str, location_prompt: str) -> Optional[List[MinimalDefect]]:
+        """Extract the defects of a single chunk, reusing the cached defects of unchanged chunks.
+
+        An answer that is not a valid defect list is asked for again, up to
+        ``chunk_parse_retries`` times, so one bad answer does not cost a rerun
+        of the whole document. Returns None when the chunk still failed.
+        """
+        cache_key = get_chunk_cache_key(chunk, location_prompt)
+        cached = self.chunk_cache.get(cache_key)
+        count_cache_lookup('pdf_chunks', cached is not None)
+        if cached is not None:
+            return cached
+
+        messages = [
+            {"role": "system", "content": ASSISTANT_SYSTEM_PROMPT},
+            {"role": "user", "content": get_defect_list_instructions(location_prompt) + get_document_delimited(chunk)},
+        ]
+        for attempt in range(self.chunk_parse_retries + 1):
+            raw_defect_list = await self.ask_llm_async(
+                chunk, messages, response_format=JSON_RESPONSE_FORMAT if self.json_mode else None
+            )
+            if raw_defect_list.startswith(("Error asking llm", "Error: OpenAI API key")):
+                # The scheduler already retried the request itself
+                return None
+            with span('parse_defects'):
+                chunk_found_defects = parse_defect_list(raw_defect_list)
+            if chunk_found_defects is not None:
+                logger.debug("Found %d defects in chunk.", len(chunk_found_defects))
+                self.chunk_cache.set(cache_key, chunk_found_defects)
+                return chunk_found_defects
+            messages = messages[:2] + [
+                {"role": "assistant", "content": raw_defect_list},
+                {"role": "user", "content": INVALID_ANSWER_PROMPT},
+            ]
+        logger.warning("Giving up on a chunk after %d invalid answers.", self.chunk_parse_retries + 1)
+        return None
+
+    async def extract_chunk_batch(self, chunks: List[str], location_prompt: str) -> List[Optional[List[MinimalDefect]]]:
+        """Extract the defects of several chunks with one request, instructions included only once.
+
+        Cached chunks are not sent. Chunks missing from the keyed response, or
+        all of them when it does not parse, are asked for again one by one.
+        """
+        cache_keys = [get_chunk_cache_key(chunk, location_prompt) for chunk in chunks]
+        cached = self.chunk_cache.get_many(cache_keys)
+        for key in cache_keys:
+            count_cache_lookup('pdf_chunks', key in cached)
+        results: Dict[int, List[MinimalDefect]] = {
+            index: cached[key] for index, key in enumerate(cache_keys) if key in cached
+        }
+        missing = [index for index in range(len(chunks)) if index not in results]
+
+        if len(missing) > 1:
+            sent = [chunks[index] for index in missing]
+            delimited = get_chunks_delimited(sent)
+            raw_response = await self.ask_llm_async(delimited, [
                 {"role": "system", "content": ASSISTANT_SYSTEM_PROMPT},
-                {"role": "user", "content": get_defect_list_instructions(location_prompt) + get_document_delimited(chunk)},
-            ])
+                {"role": "user", "content": get_defect_list_instructions(location_prompt)
+                    + BATCHED_DEFECT_LIST_INSTRUCTIONS + delimited},
+            ], response_format=JSON_RESPONSE_FORMAT if self.json_mode else None)
+            with span('parse_defects'):
+                parsed = parse_keyed_defect_lists(raw_response, len(sent))
+            logger.debug("Found %d defects in %d of %d batched chunks.", sum(map(len, parsed.values())), len(parsed), len(sent))
+            self.chunk_cache.set_many({cache_keys[missing[position]]: defects for position, defects in parsed.items()})
+            results.update({missing[position]: defects for position, defects in parsed.items()})
+            missing = [index for index in missing if index not in results]
 
-        # Split text into chunks
-        chunks = ["\n".join(lines[i:i + chunk_size]) for i in range(0, len(lines), chunk_size)]
+        retried = await asyncio.gather(*(
+            self.extract_chunk_defects(chunks[index], location_prompt) for index in missing
+        ))
+        results.update(zip(missing, retried))
+        return [results[index] for index in range(len(chunks))]
 
-        # Create asyncio tasks for each chunk
-        tasks = [process_chunk(chunk) for chunk in chunks]
+    def start_chunk_tasks(self, chunks: List[str], location_prompt: str) -> List[asyncio.Future]:
+        """Start extracting ``chunks`` and return one task per chunk resolving to its defects.
 
-        # Run tasks concurrently and gather results
-        defect_lists_results = await asyncio.gather(*tasks)
+        With ``chunks_per_request`` above 1, consecutive chunks share a batched request.
+        """
+        if self.chunks_per_request <= 1:
+            return [asyncio.ensure_future(self.extract_chunk_defects(chunk, location_prompt)) for chunk in chunks]
 
-        all_defects: List[MinimalDefect] = []
+        async def chunk_defects(batch, position):
+            # Cancelling every chunk of a batch also cancels the batched request
+            return (await batch)[position]
 
-        for raw_defect_list in defect_lists_results:
-            sanitized_defect_list = raw_defect_list.replace("```", "").replace("json", '').replace("I don't know.", "").replace("I don't know", "")
-            try:
-                chunk_found_defects: List[MinimalDefect] = json.loads(sanitized_defect_list)
-                if isinstance(chunk_found_defects, list):
-                    print(f"Found {len(chunk_found_defects)} defects in chunk.")
-                    all_defects.extend(chunk_found_defects)
-                else:
-                    print(f"Unexpected result: {raw_defect_list}")
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {str(e)}")
-                print(f"Raw defect list: {raw_defect_list}")
+        tasks = []
+        for start in range(0, len(chunks), self.chunks_per_request):
+            group = chunks[start:start + self.chunks_per_request]
+            batch = asyncio.ensure_future(self.extract_chunk_batch(group, location_prompt))
+            tasks.extend(asyncio.ensure_future(chunk_defects(batch, position)) for position in range(len(group)))
+        return tasks
 
-        await asyncio.sleep(2)  #TODO this sleep does not work to avoid rate limits
-        print("Cleaning up event loop...")
-        # Join results and return
-        return all_defects
+    def split_chunks(self, text: str) -> List[str]:
+        """Split text into chunks packed up to the token budget, breaking only between entries."""
+        return chunk_text(text, target_tokens=self.chunk_target_tokens, overlap_lines=self.chunk_overlap_lines)
 
+    async def iter_chunk_defects(self, chunks: List[str], location_prompt: str) -> AsyncIterator[Tuple[int, List[MinimalDefect]]]:
+        """Yield ``(chunk_index, defects)`` for each chunk as soon as its request completes."""
+        async def process_chunk(index, chunk_task):
+            return index, await chunk_task
 
-    async def process_pdf(self, file_path):
-        """Process a PDF file and return a PDFDocument with summary."""
-        filename = os.path.basename(file_path)
-        content = self.read_pdf(file_path)
-        
-        location = self.generate_report_location(content)
+        # Run tasks concurrently (bounded and rate limited by the scheduler) in completion order
+        tasks = [
+            asyncio.ensure_future(process_chunk(index, chunk_task))
+            for index, chunk_task in enumerate(self.start_chunk_tasks(chunks, location_prompt))
+        ]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def generate_defect_list(self, text: str, location_prompt: str,
+                                   progress_callback: Callable[[int, int], None] = None) -> List[MinimalDefect]:
+        chunks = self.split_chunks(text)
+        defect_lists_results: Dict[int, List[MinimalDefect]] = {}
 
-        defects_lists = await self.generate_defect_list(content, location)
+        if progress_callback:
+            progress_callback(0, len(chunks))
 
-        return PDFDocument(
+        async with aclosing(self.iter_chunk_defects(chunks, location_prompt)) as chunk_results:
+            async for index, chunk_found_defects in chunk_results:
+                # A chunk that failed after its retries contributes no defects
+                defect_lists_results[index] = chunk_found_defects or []
+                if progress_callback:
+                    progress_callback(len(defect_lists_results), len(chunks))
+
+        all_defects: List[MinimalDefect] = []
+
+        for index in sorted(defect_lists_results):
+            all_defects.extend(defect_lists_results[index])
+
+        # Overlapping chunks can report the same defect twice
+        return deduplicate_defects(all_defects, self.dedup_threshold)
+
+    def build_document(self, file_hash: str, filename: str, content: str, location: str,
+                       defects_lists: List[MinimalDefect], failed_chunks: int = 0,
+                       guessed_location: str = None) -> PDFDocument:
+        """Wrap the extracted defects in a PDFDocument; cache and record it if processing succeeded.
+
+        The document's building is the LLM ``location`` or, when that is not a
+        valid answer (e.g. "I don't know"), the ``guessed_location`` if any.
+        """
+        document = PDFDocument(
             filename, 
             content, 
-            str(defects_lists).replace("'", '"') # format into json string
+            json.dumps(defects_lists, ensure_ascii=False)
             )
+
+        # Errors are reported as text rather than raised, so keep them out of the cache,
+        # as well as documents missing the defects of failed chunks
+        if (self.client and not failed_chunks and not content.startswith("Error reading PDF")
+                and not location.startswith("Error")):
+            building = location.strip() if is_valid_location(location) else (guessed_location or "")
+            self.result_cache.set(self.get_result_cache_key(file_hash),
+                                  {'content': document.content, 'summary': document.summary, 'location': building})
+            if self.defect_store is not None:
+                self.defect_store.record_document(file_hash, filename, building, defects_lists)
+
+        return document
+
+    def _extract_in_background(self, data: bytes, file_hash: str, loop: asyncio.AbstractEventLoop,
+                               events: asyncio.Queue, stop: threading.Event) -> None:
+        """Thread body pushing ``page`` and ``chunk`` events, then ``extracted`` (or ``extraction_failed``)."""
+        def push(event):
+            if stop.is_set():
+                return False
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, event)
+            except RuntimeError:  # The event loop is gone, nobody is listening anymore
+                stop.set()
+            return not stop.is_set()
+
+        def lines():
+            for page_text in self.iter_pdf_text(data, file_hash):
+                if not push(('page', page_text)):
+                    return
+                yield from page_text.split("\n")
+
+        try:
+            for chunk in iter_chunks(lines(), self.chunk_target_tokens, self.chunk_overlap_lines):
+                if not push(('chunk', chunk)):
+                    return
+            push(('extracted', None))
+        except Exception as e:
+            push(('extraction_failed', e))
+
+    async def iter_document_events(self, source: Source, filename: str = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Run the whole pipeline for one PDF, yielding events as results become available.
+
+        ``source`` is a path or a binary file object such as an upload stream.
+        Pages are extracted and chunked on a background thread while earlier
+        chunks are already being sent. Chunks are sent as soon as a location
+        prompt is known: a guess from the report beginning or, failing that,
+        the LLM location, which is requested once the full text is extracted.
+        Defects found with a guessed location are relabelled when the LLM
+        location arrives, unless the LLM failed or had no answer.
+
+        Yields ``('location', {...})`` (a guess has ``final: False``),
+        ``('defects', {...})`` per chunk in completion order with the defects
+        not seen before, and finally ``('document', PDFDocument)``.
+        """
+        started = time.perf_counter()
+        filename = filename or source_name(source)
+        data = read_source(source)
+        file_hash = sha256_hexdigest(data)
+        cache_key = self.get_result_cache_key(file_hash)
+
+        FILE_SIZE.observe(len(data), feature='pdf')
+
+        cached = self.result_cache.get(cache_key)
+        count_cache_lookup('pdf_results', cached is not None)
+        if cached is not None:
+            logger.info("Result cache hit for %s", filename)
+            if self.defect_store is not None:
+                # Unchanged documents are skipped by the writer; entries cached before the store lack a location
+                self.defect_store.record_document(file_hash, filename, cached.get('location', ''),
+                                                  json.loads(cached['summary']))
+            yield 'document', PDFDocument(filename, cached['content'], cached['summary'])
+            return
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        timings: Dict[str, float] = {}
+        pages: List[str] = []
+        chunks: List[str] = []
+        tasks: List[asyncio.Future] = []
+        defect_lists_results: Dict[int, List[MinimalDefect]] = {}
+        failed_chunks = 0
+        # Defects already streamed, so each event only carries new ones
+        streamed = DefectIndex(self.dedup_threshold)
+        content = None
+        location = None
+        location_task = None
+        location_prompt = None
+        guessed_location = None
+        may_guess = self.speculative_location
+
+        def start_chunks():
+            pending = chunks[len(tasks):]
+            if content is None:
+                # Until the whole text is extracted, only full batches are sent
+                pending = pending[:len(pending) - len(pending) % max(self.chunks_per_request, 1)]
+            for index, task in enumerate(self.start_chunk_tasks(pending, location_prompt), start=len(tasks)):
+                task.add_done_callback(lambda done, index=index: events.put_nowait(('chunk_done', (index, done))))
+                tasks.append(task)
+
+        threading.Thread(
+            target=self._extract_in_background, args=(data, file_hash, loop, events, stop), daemon=True
+        ).start()
+        try:
+            while content is None or location is None or len(defect_lists_results) < len(chunks):
+                kind, value = await events.get()
+
+                if kind == 'page':
+                    pages.append(value)
+                    if may_guess and location_prompt is None:
+                        head = "".join(pages)
+                        guessed_location = guess_report_location(head)
+                        if guessed_location:
+                            location_prompt = guessed_location
+                            yield 'location', {'location': guessed_location, 'final': False}
+                            start_chunks()
+                        elif head.count("\n") >= GUESS_MAX_LINES:
+                            may_guess = False
+
+                elif kind == 'chunk':
+                    chunks.append(value)
+                    if location_prompt is not None:
+                        start_chunks()
+
+                elif kind in ('extracted', 'extraction_failed'):
+                    timings['read_pdf'] = time.perf_counter() - started
+                    # Extracted on a background thread, so timed here
+                    record_span('read_pdf', timings['read_pdf'])
+                    if kind == 'extraction_failed':
+                        logger.error("Error reading PDF: %s", value)
+                        content = f"Error reading PDF: {str(value)}"
+                    else:
+                        content = "".join(pages)
+                    if content.startswith("Error reading PDF") or not content.strip():
+                        # Nothing to send to the model
+                        yield 'document', self.build_document(file_hash, filename, content or NO_TEXT_MESSAGE, "", [])
+                        return
+                    location_task = asyncio.ensure_future(self.generate_report_location_async(content))
+                    location_task.add_done_callback(lambda done: events.put_nowait(('location_done', done)))
+                    if location_prompt is not None:
+                        start_chunks()
+
+                elif kind == 'location_done':
+                    location = value.result()
+                    timings['location'] = time.perf_counter() - started
+                    if location_prompt is None:
+                        location_prompt = location
+                        start_chunks()
+                    if is_valid_location(location):
+                        yield 'location', {'location': location.strip(), 'final': True}
+
+                elif kind == 'chunk_done':
+                    index, task = value
+                    chunk_found_defects = task.result()
+                    if chunk_found_defects is None:
+                        failed_chunks += 1
+                        chunk_found_defects = []
+                    defect_lists_results[index] = chunk_found_defects
+                    new_defects = [defect for defect in chunk_found_defects if streamed.add(defect)]
+                    if guessed_location and is_valid_location(location):
+                        new_defects = relabel_defects(new_defects, guessed_location, location.strip())
+                    yield 'defects', {
+                        'chunk': index,
+                        'done': len(defect_lists_results),
+                        'total': len(chunks),
+                        'extracted': content is not None,
+                        'failed': task.result() is None,
+                        'defects': new_defects,
+                    }
+        finally:
+            # Also runs when the consumer stops early, e.g. a cancelled job or a disconnected client
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            if location_task is not None:
+                location_task.cancel()
+
+        timings['defects'] = time.perf_counter() - started
+        all_defects = deduplicate_defects(
+            (defect for index in sorted(defect_lists_results) for defect in defect_lists_results[index]),
+            self.dedup_threshold,
+        )
+        if guessed_location and is_valid_location(location):
+            # Otherwise the defects keep the guessed location
+            all_defects = relabel_defects(all_defects, guessed_location, location.strip())
+
+        if failed_chunks:
+            logger.warning("%d of %d chunks of %s failed, the result is not cached", failed_chunks, len(chunks), filename)
+        document = self.build_document(file_hash, filename, content, location, all_defects, failed_chunks,
+                                       guessed_location)
+        document.timings = {**timings, 'total': time.perf_counter() - started}
+        PDF_CHUNKS.observe(len(chunks))
+        record_span('process_pdf', document.timings['total'])
+        logger.info("Timings for %s: %s", filename, document.timings)
+        yield 'document', document
+
+    async def process_pdf(self, source: Source, filename: str = None,
+                          progress_callback: Callable[[int, int], None] = None):
+        """Process a PDF file and return a PDFDocument with summary.
+
+        ``progress_callback(done, total)`` is called as defect extraction chunks
+        complete; ``total`` can still grow while pages are being extracted.
+        """
+        async with aclosing(self.iter_document_events(source, filename)) as events:
+            async for event, data in events:
+                if event == 'defects' and progress_callback:
+                    progress_callback(data['done'], data['total'])
+                elif event == 'document':
+                    return data
+
+    async def process_batch(self, files: List[Tuple[str, Source]],
+                            concurrency: int = None) -> List[Union[PDFDocument, Exception]]:
+        """Process several PDFs concurrently, at most ``concurrency`` documents at a time.
+
+        All documents share this service's client and the scheduler's rate budget,
+        so chunk requests of different files interleave. Results (a PDFDocument or
+        the exception raised for that file) keep the order of ``files``.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.batch_concurrency)
+
+        async def process(filename, source):
+            async with semaphore:
+                return await self.process_pdf(source, filename=filename)
+
+        return await asyncio.gather(*(process(filename, source) for filename, source in files), return_exceptions=True)
+
+    async def stream_pdf(self, source: Source, filename: str = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Process a PDF file, yielding results as they become available.
+
+        Yields ``location`` events (a guessed location has ``final: false`` and
+        is followed by the LLM location, if it gave a valid one), one ``defects`` event per chunk in
+        completion order (with defects not seen in earlier chunks) and a final
+        ``done`` event carrying the same summary as ``process_pdf``. Cached
+        documents only yield ``done``.
+        """
+        async with aclosing(self.iter_document_events(source, filename)) as events:
+            async for event, data in events:
+                if event == 'document':
+                    yield 'done', {'filename': data.filename, 'summary': data.summary}
+                else:
+                    yield event, data
@@ -4,6 +4,17 @@ document.addEventListener('DOMContentLoaded', function () {
     const errorSection = document.getElementById('error-section');
     const summaryText = document.getElementById('summary-text');
     const errorMessage = document.querySelector('.error-message');
+    const progressSection = document.getElementById('progress-section');
+    const progressText = document.getElementById('progress-text');
+    const cancelButton = document.getElementById('cancel-btn');
+    const POLL_INTERVAL_MS = 1000;
+    let currentJobId = null;
+
+    cancelButton.addEventListener('click', async function () {
+        if (currentJobId) {
+            await fetch(`/pdf-processor/jobs/${currentJobId}`, { method: 'DELETE' });
+        }
+    });
 
     form.addEventListener('submit', async function (e) {
         e.preventDefault();
@@ -11,6 +22,7 @@ document.addEventListener('DOMContentLoaded', function () {
         // Reset previous results
         resultSection.style.display = 'none';
         errorSection.style.display = 'none';
+        progressSection.style.display = 'none';
 
         const fileInput = document.getElementById('pdf-file');
         const file = fileInput.files[0];
@@ -24,7 +36,7 @@ document.addEventListener('DOMContentLoaded', function () {
         formData.append('file', file);
 
         try {
-            const response = await fetch('/pdf-processor/upload', {
+            const response = await fetch('/pdf-processor/jobs', {
                 method: 'POST',
                 body: formData
             });
@@ -32,7 +44,9 @@ document.addEventListener('DOMContentLoaded', function () {
             const data = await response.json();
 
             if (response.ok) {
-                showResult(data.summary);
+                currentJobId = data.job_id;
+                showProgress('Queued...');
+                pollJob(data.status_url, data.result_url);
             } else {
                 showError(data.error || 'An error occurred while processing the PDF');
             }
@@ -41,13 +55,49 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    async function pollJob(statusUrl, resultUrl) {
+        try {
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+
+            if (!response.ok) {
+                showError(job.error || 'An error occurred while processing the PDF');
+            } else if (job.status === 'completed') {
+                const result = await (await fetch(resultUrl)).json();
+                showResult(result.summary);
+            } else if (job.status === 'failed') {
+                showError(job.error || 'An error occurred while processing the PDF');
+            } else if (job.status === 'cancelled') {
+                showError('Processing was cancelled');
+            } else {
+                if (job.status === 'running' && job.progress.total > 0) {
+                    showProgress(`Processing... ${job.progress.done}/${job.progress.total} chunks`);
+                } else {
+                    showProgress(job.status === 'running' ? 'Processing...' : 'Queued...');
+                }
+                setTimeout(() => pollJob(statusUrl, resultUrl), POLL_INTERVAL_MS);
+            }
+        } catch (error) {
+            showError('An error occurred while checking the processing status');
+        }
+    }
+
+    function showProgress(message) {
+        progressText.textContent = message;
+        progressSection.style.display = 'block';
+    }
+
     function showResult(summary) {
+        currentJobId = null;
+        progressSection.style.display = 'none';
         summaryText.textContent = summary;
         resultSection.style.display = 'block';
         errorSection.style.display = 'none';
     }
 
     function showError(message) {
+        currentJobId = null;
+        progressSection.style.display = 'none';
         errorMessage.textContent = message;
         errorSection.style.display = 'block';
         resultSection.style.display = 'none';
@@ -0,0 +1,44 @@
+from app.features.pdf_processor.chunking import chunk_text, estimate_tokens, split_entries
+from app.features.pdf_processor.dedup import deduplicate_defects
+
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('P.29A - okno do regulacji') == 9
+
+
+def test_wrapped_lines_stay_in_one_entry():
+    lines = [
+        'Latarnia doświetleniowa - kiosk I - sala rozpraw nr 30 - zmurszenie blachy',
+        'przy oknie od strony dziedzińca',
+        'P.29A - okno do regulacji',
+    ]
+
+    assert split_entries(lines) == [lines[:2], lines[2:]]
+
+
+def test_chunks_are_packed_to_budget_and_keep_headings_with_their_defects():
+    lines = []
+    for room in range(1, 6):
+        lines.append(f'Sala rozpraw nr {room}')
+        lines.extend(f'Pęknięta płytka terakoty nr {n}' for n in range(4))
+    chunks = chunk_text('\n'.join(lines), target_tokens=60)
+
+    assert 1 < len(chunks) < len(lines) // 3
+    for chunk in chunks:
+        assert not chunk.split('\n')[-1].startswith('Sala rozpraw')
+    assert '\n'.join(chunks).split('\n') == lines
+
+
+def test_overlap_repeats_lines_and_duplicates_are_removed():
+    text = '\n'.join(f'P.{n} - okno do regulacji' for n in range(10))
+    chunks = chunk_text(text, target_tokens=30, overlap_lines=1)
+
+    assert chunks[1].split('\n')[0] == chunks[0].split('\n')[-1]
+
+    defects = [
+        {'name': 'Okno do regulacji', 'location': 'Sąd Rejonowy w Zamości P.29A'},
+        {'name': 'okno  do regulacji', 'location': 'Sąd Rejonowy w Zamości, P.29A'},
+        {'name': 'Okno do regulacji', 'location': 'Sąd Rejonowy w Zamości P.30'},
+    ]
+    assert deduplicate_defects(defects) == [defects[0], defects[2]]
@@ -0,0 +1,34 @@
+from app.features.pdf_processor.dedup import DefectIndex, deduplicate_defects, fold_text
+
+LOCATION = 'Sąd Okręgowy i Rejonowy w Zamościu, ul. Partyzantów 10'
+
+
+def test_fold_text_strips_case_diacritics_and_punctuation():
+    assert fold_text('  Łazienka  WC8 – ZAMOŚCIU ') == 'lazienka wc8 zamosciu'
+    assert fold_text('Zażółć gęślą jaźń') == 'zazolc gesla jazn'
+
+
+def test_near_duplicates_are_merged_but_other_rooms_are_kept():
+    defects = [
+        {'name': 'Okno do regulacji', 'location': f'{LOCATION}, P.41'},
+        {'name': 'okno do regulacji.', 'location': f'{LOCATION.upper()}, P.41'},
+        {'name': 'Okno do regulacji', 'location': f'Sad Okregowy i Rejonowy w Zamosciu, ul. Partyzantow 10, P.41'},
+        {'name': 'Okna do regulacji', 'location': f'{LOCATION}, P.41'},
+        {'name': 'Okno do regulacji', 'location': f'{LOCATION}, P.41A'},
+        {'name': 'Zawilgocenie ściany', 'location': f'{LOCATION}, Wejście E'},
+        {'name': 'Zawilgocenie ściany', 'location': f'{LOCATION}, Wejście G'},
+    ]
+
+    assert deduplicate_defects(defects) == [defects[0], defects[4], defects[5], defects[6]]
+
+
+def test_threshold_of_one_only_drops_exact_duplicates():
+    defects = [
+        {'name': 'Okno do regulacji', 'location': 'P.41'},
+        {'name': 'OKNO do regulacji', 'location': 'p.41'},
+        {'name': 'Okna do regulacji', 'location': 'P.41'},
+    ]
+
+    index = DefectIndex(threshold=1)
+    assert [index.add(defect) for defect in defects] == [True, False, True]
+    assert len(index) == 2
@@ -0,0 +1,49 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from PyPDF2 import PdfReader
+
+from app.features.pdf_processor.extraction import iter_pdf_pages
+from app.features.shared.cache import SQLiteCache, sha256_hexdigest
+from tests.synthetic_documents import make_pdf, report_pages
+
+
+def test_parallel_extraction_matches_serial_and_keeps_page_order():
+    data = make_pdf(report_pages(20, lines_per_page=5))
+    reader = PdfReader(io.BytesIO(data))
+    expected = [page.extract_text() for page in reader.pages]
+
+    with ThreadPoolExecutor(4) as executor:
+        parallel = list(iter_pdf_pages(data, executor=executor, pages_per_task=3, min_parallel_pages=1))
+
+    assert parallel == list(iter_pdf_pages(data)) == expected
+
+
+def test_cached_pages_are_not_extracted_again(tmp_path, monkeypatch):
+    data = make_pdf(report_pages(5, lines_per_page=3))
+    cache = SQLiteCache(str(tmp_path / 'pages.sqlite3'))
+    first = list(iter_pdf_pages(data, sha256_hexdigest(data), cache))
+
+    monkeypatch.setattr(PdfReader, 'pages', property(lambda reader: [None] * 5))
+    second = list(iter_pdf_pages(data, sha256_hexdigest(data), cache))
+
+    assert second == first
+    assert cache.stats()['hits'] == 5
+
+
+def test_closing_early_cancels_pending_page_ranges():
+    data = make_pdf(report_pages(20, lines_per_page=5))
+    futures = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            futures.append(super().submit(*args, **kwargs))
+            return futures[-1]
+
+    with RecordingExecutor(1) as executor:
+        pages = iter_pdf_pages(data, executor=executor, pages_per_task=1, min_parallel_pages=1)
+        next(pages)
+        pages.close()
+
+    assert len(futures) == 20
+    assert sum(future.cancelled() for future in futures) > 10
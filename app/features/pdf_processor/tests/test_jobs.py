@@ -0,0 +1,143 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from app.features.pdf_processor.jobs import (
+    CANCELLED,
+    COMPLETED,
+    QUEUED,
+    RUNNING,
+    JobStore,
+    JobWorkerPool,
+)
+from app.features.pdf_processor.models import PDFDocument
+
+
+class FakeService:
+    def __init__(self, chunks=3):
+        self.chunks = chunks
+
+    async def process_pdf(self, source, filename=None, progress_callback=None):
+        content = source.read().decode()
+        for done in range(self.chunks + 1):
+            progress_callback(done, self.chunks)
+        return PDFDocument(filename, content, '[]')
+
+
+def wait_for_status(store, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job stayed {store.get(job_id)['status']}")
+
+
+class RecordingJobStore(JobStore):
+    def update_progress(self, job_id, done, total):
+        self.progress_threads.add(threading.current_thread().name)
+        return super().update_progress(job_id, done, total)
+
+
+def test_worker_pool_processes_queued_jobs(tmp_path):
+    store = RecordingJobStore(str(tmp_path / 'jobs.sqlite3'))
+    store.progress_threads = set()
+    pool = JobWorkerPool(FakeService(), store, workers=1, poll_interval=0.01)
+    job_id = store.create('protokol.pdf', b'text')
+
+    pool.ensure_started()
+    try:
+        job = wait_for_status(store, job_id, (COMPLETED,))
+    finally:
+        pool.stop()
+
+    assert job['result'] == {'filename': 'protokol.pdf', 'summary': '[]'}
+    assert (job['progress_done'], job['progress_total']) == (3, 3)
+    # Written by the job's worker thread, never on the shared event loop
+    assert store.progress_threads == {'pdf-job-worker-0'}
+
+
+def test_worker_threads_survive_store_errors(tmp_path):
+    class FlakyJobStore(JobStore):
+        failures = {'claim': 2, 'purge_finished': 1}
+
+        def claim(self, worker_id, lease_seconds):
+            if self.failures['claim']:
+                self.failures['claim'] -= 1
+                raise sqlite3.OperationalError('database is locked')
+            return super().claim(worker_id, lease_seconds)
+
+        def purge_finished(self, older_than_seconds):
+            if self.failures['purge_finished']:
+                self.failures['purge_finished'] -= 1
+                raise sqlite3.OperationalError('database is locked')
+            return super().purge_finished(older_than_seconds)
+
+    store = FlakyJobStore(str(tmp_path / 'jobs.sqlite3'))
+    pool = JobWorkerPool(FakeService(), store, workers=1, poll_interval=0.01, lease_seconds=0.4)
+    job_id = store.create('protokol.pdf', b'text')
+
+    pool.ensure_started()
+    try:
+        job = wait_for_status(store, job_id, (COMPLETED,))
+        assert all(thread.is_alive() for thread in pool._threads)
+    finally:
+        pool.stop()
+
+    assert store.failures == {'claim': 0, 'purge_finished': 0}
+    assert job['result'] == {'filename': 'protokol.pdf', 'summary': '[]'}
+
+
+def test_cancel_queued_and_running_jobs(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    queued_id = store.create('a.pdf', b'a')
+    running_id = store.create('b.pdf', b'b')
+
+    assert store.cancel(queued_id) == CANCELLED
+    assert store.claim('worker', lease_seconds=60)['id'] == running_id
+    assert store.cancel(running_id) == RUNNING
+    assert store.update_progress(running_id, 1, 3) is True
+
+    JobWorkerPool(FakeService(), store).run_job({'id': running_id, 'filename': 'b.pdf', 'data': b'b'})
+    assert store.get(running_id)['status'] == CANCELLED
+
+
+def test_running_job_is_cancelled_before_its_first_chunk(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    stopped = []
+
+    class ExtractingService:
+        async def process_pdf(self, source, filename=None, progress_callback=None):
+            try:
+                await asyncio.sleep(30)  # pages still being extracted, no chunk done yet
+            except asyncio.CancelledError:
+                stopped.append(filename)
+                raise
+
+    pool = JobWorkerPool(ExtractingService(), store, workers=1, poll_interval=0.01)
+    job_id = store.create('a.pdf', b'a')
+    pool.ensure_started()
+    try:
+        wait_for_status(store, job_id, (RUNNING,))
+        store.cancel(job_id)
+        wait_for_status(store, job_id, (CANCELLED,))
+    finally:
+        pool.stop()
+
+    deadline = time.monotonic() + 5
+    while not stopped and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stopped == ['a.pdf']
+
+
+def test_jobs_of_a_dead_worker_are_requeued(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    job_id = JobStore(path).create('a.pdf', b'a')
+    JobStore(path).claim('dead-worker', lease_seconds=0)
+
+    restarted = JobStore(path)
+    assert restarted.requeue_expired(max_attempts=3) == 1
+    assert restarted.get(job_id)['status'] == QUEUED
+    assert restarted.claim('new-worker', lease_seconds=60)['data'] == b'a'
@@ -0,0 +1,26 @@
+from app.features.pdf_processor.responses import parse_defect_list, parse_keyed_defect_lists
+
+
+def test_defect_lists_are_parsed_from_objects_lists_and_fenced_answers():
+    defect = {"name": "Uszkodzony kabel json", "location": "P.1"}
+
+    assert parse_defect_list('{"defects": [{"name": "Uszkodzony kabel json", "location": "P.1"}]}') == [defect]
+    assert parse_defect_list('```json\n[{"name": "Uszkodzony kabel json", "location": "P.1"}]\n```') == [defect]
+    assert parse_defect_list('Oto usterki: {"defects": [{"name": "Okno", "location": "P.2"}]} Koniec.') == [
+        {"name": "Okno", "location": "P.2"}]
+    assert parse_defect_list("I don't know.") == []
+
+
+def test_malformed_answers_are_rejected():
+    assert parse_defect_list('[{"name": "Okno", "location": "P.2"') is None
+    assert parse_defect_list('{"defects": [{"location": "P.2"}]}') is None
+    assert parse_defect_list('{"defects": [{"name": "Okno"}]}') is None
+    assert parse_defect_list('{"defects": [{"name": "Okno", "location": ""}]}') is None
+    assert parse_defect_list('{"usterki": []}') is None
+
+
+def test_keyed_answers_keep_only_valid_sections():
+    raw = '{"0": [{"name": "Okno", "location": "P.1"}], "1": [{"location": "P.2"}], "3": []}'
+
+    assert parse_keyed_defect_lists(raw, 3) == {0: [{"name": "Okno", "location": "P.1"}]}
+    assert parse_keyed_defect_lists('nie json', 3) == {}
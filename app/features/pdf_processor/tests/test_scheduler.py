@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+from openai import AsyncOpenAI
+
+from app.features.pdf_processor.scheduler import LLMRequestScheduler, TokenBucket
+from tests.fake_openai import FakeOpenAIServer
+
+
+def ask(client):
+    return lambda: client.chat.completions.create(
+        model='gpt-4o-mini', messages=[{'role': 'user', 'content': '<document>P.1 - okno</document>'}]
+    )
+
+
+def test_scheduler_retries_rate_limited_requests_honouring_retry_after():
+    scheduler = LLMRequestScheduler(max_retries=3, backoff_base=0.01)
+
+    async def run(server):
+        client = AsyncOpenAI(api_key='test', base_url=server.base_url, max_retries=0)
+        return await scheduler.submit(ask(client))
+
+    with FakeOpenAIServer(fail_first=2, retry_after=0.2) as server:
+        started = time.monotonic()
+        response = asyncio.run(run(server))
+        elapsed = time.monotonic() - started
+
+    assert 'P.1 - okno' in response.choices[0].message.content
+    assert server.stats()['rate_limited'] == 2
+    assert scheduler.stats()['retries'] == 2
+    assert elapsed >= 0.4
+
+
+def test_scheduler_fails_when_retry_after_exceeds_the_backoff_cap():
+    import openai
+
+    scheduler = LLMRequestScheduler(max_retries=3, backoff_max=1.0)
+
+    async def run(server):
+        client = AsyncOpenAI(api_key='test', base_url=server.base_url, max_retries=0)
+        return await scheduler.submit(ask(client))
+
+    with FakeOpenAIServer(fail_first=1, retry_after=3600) as server:
+        started = time.monotonic()
+        with pytest.raises(openai.RateLimitError):
+            asyncio.run(run(server))
+
+    assert time.monotonic() - started < 5
+    assert scheduler.stats()['failures'] == 1 and scheduler.stats()['retries'] == 0
+
+
+def test_scheduler_bounds_concurrency():
+    scheduler = LLMRequestScheduler(max_concurrency=3)
+
+    async def run(server):
+        client = AsyncOpenAI(api_key='test', base_url=server.base_url, max_retries=0)
+        await asyncio.gather(*(scheduler.submit(ask(client)) for _ in range(12)))
+
+    with FakeOpenAIServer(latency=0.05) as server:
+        asyncio.run(run(server))
+
+    assert server.stats()['requests'] == 12
+    assert server.stats()['max_in_flight'] <= 3
+
+
+def test_scheduler_times_out_slow_requests():
+    scheduler = LLMRequestScheduler(max_retries=1, request_timeout=0.05, backoff_base=0.01)
+
+    async def run(server):
+        client = AsyncOpenAI(api_key='test', base_url=server.base_url, max_retries=0)
+        await scheduler.submit(ask(client))
+
+    with FakeOpenAIServer(latency=0.3) as server:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run(server))
+
+    assert scheduler.stats()['timeouts'] == 2
+
+
+def test_token_bucket_spaces_out_requests_over_capacity():
+    now = [0.0]
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=lambda: now[0])
+
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    now[0] = 3.0
+    assert bucket.reserve(1) == 0
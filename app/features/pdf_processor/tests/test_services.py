@@ -0,0 +1,285 @@
+import asyncio
+import io
+import json
+import re
+
+from app.features.defect_store.models import DefectStore
+from app.features.pdf_processor.services import (
+    PDFProcessorService,
+    guess_report_location,
+)
+from app.features.shared.cache import SQLiteCache, sha256_hexdigest
+
+
+def test_process_pdf_returns_cached_result_without_reprocessing(tmp_path):
+    pdf_path = tmp_path / 'protokol.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4 not really a pdf')
+    cache = SQLiteCache(str(tmp_path / 'results.sqlite3'))
+    service = PDFProcessorService(result_cache=cache)
+    file_hash = sha256_hexdigest(pdf_path.read_bytes())
+    cache.set(service.get_result_cache_key(file_hash), {'content': 'cached text', 'summary': '[]'})
+    service.iter_pdf_text = lambda data, file_hash=None: (_ for _ in ()).throw(AssertionError('PDF should not be re-read'))
+
+    document = asyncio.run(service.process_pdf(str(pdf_path)))
+
+    assert document.filename == 'protokol.pdf'
+    assert document.summary == '[]'
+    assert cache.stats()['hits'] == 1
+
+    # Results of other chunking or deduplication settings are not reused
+    for setting, value in [('chunk_target_tokens', 600), ('chunk_overlap_lines', 0), ('chunks_per_request', 4),
+                           ('dedup_threshold', 1.0), ('speculative_location', False), ('json_mode', False)]:
+        key = service.get_result_cache_key(file_hash)
+        setattr(service, setting, value)
+        assert service.get_result_cache_key(file_hash) != key
+
+
+def test_generate_defect_list_only_sends_changed_chunks(tmp_path):
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+        chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+    )
+    sent_chunks = []
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        sent_chunks.append(text)
+        return '[{"name": "Okno do regulacji", "location": "Sąd Rejonowy w Zamości P.29A"}]'
+
+    service.ask_llm_async = fake_ask_llm_async
+    service.chunk_target_tokens = 50
+    service.chunk_overlap_lines = 0
+    original = "\n".join(f"P.{i} - okno do regulacji" for i in range(30))
+    revised = original.replace("P.29 -", "P.29B -")
+
+    first = asyncio.run(service.generate_defect_list(original, "Sąd Rejonowy w Zamościu"))
+    second = asyncio.run(service.generate_defect_list(revised, "Sąd Rejonowy w Zamościu"))
+
+    assert len(first) == len(second) == 1  # identical defects from every chunk are deduplicated
+    assert len(sent_chunks) == 7
+    assert "P.29B" in sent_chunks[-1]
+
+
+def test_stream_pdf_yields_location_then_defects_in_completion_order(tmp_path):
+    pdf_path = tmp_path / 'protokol.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+        chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+    )
+    service.iter_pdf_text = lambda data, file_hash=None: iter(["P.1 - okno do regulacji\n", "P.2 - pęknięta płytka\n"])
+    service.chunk_target_tokens = 1
+    service.chunk_overlap_lines = 0
+
+    async def fake_location(text):
+        return "Sąd Rejonowy w Zamościu\n\n"
+
+    service.generate_report_location_async = fake_location
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        await asyncio.sleep(0.2 if text.startswith("P.1") else 0)
+        return f'[{{"name": "{text[6:]}", "location": "{text[:3]}"}}]'
+
+    service.ask_llm_async = fake_ask_llm_async
+
+    async def collect():
+        return [event async for event in service.stream_pdf(str(pdf_path))]
+
+    events = asyncio.run(collect())
+
+    assert [name for name, _ in events] == ['location', 'defects', 'defects', 'done']
+    assert events[0][1] == {'location': 'Sąd Rejonowy w Zamościu', 'final': True}
+    assert events[1][1]['chunk'] == 1
+    assert events[1][1]['defects'] == [{'name': 'pęknięta płytka', 'location': 'P.2'}]
+    assert events[3][1]['summary'] == asyncio.run(service.process_pdf(str(pdf_path))).summary
+
+
+REPORT_BEGINNING = """Zamość, dnia 08 kwietnia 2022 r.
+PROTOKÓŁ
+z przeglądu stanu technicznego branży budowlanej w okresie gwarancyjnym
+budynku Sądu Okręgowego i Rejonowego w Zamościu przeprowadzonego w dniach 21
+25.03.2022 r. sporządzony w dniu 08.04.2022 r."""
+
+
+def test_guess_report_location_reads_the_report_beginning():
+    assert guess_report_location(REPORT_BEGINNING) == "Sądu Okręgowego i Rejonowego w Zamościu"
+    assert guess_report_location("Zamość, dnia 08 kwietnia 2022 r.\nP.29A - okno") == "Zamość"
+    assert guess_report_location("P.29A - okno do regulacji") is None
+
+
+def test_defects_are_extracted_while_the_location_is_pending(tmp_path):
+    pdf_path = tmp_path / 'protokol.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+        chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+    )
+    calls = []
+
+    async def slow_location(text):
+        calls.append('location-start')
+        await asyncio.sleep(0.1)
+        calls.append('location-end')
+        return "Sąd Okręgowy i Rejonowy w Zamościu\n\n"
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        calls.append('chunk')
+        location_prompt = messages[1]['content'].split('Locations must also mention')[1]
+        assert 'Sądu Okręgowego i Rejonowego w Zamościu' in location_prompt
+        return '[{"name": "Okno do regulacji", "location": "Sądu Okręgowego i Rejonowego w Zamościu P.29A"}]'
+
+    service.iter_pdf_text = lambda data, file_hash=None: iter([REPORT_BEGINNING + "\n", "P.29A - okno\n"])
+    service.generate_report_location_async = slow_location
+    service.ask_llm_async = fake_ask_llm_async
+
+    document = asyncio.run(service.process_pdf(str(pdf_path)))
+
+    assert calls.index('chunk') < calls.index('location-end')
+    assert document.summary == str([{"name": "Okno do regulacji", "location": "Sąd Okręgowy i Rejonowy w Zamościu P.29A"}]).replace("'", '"')
+    assert document.timings['read_pdf'] < document.timings['location'] <= document.timings['total']
+
+
+def test_failed_llm_location_keeps_the_guessed_location(tmp_path):
+    pdf_path = tmp_path / 'protokol.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+        chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+    )
+
+    async def failed_location(text):
+        return "Error asking llm: Connection error.\n\n"
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        return '[{"name": "Okno", "location": "Sądu Okręgowego i Rejonowego w Zamościu P.29A"}]'
+
+    service.iter_pdf_text = lambda data, file_hash=None: iter([REPORT_BEGINNING + "\n", "P.29A - okno\n"])
+    service.generate_report_location_async = failed_location
+    service.ask_llm_async = fake_ask_llm_async
+
+    async def collect():
+        return [event async for event in service.stream_pdf(str(pdf_path))]
+
+    events = asyncio.run(collect())
+
+    assert [data for name, data in events if name == 'location'] == [
+        {'location': 'Sądu Okręgowego i Rejonowego w Zamościu', 'final': False}]
+    assert json.loads(events[-1][1]['summary']) == [
+        {"name": "Okno", "location": "Sądu Okręgowego i Rejonowego w Zamościu P.29A"}]
+
+
+def test_document_without_an_llm_location_is_recorded_under_the_guess(tmp_path):
+    pdf_path = tmp_path / 'protokol.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    store = DefectStore(str(tmp_path / 'defects.sqlite3'))
+    service = PDFProcessorService(result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+                                  chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+                                  api_key='test', defect_store=store)
+
+    async def unknown_location(text):
+        return "I don't know.\n\n"
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        return '[{"name": "Okno", "location": "Sądu Okręgowego i Rejonowego w Zamościu P.29A"}]'
+
+    service.iter_pdf_text = lambda data, file_hash=None: iter([REPORT_BEGINNING + "\n", "P.29A - okno\n"])
+    service.generate_report_location_async = unknown_location
+    service.ask_llm_async = fake_ask_llm_async
+    asyncio.run(service.process_pdf(str(pdf_path)))
+    assert store.flush(timeout=5)
+
+    assert [document['building'] for document in store.list_documents()] == ["Sądu Okręgowego i Rejonowego w Zamościu"]
+
+
+def test_process_batch_overlaps_documents_and_keeps_their_order(tmp_path):
+    from tests.fake_openai import FakeOpenAIServer
+    from tests.synthetic_documents import make_pdf, report_pages
+
+    files = [(f'protokol{n}.pdf', io.BytesIO(make_pdf(report_pages(1, lines_per_page=n + 1)))) for n in range(4)]
+    with FakeOpenAIServer(latency=0.2) as server:
+        service = PDFProcessorService(
+            result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+            chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+            page_cache=SQLiteCache(str(tmp_path / 'pages.sqlite3')),
+            api_key='test',
+            base_url=server.base_url,
+        )
+        documents = asyncio.run(service.process_batch(files, concurrency=4))
+
+        assert [document.filename for document in documents] == [filename for filename, _ in files]
+        assert all(f'P.{n} -' in documents[n].summary and f'P.{n + 1} -' not in documents[n].summary
+                   for n in range(4))
+        # Requests of different documents were in flight at the same time
+        assert server.stats()['max_in_flight'] > 1
+
+
+def test_batched_chunks_fall_back_to_single_requests_for_unparsed_sections(tmp_path):
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+        chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+    )
+    service.chunks_per_request = 3
+    service.chunk_target_tokens = 1
+    service.chunk_overlap_lines = 0
+    prompts = []
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        prompts.append(text)
+        sections = re.findall(r'<chunk id="(\d+)">\n(P\.\d+)', text)
+        if not sections:
+            return f'[{{"name": "okno", "location": "{text[:3]}"}}]'
+        # The first section of every batch is left out of the answer
+        return json.dumps({chunk_id: [{"name": "okno", "location": room}] for chunk_id, room in sections[1:]})
+
+    service.ask_llm_async = fake_ask_llm_async
+    text = "\n".join(f"P.{i} - okno do regulacji" for i in range(5))
+
+    defects = asyncio.run(service.generate_defect_list(text, "Sąd Rejonowy w Zamościu"))
+
+    assert [defect['location'] for defect in defects] == [f"P.{i}" for i in range(5)]
+    assert len(prompts) == 4  # two batches, then the two left out sections on their own
+
+
+def test_invalid_answers_are_asked_again_and_failed_chunks_are_not_cached(tmp_path):
+    pdf_path = tmp_path / 'protokol.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    cache = SQLiteCache(str(tmp_path / 'results.sqlite3'))
+    service = PDFProcessorService(result_cache=cache, chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')),
+                                  api_key='test')
+    service.iter_pdf_text = lambda data, file_hash=None: iter(["P.1 - okno do regulacji\n", "P.2 - pęknięta płytka\n"])
+    service.chunk_target_tokens = 1
+    service.chunk_overlap_lines = 0
+    service.chunk_parse_retries = 1
+    service.speculative_location = False
+    answers = {'P.1': ['{"defects": [', '{"defects": [{"name": "Okno do regulacji", "location": "P.1"}]}'],
+               'P.2': ['nie wiem', 'nadal nie wiem']}
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        if 'provide a location' in messages[-1]['content']:
+            return "Sąd Rejonowy w Zamościu"
+        assert response_format == {"type": "json_object"}
+        return answers[text[:3]].pop(0)
+
+    service.ask_llm_async = fake_ask_llm_async
+    document = asyncio.run(service.process_pdf(str(pdf_path)))
+
+    assert json.loads(document.summary) == [{"name": "Okno do regulacji", "location": "P.1"}]
+    assert answers == {'P.1': [], 'P.2': []}
+    assert cache.stats()['entries'] == 0
+
+
+def test_answer_without_locations_is_asked_again(tmp_path):
+    service = PDFProcessorService(result_cache=SQLiteCache(str(tmp_path / 'results.sqlite3')),
+                                  chunk_cache=SQLiteCache(str(tmp_path / 'chunks.sqlite3')))
+    answers = ['{"defects": [{"name": "Okno do regulacji"}]}',
+               '{"defects": [{"name": "Okno do regulacji", "location": "Sąd Rejonowy w Zamościu P.29A"}]}']
+    sent = []
+
+    async def fake_ask_llm_async(text, messages, max_length=500, response_format=None):
+        sent.append(messages)
+        return answers.pop(0)
+
+    service.ask_llm_async = fake_ask_llm_async
+    defects = asyncio.run(service.extract_chunk_defects("P.29A - okno do regulacji", "Sąd Rejonowy w Zamościu"))
+
+    assert defects == [{"name": "Okno do regulacji", "location": "Sąd Rejonowy w Zamościu P.29A"}]
+    assert len(sent) == 2 and sent[1][-1]['role'] == 'user'
@@ -1,26 +1,63 @@
-import os
-from flask import Blueprint, render_template, request, jsonify, current_app
+import io
+import json
+import logging
+import time
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, url_for
 from werkzeug.utils import secure_filename
-from app.features.pdf_processor.services import PDFProcessorService
+from app.features.defect_store.models import get_defect_store
+from app.features.pdf_processor.jobs import COMPLETED, JobWorkerPool, create_job_store
+from app.features.shared.batch import BatchError, collect_batch_files, summarize_batch
+from app.features.shared.event_loop import run_coroutine
+from app.features.shared.lazy import Lazy
+from app.features.shared.metrics import collect_timings
+from app.features.shared.uploads import timings_requested
+
+logger = logging.getLogger(__name__)
 
 pdf_processor_bp = Blueprint('pdf_processor', __name__, 
                           url_prefix='/pdf-processor',
                           template_folder='template',
                           static_folder='template')  # Serve static files from template directory
 
-service = PDFProcessorService()
+def create_service():
+    # Imported on first use: the service loads the OpenAI SDK, PyPDF2 and numpy
+    from app.features.pdf_processor.services import PDFProcessorService
+    return PDFProcessorService(defect_store=get_defect_store())
+
+get_service = Lazy(create_service).get
+get_job_store = Lazy(create_job_store).get
+# Workers only build the service once they take a job
+get_job_pool = Lazy(lambda: JobWorkerPool.from_env(get_service, get_job_store())).get
+
+def __getattr__(name):
+    # ``views.service``, e.g. for tests patching the service's clients
+    if name == 'service':
+        return get_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up():
+    """Build the service before the first request needs it (see ``app.features.warm_up_features``)."""
+    get_service()
+    start_job_workers()
 
 ALLOWED_EXTENSIONS = {'pdf'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def start_job_workers():
+    """Start this process's job workers; queued jobs, including those of a restarted worker, then run."""
+    # Started lazily so each forked gunicorn worker runs its own threads
+    pool = get_job_pool()
+    pool.ensure_started()
+    return pool
+
 @pdf_processor_bp.route('/')
 def index():
     return render_template('index.html')
 
 @pdf_processor_bp.route('/upload', methods=['POST'])
-async def upload_pdf():
+def upload_pdf():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     
@@ -31,31 +68,156 @@ async def upload_pdf():
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
         
-        # Make sure the upload folder exists
-        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
         try:
-            document = await service.process_pdf(file_path)
-            
-            # Only remove the file if it exists
-            if os.path.exists(file_path):
-                os.remove(file_path)  # Clean up the uploaded file
+            # Read straight from the upload stream instead of saving it to UPLOAD_FOLDER first
+            with collect_timings() as spans:
+                document = run_coroutine(get_service().process_pdf(file.stream, filename=filename))
             
-            return jsonify({
+            body = {
                 'filename': document.filename,
                 'summary': document.summary
-            })
+            }
+            if timings_requested():
+                body['timings'] = {'stages': document.timings, 'spans': spans}
+            return jsonify(body)
         except Exception as e:
             # Log the error for debugging
-            print(f"Error processing PDF: {str(e)}")
-            
-            # Try to clean up the file even if processing failed
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            logger.exception("Error processing PDF %s", filename)
                 
             return jsonify({'error': f"Failed to process PDF: {str(e)}"}), 500
     
     return jsonify({'error': 'Invalid file type'}), 400
+
+@pdf_processor_bp.route('/batch', methods=['POST'])
+def upload_batch():
+    """Process many PDFs (``files`` fields, or zip archives of PDFs) concurrently in one request."""
+    try:
+        files, rejected = collect_batch_files(request.files.getlist('files'), allowed_file,
+                                              current_app.config['BATCH_MAX_FILES'],
+                                              current_app.config['BATCH_MAX_EXTRACTED_BYTES'])
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    if not files and not rejected:
+        return jsonify({'error': 'No files'}), 400
+
+    started = time.perf_counter()
+    documents = run_coroutine(get_service().process_batch(files))
+    wall_seconds = time.perf_counter() - started
+
+    results, file_seconds = [], []
+    for (filename, _), document in zip(files, documents):
+        if isinstance(document, Exception):
+            logger.error("Error processing PDF %s: %s", filename, document)
+            results.append({'filename': filename, 'error': f"Failed to process PDF: {str(document)}"})
+            continue
+        results.append({'filename': document.filename, 'summary': document.summary, 'timings': document.timings})
+        file_seconds.append(document.timings.get('total', 0.0))
+    return jsonify(summarize_batch(results + rejected, file_seconds, wall_seconds))
+
+@pdf_processor_bp.route('/cache/stats')
+def cache_stats():
+    """Expose result cache hit/miss counters."""
+    return jsonify(get_service().result_cache.stats())
+
+def serialize_job(job):
+    return {
+        'job_id': job['id'],
+        'filename': job['filename'],
+        'status': job['status'],
+        'progress': {'done': job['progress_done'], 'total': job['progress_total']},
+        'error': job['error'],
+        'cancel_requested': job['cancel_requested'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    }
+
+@pdf_processor_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a PDF for background processing and return its job id immediately."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    job_id = get_job_store().create(secure_filename(file.filename), file.read())
+    start_job_workers().notify()
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('pdf_processor.get_job', job_id=job_id),
+        'result_url': url_for('pdf_processor.get_job_result', job_id=job_id),
+    }), 202
+
+@pdf_processor_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return the status and chunk progress of a job."""
+    # Clients of a restarted worker keep polling while their job waits in the queue
+    start_job_workers()
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(serialize_job(job))
+
+@pdf_processor_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Return the result of a completed job."""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != COMPLETED:
+        return jsonify({**serialize_job(job), 'error': job['error'] or 'Job has not completed'}), 409
+    return jsonify(job['result'])
+
+@pdf_processor_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    status = get_job_store().cancel(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(serialize_job(get_job_store().get(job_id)))
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@pdf_processor_bp.route('/stream', methods=['POST'])
+def stream_pdf():
+    """Process a PDF and stream the location and each chunk's defects as Server-Sent Events."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    filename = secure_filename(file.filename)
+    # The upload is closed with the request, before the response body is streamed
+    upload = io.BytesIO(file.read())
+
+    def generate():
+        events = get_service().stream_pdf(upload, filename=filename)
+        try:
+            while True:
+                try:
+                    event, data = run_coroutine(events.__anext__())
+                except StopAsyncIteration:
+                    break
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.exception("Error processing PDF %s", filename)
+            yield format_sse('error', {'error': f"Failed to process PDF: {str(e)}"})
+        finally:
+            # Also runs when the client disconnects, cancelling outstanding chunk requests
+            run_coroutine(events.aclose())
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,72 @@
+import io
+import zipfile
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+
+class BatchError(ValueError):
+    """Raised when a batch upload as a whole cannot be accepted."""
+
+
+def collect_batch_files(files: List[FileStorage], allowed: Callable[[str], bool], max_files: int,
+                        max_extracted_bytes: int) -> Tuple[List[Tuple[str, BinaryIO]], List[Dict[str, str]]]:
+    """Split uploaded files and the members of uploaded ``.zip`` archives into accepted and rejected ones.
+
+    Returns ``(accepted, rejected)``: ``(filename, file object)`` pairs for the
+    files to process and ``{'filename', 'error'}`` entries for the others.
+    Archive members are read into memory, up to ``max_extracted_bytes`` in total.
+    """
+    accepted, rejected = [], []
+    extracted_bytes = 0
+    for file in files:
+        filename = secure_filename(file.filename or '')
+        if not filename.lower().endswith('.zip'):
+            if allowed(filename):
+                accepted.append((filename, file.stream))
+            else:
+                rejected.append({'filename': filename, 'error': 'Invalid file type'})
+            continue
+
+        try:
+            archive = zipfile.ZipFile(file.stream)
+        except zipfile.BadZipFile:
+            rejected.append({'filename': filename, 'error': 'Invalid zip archive'})
+            continue
+        with archive:
+            for member in archive.infolist():
+                if member.is_dir() or member.filename.startswith('__MACOSX/'):
+                    continue
+                member_name = secure_filename(member.filename.replace('/', '_'))
+                if not allowed(member_name):
+                    rejected.append({'filename': member_name, 'error': 'Invalid file type'})
+                    continue
+                # The sizes in the archive are checked before anything is decompressed
+                extracted_bytes += member.file_size
+                if extracted_bytes > max_extracted_bytes:
+                    raise BatchError(f"Archives expand to more than {max_extracted_bytes // (1024 * 1024)} MB")
+                accepted.append((member_name, io.BytesIO(archive.read(member))))
+
+    if len(accepted) > max_files:
+        raise BatchError(f"Too many files (limit is {max_files})")
+    return accepted, rejected
+
+
+def summarize_batch(results: List[Dict[str, Any]], file_seconds: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """Batch response body: per-file results, counts and timings.
+
+    ``sum_of_files`` is what processing the files one after another would
+    roughly have taken, to compare with the ``wall`` time of the batch.
+    """
+    failed = sum(1 for result in results if 'error' in result)
+    return {
+        'files': results,
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'timings': {
+            'wall': wall_seconds,
+            'sum_of_files': sum(file_seconds),
+            'slowest_file': max(file_seconds, default=0.0),
+        },
+    }
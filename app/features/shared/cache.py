@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def default_cache_dir() -> str:
+    """Return the directory used for on-disk caches (overridable with CACHE_DIR)."""
+    cache_dir = os.getenv('CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'cache'
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def sha256_hexdigest(data: bytes) -> str:
+    """Return the SHA-256 hex digest of raw bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_key(*parts: Any) -> str:
+    """Build a stable cache key from several parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class SQLiteCache:
+    """Persistent JSON key/value cache stored in a local SQLite file.
+
+    Entries are evicted least-recently-used first once ``max_entries`` or
+    ``max_bytes`` is exceeded, and expire after ``ttl_seconds``. Lookups only
+    write to the file to refresh an entry's access time once it is older than
+    ``touch_interval_seconds``, so that readers in every worker process do not
+    queue for SQLite's writer lock. Hit and miss counters are per process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, touch_interval_seconds: float = 60):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval_seconds = touch_interval_seconds
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or None, updating hit/miss counters."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Return the cached values of several keys; missing and expired keys are left out.
+
+        Expired entries are deleted by the next ``set``; stale access times are
+        refreshed in one transaction.
+        """
+        now = time.time()
+        found = {}
+        stale = []
+        with self._lock:
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                rows = self._conn.execute(
+                    'SELECT key, value, created_at, accessed_at FROM entries'
+                    f' WHERE key IN ({",".join("?" * len(batch))})',
+                    batch,
+                ).fetchall()
+                for key, value, created_at, accessed_at in rows:
+                    if self.ttl_seconds is None or now - created_at <= self.ttl_seconds:
+                        found[key] = value
+                        if now - accessed_at >= self.touch_interval_seconds:
+                            stale.append((now, key))
+            if stale:
+                self._conn.execute('BEGIN')
+                try:
+                    self._conn.executemany('UPDATE entries SET accessed_at = ? WHERE key = ?', stale)
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    raise
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict entries over the limits."""
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """Store several values in a single transaction, evicting once afterwards."""
+        if self.max_entries <= 0:
+            return
+        rows = []
+        now = time.time()
+        for key, value in items.items():
+            payload = json.dumps(value, ensure_ascii=False)
+            size = len(payload.encode('utf-8'))
+            if self.max_bytes is None or size <= self.max_bytes:
+                rows.append((key, payload, size, now, now))
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                    rows,
+                )
+                self._evict(now)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute('DELETE FROM entries WHERE created_at < ?', (now - self.ttl_seconds,))
+
+        count, total_size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,),
+            )
+            total_size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+        if self.max_bytes is not None and total_size > self.max_bytes:
+            excess = total_size - self.max_bytes
+            for key, size in self._conn.execute('SELECT key, size FROM entries ORDER BY accessed_at').fetchall():
+                if excess <= 0:
+                    break
+                self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                excess -= size
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+            self._hits = self._misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit/miss counters of this process and the current size of the cache."""
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+
+class MemoryLRUCache:
+    """In-process LRU cache, optionally backed by a persistent cache shared with other workers.
+
+    Values are returned as stored, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 128, backing: Optional[SQLiteCache] = None):
+        self.max_entries = max_entries
+        self.backing = backing
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+        value = self.backing.get(key) if self.backing is not None else None
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._store(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+        if self.backing is not None:
+            self.backing.set(key, value)
+
+    def _store(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+        if self.backing is not None:
+            self.backing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters of this process and, if any, of the persistent cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+        if self.backing is not None:
+            stats['disk'] = self.backing.stats()
+        return stats
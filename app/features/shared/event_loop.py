@@ -0,0 +1,65 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+from typing import Awaitable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+_loop: Optional[Tuple[int, asyncio.AbstractEventLoop]] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop of this process, running in a daemon thread.
+
+    It is started on first use and again in a forked child, where the
+    parent's loop thread does not exist. Clients bound to it, such as the
+    OpenAI client's connection pool, stay usable across requests.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop[0] != os.getpid() or _loop[1].is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='event-loop', daemon=True)
+            thread.start()
+            _loop = (os.getpid(), loop)
+        return _loop[1]
+
+
+def run_coroutine(coroutine: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run ``coroutine`` on the shared event loop and wait for its result.
+
+    The coroutine sees the caller's context variables (and so Flask's
+    request and app context). It is cancelled when the wait times out or
+    is interrupted.
+    """
+    loop = get_event_loop()
+    context = contextvars.copy_context()
+    result: concurrent.futures.Future = concurrent.futures.Future()
+    started = threading.Event()
+    task_holder = []
+
+    def on_done(task: asyncio.Task) -> None:
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start() -> None:
+        task = loop.create_task(coroutine, context=context)
+        task.add_done_callback(on_done)
+        task_holder.append(task)
+        started.set()
+
+    loop.call_soon_threadsafe(start)
+    try:
+        return result.result(timeout)
+    except BaseException:
+        if not result.done():
+            started.wait()
+            loop.call_soon_threadsafe(task_holder[0].cancel)
+        raise
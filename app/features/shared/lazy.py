@@ -0,0 +1,29 @@
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar('T')
+
+_UNSET = object()
+
+
+class Lazy(Generic[T]):
+    """A value built by ``factory`` on first use, once, also when several threads ask for it together.
+
+    Views keep their services behind one, so that importing the app stays
+    fast and heavy libraries load on the first request that needs them (or
+    in a warm-up hook, see ``app.features``).
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    self._value = self._factory()
+                value = self._value
+        return value
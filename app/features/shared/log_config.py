@@ -0,0 +1,119 @@
+"""Application-wide logging set up from the Flask config (``LOG_*`` settings in ``app.config``).
+
+Records are filtered and sampled in the calling thread, then put on an
+in-process queue; formatting and writing happen on a listener thread.
+Messages should use lazy %-style arguments (``logger.debug('Analysis: %s',
+analysis)``) so that records dropped by level or sampling cost nothing.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LIBRARY_LOGGERS = ('httpx', 'httpcore', 'openai')
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+_handler: Optional[logging.Handler] = None
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, for log collectors."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a ``rate`` share of records below WARNING."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler leaving the message formatting to the listener thread.
+
+    The standard ``QueueHandler.prepare`` formats every record in the calling
+    thread so it can be pickled; this queue never leaves the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _start_listener(log_queue: queue.Queue, handler: logging.Handler) -> QueueListener:
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _restart_listener_after_fork() -> None:
+    # The listener thread does not survive the fork into a gunicorn worker, and the
+    # parent's queue may have been locked mid-operation; records still in it are the parent's
+    global _listener
+    if _listener is not None and isinstance(_handler, QueueHandler):
+        _handler.queue = queue.Queue()
+        _listener = _start_listener(_handler.queue, *_listener.handlers)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(app) -> None:
+    """Install the handler configured by ``app.config``, replacing one installed earlier."""
+    global _handler, _listener
+    config = app.config
+    root = logging.getLogger()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if config.get('LOG_FORMAT', 'text') == 'json':
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    stop_logging()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    if config.get('LOG_QUEUE', True):
+        log_queue: queue.Queue = queue.Queue()
+        _listener = _start_listener(log_queue, stream_handler)
+        _handler = DeferredQueueHandler(log_queue)
+    else:
+        _handler = stream_handler
+    _handler.addFilter(SamplingFilter(config.get('LOG_SAMPLE_RATE', 1.0)))
+
+    root.addHandler(_handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    for name in LIBRARY_LOGGERS:
+        logging.getLogger(name).setLevel(config.get('LOG_LIBRARY_LEVEL', 'WARNING'))
+
+
+atexit.register(stop_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -0,0 +1,49 @@
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Sequence, Tuple
+
+# Third-party libraries imported once by the forkserver, so each worker forked from it starts with them
+FORKSERVER_PRELOAD = ['pandas', 'openpyxl', 'PyPDF2']
+
+_pools: Dict[str, Tuple[int, int, ProcessPoolExecutor]] = {}
+_pools_lock = threading.Lock()
+
+
+def get_start_method() -> str:
+    """Start method of the pool workers, ``PROCESS_POOL_START_METHOD`` (``forkserver`` by default).
+
+    The app process runs threads (the shared event loop, job workers, the log
+    listener, the defect store writer), and forking it while one of them holds
+    a lock leaves that lock held forever in the worker. ``fork`` starts workers
+    fastest and is only safe where no such thread runs yet, so it is opt-in.
+    """
+    method = os.getenv('PROCESS_POOL_START_METHOD', 'forkserver')
+    if method not in multiprocessing.get_all_start_methods():
+        return 'spawn'
+    return method
+
+
+def _initialize_worker(modules: Sequence[str]) -> None:
+    # Import the task modules as the worker starts rather than inside its first task
+    for module in modules:
+        importlib.import_module(module)
+
+
+def get_process_pool(name: str, workers: int, modules: Sequence[str] = ()) -> ProcessPoolExecutor:
+    """Return the named process pool of this process, creating it on first use, after a fork
+    and when the number of workers changes. Its workers import ``modules`` when they start."""
+    with _pools_lock:
+        pid, pool_workers, pool = _pools.get(name, (None, None, None))
+        if pool is None or pid != os.getpid() or pool_workers != workers:
+            if pool is not None and pid == os.getpid():
+                pool.shutdown(wait=False)
+            context = multiprocessing.get_context(get_start_method())
+            if context.get_start_method() == 'forkserver':
+                context.set_forkserver_preload(FORKSERVER_PRELOAD)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_initialize_worker, initargs=(tuple(modules),))
+            _pools[name] = (os.getpid(), workers, pool)
+        return pool
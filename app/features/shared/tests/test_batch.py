@@ -0,0 +1,43 @@
+import io
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.features.shared.batch import BatchError, collect_batch_files
+
+
+def make_zip(members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    output.seek(0)
+    return output
+
+
+def allowed(filename):
+    return filename.endswith('.pdf')
+
+
+def test_zip_members_are_expanded_and_other_files_rejected():
+    files = [
+        FileStorage(io.BytesIO(b'%PDF-1'), 'a.pdf'),
+        FileStorage(make_zip({'budynek/b.pdf': b'%PDF-2', 'notatki.txt': b'x', '__MACOSX/._b.pdf': b''}), 'paczka.zip'),
+        FileStorage(io.BytesIO(b'nie zip'), 'zepsuty.zip'),
+    ]
+
+    accepted, rejected = collect_batch_files(files, allowed, max_files=10, max_extracted_bytes=1024)
+
+    assert [(name, f.read()) for name, f in accepted] == [('a.pdf', b'%PDF-1'), ('budynek_b.pdf', b'%PDF-2')]
+    assert rejected == [{'filename': 'notatki.txt', 'error': 'Invalid file type'},
+                        {'filename': 'zepsuty.zip', 'error': 'Invalid zip archive'}]
+
+
+def test_limits_apply_to_the_whole_batch():
+    archive = make_zip({f'{n}.pdf': b'0' * 100 for n in range(5)})
+    with pytest.raises(BatchError):
+        collect_batch_files([FileStorage(archive, 'paczka.zip')], allowed, max_files=10, max_extracted_bytes=300)
+    archive.seek(0)
+    with pytest.raises(BatchError):
+        collect_batch_files([FileStorage(archive, 'paczka.zip')], allowed, max_files=4, max_extracted_bytes=1024)
@@ -0,0 +1,72 @@
+from app.features.shared.cache import MemoryLRUCache, SQLiteCache, hash_key
+
+
+def test_cache_round_trip_and_counters(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+
+    assert cache.get('missing') is None
+    cache.set('key', {'summary': '[]'})
+    assert cache.get('key') == {'summary': '[]'}
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+
+def test_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    SQLiteCache(path).set('key', 'value')
+
+    assert SQLiteCache(path).get('key') == 'value'
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_entries=2, touch_interval_seconds=0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_cache_lookups_do_not_write_within_the_touch_interval(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    cache.set('key', 'value')
+    changes = cache._conn.total_changes
+
+    assert cache.get('key') == 'value'
+    assert cache.get('missing') is None
+    assert cache.get_many(['key', 'missing']) == {'key': 'value'}
+    assert cache._conn.total_changes == changes
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (2, 2)
+
+
+def test_cache_expires_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), ttl_seconds=0)
+    cache.set('key', 'value')
+
+    assert cache.get('key') is None
+
+
+def test_hash_key_depends_on_every_part():
+    assert hash_key('a', 'b') != hash_key('a', 'c')
+    assert hash_key('ab', 'c') != hash_key('a', 'bc')
+
+
+def test_memory_lru_cache_evicts_least_recently_used_and_reads_through(tmp_path):
+    backing = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    cache = MemoryLRUCache(max_entries=2, backing=backing)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert list(cache._entries) == ['a', 'c']
+    assert cache.get('b') == 2  # evicted from memory, still on disk
+    assert MemoryLRUCache(backing=backing).get('c') == 3
+    assert cache.get('missing') is None
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
@@ -0,0 +1,46 @@
+import asyncio
+import concurrent.futures
+import contextvars
+
+import pytest
+
+from app.features.shared.event_loop import get_event_loop, run_coroutine
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def test_coroutines_share_one_loop_and_see_the_callers_context():
+    async def current():
+        return asyncio.get_running_loop(), request_id.get()
+
+    request_id.set('first')
+    first_loop, first_id = run_coroutine(current())
+    request_id.set('second')
+    second_loop, second_id = run_coroutine(current())
+
+    assert first_loop is second_loop is get_event_loop()
+    assert (first_id, second_id) == ('first', 'second')
+
+
+def test_errors_are_raised_and_timed_out_coroutines_cancelled():
+    async def fail():
+        raise ValueError('bad answer')
+
+    with pytest.raises(ValueError, match='bad answer'):
+        run_coroutine(fail())
+
+    cancelled = asyncio.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def wait_cancelled():
+        await asyncio.wait_for(cancelled.wait(), 5)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        run_coroutine(hang(), timeout=0.05)
+    run_coroutine(wait_cancelled())
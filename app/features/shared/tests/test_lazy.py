@@ -0,0 +1,24 @@
+import threading
+import time
+
+from app.features.shared.lazy import Lazy
+
+
+def test_value_is_built_once_by_racing_threads():
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    lazy = Lazy(build)
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(lazy.get())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values) and lazy.get() is values[0]
@@ -0,0 +1,46 @@
+import json
+import logging
+import queue
+from types import SimpleNamespace
+
+from app.features.shared.log_config import DeferredQueueHandler, JSONFormatter, SamplingFilter, configure_logging
+
+
+def make_record(level, message, *args):
+    return logging.LogRecord('app.test', level, __file__, 1, message, args, None)
+
+
+def test_json_records_and_sampling_keeps_warnings():
+    entry = json.loads(JSONFormatter().format(make_record(logging.INFO, 'Analysis of %s', 'zestawienie.xlsx')))
+    assert entry['level'] == 'INFO'
+    assert entry['message'] == 'Analysis of zestawienie.xlsx'
+
+    never = SamplingFilter(0.0)
+    assert not never.filter(make_record(logging.DEBUG, 'dropped'))
+    assert never.filter(make_record(logging.WARNING, 'kept'))
+
+
+def test_queued_records_are_left_for_the_listener_to_format():
+    formatted = []
+
+    class Analysis:
+        def __str__(self):
+            formatted.append(True)
+            return 'analysis'
+
+    log_queue = queue.Queue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.handle(make_record(logging.DEBUG, 'File processed successfully. Analysis: %s', Analysis()))
+    assert formatted == []
+    assert log_queue.get_nowait().getMessage() == 'File processed successfully. Analysis: analysis'
+
+
+def test_configure_logging_replaces_its_handler():
+    root = logging.getLogger()
+    try:
+        for _ in range(2):
+            configure_logging(SimpleNamespace(config={'LOG_LEVEL': 'DEBUG', 'LOG_QUEUE': True}))
+        assert sum(isinstance(handler, DeferredQueueHandler) for handler in root.handlers) == 1
+        assert root.level == logging.DEBUG
+    finally:
+        configure_logging(SimpleNamespace(config={'LOG_LEVEL': 'WARNING', 'LOG_QUEUE': False}))
@@ -0,0 +1,40 @@
+import pytest
+
+from app.features.shared.metrics import MetricsRegistry, collect_timings, record_span, span
+
+
+def test_histograms_and_counters_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram('llm_seconds', 'LLM latency.', buckets=(0.1, 1), label_names=('model',))
+    latency.observe(0.05, model='gpt-4o-mini')
+    latency.observe(0.5, model='gpt-4o-mini')
+    registry.counter('lookups_total', 'Lookups.', label_names=('result',)).inc(result='hit')
+
+    assert registry.render().splitlines() == [
+        '# HELP llm_seconds LLM latency.',
+        '# TYPE llm_seconds histogram',
+        'llm_seconds_bucket{model="gpt-4o-mini",le="0.1"} 1',
+        'llm_seconds_bucket{model="gpt-4o-mini",le="1"} 2',
+        'llm_seconds_bucket{model="gpt-4o-mini",le="+Inf"} 2',
+        'llm_seconds_sum{model="gpt-4o-mini"} 0.55',
+        'llm_seconds_count{model="gpt-4o-mini"} 2',
+        '# HELP lookups_total Lookups.',
+        '# TYPE lookups_total counter',
+        'lookups_total{result="hit"} 1',
+    ]
+    assert registry.histogram('llm_seconds', 'LLM latency.') is latency
+    with pytest.raises(ValueError):
+        registry.counter('llm_seconds', 'LLM latency.')
+
+
+def test_spans_are_collected_per_request():
+    with span('outside'):
+        pass
+    with collect_timings() as timings:
+        with span('read_pdf'):
+            pass
+        record_span('ask_llm', 0.25)
+        record_span('ask_llm', 0.5)
+
+    assert set(timings) == {'read_pdf', 'ask_llm'}
+    assert timings['ask_llm'] == {'count': 2, 'seconds': 0.75}
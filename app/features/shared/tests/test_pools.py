@@ -0,0 +1,20 @@
+import multiprocessing
+import sys
+
+from app.features.shared.pools import get_process_pool, get_start_method
+
+
+def imported_modules(names):
+    return [name for name in names if name in sys.modules]
+
+
+def test_workers_are_not_forked_from_the_app_process_by_default(monkeypatch):
+    monkeypatch.delenv('PROCESS_POOL_START_METHOD', raising=False)
+    assert get_start_method() != 'fork'
+    monkeypatch.setenv('PROCESS_POOL_START_METHOD', 'fork')
+    assert get_start_method() == ('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    monkeypatch.delenv('PROCESS_POOL_START_METHOD')
+
+    pool = get_process_pool('test-pools', 1, modules=('colorsys',))
+    assert pool._mp_context.get_start_method() != 'fork'
+    assert pool.submit(imported_modules, ['colorsys']).result() == ['colorsys']
@@ -0,0 +1,78 @@
+import hashlib
+import os
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, Union
+
+from flask import Request, current_app, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# A file path or an open binary file, e.g. the stream of an uploaded file
+Source = Union[str, os.PathLike, BinaryIO]
+
+
+class SpooledRequest(Request):
+    """Request keeping uploaded files in memory up to ``UPLOAD_SPOOL_MAX_MEMORY`` bytes.
+
+    Larger files spill to an anonymous temporary file, so concurrent uploads
+    never share a path and nothing is left behind on disk.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=current_app.config['UPLOAD_SPOOL_MAX_MEMORY'], mode='rb+')
+
+
+@contextmanager
+def open_source(source: Source) -> Iterator[BinaryIO]:
+    """Open a path, or rewind an already open binary file without closing it afterwards."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield f
+    else:
+        source.seek(0)
+        yield source
+
+
+def read_source(source: Source) -> bytes:
+    with open_source(source) as f:
+        return f.read()
+
+
+def hash_source(source: Source, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a path or file object, read block by block."""
+    digest = hashlib.sha256()
+    with open_source(source) as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_size(source: Source) -> int:
+    """Size in bytes of a path or of a seekable file object."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def source_name(source: Source) -> str:
+    """Base name of a path or of the file behind a file object, '' when it has none."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    name = getattr(source, 'name', None)
+    return os.path.basename(name) if isinstance(name, str) else ''
+
+
+def handle_request_too_large(error: RequestEntityTooLarge):
+    limit = current_app.config.get('MAX_CONTENT_LENGTH')
+    return jsonify({'error': f"File is too large (limit is {limit // (1024 * 1024)} MB)"}), 413
+
+
+def timings_requested() -> bool:
+    """Whether the upload response should include a timing breakdown (``?timings=1`` or UPLOAD_TIMINGS)."""
+    value = request.args.get('timings')
+    if value is not None:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return current_app.config.get('UPLOAD_TIMINGS', False)
@@ -1,3 +1,6 @@
+import os
+
+
 def format_date(date_obj, format_str='%Y-%m-%d'):
     """Format a date object to string."""
     return date_obj.strftime(format_str)
@@ -8,3 +11,27 @@ def validate_input(data, required_fields):
     if missing_fields:
         return False, f"Missing required fields: {', '.join(missing_fields)}"
     return True, "Valid input"
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment, falling back to a default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return int(value)
+
+
+def env_float(name, default):
+    """Read a float setting from the environment, falling back to a default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return float(value)
+
+
+def env_bool(name, default):
+    """Read a boolean setting from the environment, falling back to a default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
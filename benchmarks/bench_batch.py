@@ -0,0 +1,68 @@
+"""Throughput of a batch of PDFs, one upload after another versus one /batch request.
+
+Usage: python -m benchmarks.bench_batch [--files 50] [--latency 0.3] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import tempfile
+import time
+
+from app.features.pdf_processor.scheduler import LLMRequestScheduler
+from app.features.pdf_processor.services import PDFProcessorService
+from app.features.shared.cache import SQLiteCache
+from tests.fake_openai import FakeOpenAIServer
+from tests.synthetic_documents import make_pdf, report_pages
+
+
+def build_service(base_url, tokens_per_minute):
+    cache_dir = tempfile.mkdtemp()
+    return PDFProcessorService(
+        scheduler=LLMRequestScheduler(requests_per_minute=10000, tokens_per_minute=tokens_per_minute),
+        result_cache=SQLiteCache(f'{cache_dir}/results.sqlite3', max_entries=0),
+        chunk_cache=SQLiteCache(f'{cache_dir}/chunks.sqlite3', max_entries=0),
+        page_cache=SQLiteCache(f'{cache_dir}/pages.sqlite3', max_entries=0),
+        api_key='benchmark',
+        base_url=base_url,
+    )
+
+
+async def process_sequentially(service, files):
+    return [await service.process_pdf(source, filename=filename) for filename, source in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=2, help='pages of 40 defect lines per PDF')
+    parser.add_argument('--latency', type=float, default=0.3, help='fake LLM latency per request in seconds')
+    parser.add_argument('--concurrency', type=int, default=8, help='documents processed at a time by the batch')
+    # With the default LLM_TOKENS_PER_MINUTE both modes would just wait for the rate budget
+    parser.add_argument('--tokens-per-minute', type=float, default=5000000)
+    args = parser.parse_args()
+    # Keep per-request debug logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # Distinct documents, so no chunk is answered from another file's cache
+    documents = [make_pdf(report_pages(args.pages, lines_per_page=40 + n)) for n in range(args.files)]
+
+    def batch_files():
+        return [(f'protokol{n}.pdf', io.BytesIO(data)) for n, data in enumerate(documents)]
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        for mode in ('sequential', 'batch'):
+            service = build_service(server.base_url, args.tokens_per_minute)
+            requests_before = server.stats()['requests']
+            started = time.perf_counter()
+            if mode == 'sequential':
+                asyncio.run(process_sequentially(service, batch_files()))
+            else:
+                asyncio.run(service.process_batch(batch_files(), concurrency=args.concurrency))
+            elapsed = time.perf_counter() - started
+            print(f"{mode:>10}: {elapsed:.2f}s for {args.files} files ({args.files / elapsed:.1f} files/s, "
+                  f"{server.stats()['requests'] - requests_before} LLM requests)")
+
+
+if __name__ == '__main__':
+    main()
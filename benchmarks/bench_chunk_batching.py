@@ -0,0 +1,72 @@
+"""Tokens per defect and wall time of defect extraction, one chunk per request versus batched chunks.
+
+The report text is rebuilt from the defects in ``example-runs/``.
+
+Usage: python -m benchmarks.bench_chunk_batching [--run example-runs/run6.json] [--chunks-per-request 1 4 8]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+
+from app.features.pdf_processor.scheduler import LLMRequestScheduler
+from app.features.pdf_processor.services import PDFProcessorService
+from app.features.shared.cache import SQLiteCache
+from tests.fake_openai import FAKE_LOCATION, FakeOpenAIServer
+from tests.synthetic_documents import REPORT_BEGINNING
+
+
+def example_report_text(path):
+    """One "room - defect" line per defect of an example run, after the usual report beginning."""
+    with open(path, encoding='utf-8') as f:
+        defects = json.load(f)
+    lines = []
+    for defect in defects:
+        room = defect['location'].replace(FAKE_LOCATION, '').strip(' ,')
+        lines.append(f"{room} - {defect['name']}" if room else defect['name'])
+    return "\n".join(REPORT_BEGINNING + lines) + "\n"
+
+
+def build_service(base_url, chunks_per_request, chunk_tokens):
+    cache_dir = tempfile.mkdtemp()
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(f'{cache_dir}/results.sqlite3', max_entries=0),
+        chunk_cache=SQLiteCache(f'{cache_dir}/chunks.sqlite3', max_entries=0),
+        page_cache=SQLiteCache(f'{cache_dir}/pages.sqlite3', max_entries=0),
+        scheduler=LLMRequestScheduler(requests_per_minute=10000, tokens_per_minute=5000000),
+        api_key='benchmark',
+        base_url=base_url,
+    )
+    service.chunks_per_request = chunks_per_request
+    service.chunk_target_tokens = chunk_tokens
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--run', default='example-runs/run6.json')
+    parser.add_argument('--chunks-per-request', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--chunk-tokens', type=int, default=300, help='PDF_CHUNK_TARGET_TOKENS (300 is about 15 lines)')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake LLM latency per request in seconds')
+    args = parser.parse_args()
+    # Keep per-request debug logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    text = example_report_text(args.run)
+    for chunks_per_request in args.chunks_per_request:
+        with FakeOpenAIServer(latency=args.latency) as server:
+            service = build_service(server.base_url, chunks_per_request, args.chunk_tokens)
+            started = time.perf_counter()
+            defects = asyncio.run(service.generate_defect_list(text, FAKE_LOCATION))
+            elapsed = time.perf_counter() - started
+            stats = server.stats()
+        tokens = stats['prompt_tokens'] + stats['completion_tokens']
+        print(f"{chunks_per_request:>2} chunks/request: {elapsed:.2f}s, {stats['requests']} requests, "
+              f"{stats['prompt_tokens']} prompt + {stats['completion_tokens']} completion tokens, "
+              f"{len(defects)} defects, {tokens / max(len(defects), 1):.1f} tokens/defect")
+
+
+if __name__ == '__main__':
+    main()
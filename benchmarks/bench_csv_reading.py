@@ -0,0 +1,61 @@
+"""CSV parsing throughput: default pd.read_csv versus the pyarrow fast path, on wide and tall files.
+
+Usage: python -m benchmarks.bench_csv_reading [--tall-rows 2000000] [--wide-columns 500]
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.features.excel_processor.delimited import PYARROW_AVAILABLE, infer_dtypes, read_delimited
+
+OPTIONS = {'sep': ',', 'compression': None}
+
+
+def make_csv(rows, numeric_columns, text_columns=1, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({f'kolumna_{n}': rng.normal(100, 30, rows).round(3) for n in range(numeric_columns)})
+    for n in range(text_columns):
+        frame.insert(n, f'opis_{n}', [f'P.{i % 997}' for i in range(rows)])
+    return frame.to_csv(index=False).encode()
+
+
+def sample_dtypes(data):
+    return infer_dtypes(io.BytesIO(data), 1000, **OPTIONS)
+
+
+def throughput(name, data, read, repeat=3):
+    best = min(timed(read, data) for _ in range(repeat))
+    print(f"{name:>24}: {best:6.2f}s, {len(data) / 1e6 / best:7.1f} MB/s")
+
+
+def timed(read, data):
+    started = time.perf_counter()
+    read(io.BytesIO(data))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tall-rows', type=int, default=2_000_000)
+    parser.add_argument('--wide-columns', type=int, default=500)
+    args = parser.parse_args()
+
+    files = {
+        'tall': make_csv(args.tall_rows, numeric_columns=5),
+        'wide': make_csv(20_000, numeric_columns=args.wide_columns, text_columns=5),
+    }
+    for shape, data in files.items():
+        print(f"{shape}: {len(data) / 1e6:.0f} MB")
+        throughput('pd.read_csv (before)', data, pd.read_csv)
+        throughput('C engine + dtypes', data, lambda f: pd.read_csv(f, dtype=sample_dtypes(data)))
+        if PYARROW_AVAILABLE:
+            throughput('pyarrow + dtypes (after)', data, lambda f: read_delimited(f, OPTIONS, engine='pyarrow'))
+        else:
+            print("pyarrow is not installed, the fast path falls back to pd.read_csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Defects kept and time taken by exact-only and fuzzy deduplication.
+
+Runs over the defects in ``example-runs/``, one run at a time and all runs
+together, then over a synthetic list of many variants of those defects to
+show how the index scales.
+
+Usage: python -m benchmarks.bench_dedup [--threshold 0.8] [--scale 10000 50000]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import time
+
+from app.features.pdf_processor.dedup import deduplicate_defects
+
+
+def load_runs(pattern):
+    runs = {}
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding='utf-8') as f:
+            runs[os.path.basename(path)] = json.load(f)
+    return runs
+
+
+def measure(defects, threshold):
+    started = time.perf_counter()
+    unique = deduplicate_defects(defects, threshold)
+    return len(unique), time.perf_counter() - started
+
+
+def variants(defects, count, seed=0):
+    """Reworded copies of ``defects``: changed case, punctuation, stripped diacritics and other room numbers."""
+    rng = random.Random(seed)
+    plain = str.maketrans('ąćęłńóśźżĄĆĘŁŃÓŚŹŻ', 'acelnoszzACELNOSZZ')
+    result = []
+    for n in range(count):
+        defect = dict(rng.choice(defects))
+        change = rng.randrange(4)
+        if change == 0:
+            defect['name'] = defect['name'].upper()
+        elif change == 1:
+            defect['name'] = defect['name'].translate(plain) + '.'
+        elif change == 2:
+            defect['location'] = f"{defect['location']}, P.{rng.randrange(count // 10 + 1)}"
+        result.append(defect)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', default='example-runs/*.json')
+    parser.add_argument('--threshold', type=float, default=0.8, help='PDF_DEDUP_THRESHOLD')
+    parser.add_argument('--scale', type=int, nargs='+', default=[10000, 50000], help='synthetic defect counts')
+    args = parser.parse_args()
+
+    runs = load_runs(args.runs)
+    everything = [defect for defects in runs.values() for defect in defects]
+    for label, defects in [*runs.items(), ('all runs', everything), *(
+            (f'{count} variants', variants(everything, count)) for count in args.scale)]:
+        exact, exact_seconds = measure(defects, 1)
+        fuzzy, fuzzy_seconds = measure(defects, args.threshold)
+        print(f"{label:>18}: {len(defects):>6} defects, exact {exact:>6} ({exact_seconds:.2f}s), "
+              f"fuzzy {fuzzy:>6} ({fuzzy_seconds:.2f}s, {fuzzy_seconds / len(defects) * 1e6:.0f}us/defect)")
+
+
+if __name__ == '__main__':
+    main()
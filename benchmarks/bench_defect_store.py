@@ -0,0 +1,108 @@
+"""Ingestion rate and query latency of the defect store at millions of defects.
+
+Records synthetic reports (random buildings, rooms and defect descriptions)
+through ``DefectStore.record_document``, timing both the caller's cost per
+document and the background writer's throughput, then reports the median
+latency of typical searches: full-text, filtered, combined and deep pages.
+
+Usage: python -m benchmarks.bench_defect_store [--defects 1000000] [--per-document 200] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.features.defect_store.models import DefectStore
+from app.features.defect_store.services import DefectStoreService
+
+ELEMENTS = ['okno', 'drzwi', 'ściana', 'sufit', 'posadzka', 'płytka terakoty', 'grzejnik', 'parapet', 'rynna',
+            'balustrada', 'kratka wentylacyjna', 'oświetlenie', 'umywalka', 'tynk', 'elewacja', 'dach']
+PROBLEMS = ['do regulacji', 'pęknięcie', 'zawilgocenie', 'odspojenie', 'zarysowanie', 'nieszczelność',
+            'uszkodzenie mechaniczne', 'zabrudzenie', 'korozja', 'brak uszczelki', 'odbarwienie', 'luz']
+PLACES = ['przy oknie', 'przy wejściu', 'w narożniku', 'pod parapetem', 'nad drzwiami', 'przy grzejniku', '']
+CITIES = ['Zamościu', 'Lublinie', 'Chełmie', 'Biłgoraju', 'Krasnymstawie', 'Tomaszowie', 'Hrubieszowie',
+          'Puławach', 'Świdniku', 'Łukowie']
+KINDS = ['Sąd Rejonowy', 'Sąd Okręgowy', 'Prokuratura Rejonowa', 'Urząd Skarbowy', 'Szkoła Podstawowa nr 3',
+         'Przychodnia', 'Komenda Powiatowa Policji', 'Biblioteka Miejska', 'Hala sportowa', 'Urząd Gminy']
+BUILDINGS = [f'{kind} w {city}' for kind in KINDS for city in CITIES]
+RARE_WORD = 'azbestowy'
+
+
+def make_document(rng, per_document):
+    building = rng.choice(BUILDINGS)
+    defects = []
+    for _ in range(per_document):
+        room = rng.choice([f'P.{rng.randrange(1, 400)}{rng.choice(["", "A", "B"])}', f'WC{rng.randrange(1, 20)}',
+                           f'sala rozpraw nr {rng.randrange(1, 60)}', f'korytarz {rng.randrange(0, 5)} piętro'])
+        name = f'{rng.choice(ELEMENTS)} - {rng.choice(PROBLEMS)} {rng.choice(PLACES)}'.strip()
+        if rng.random() < 0.0001:
+            name += f' {RARE_WORD}'
+        defects.append({'name': name[0].upper() + name[1:], 'location': f'{building} {room}'})
+    return building, defects
+
+
+def timed(run, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--defects', type=int, default=1000000)
+    parser.add_argument('--per-document', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rng = random.Random(0)
+    store = DefectStore(os.path.join(tempfile.mkdtemp(), 'defects.sqlite3'))
+    documents = args.defects // args.per_document
+    # Built up front, so only record_document is timed on the caller's side
+    reports = [make_document(rng, args.per_document) for _ in range(documents)]
+
+    caller_seconds = 0.0
+    started = time.perf_counter()
+    for number, (building, defects) in enumerate(reports):
+        call_started = time.perf_counter()
+        store.record_document(f'{number:064x}', f'protokol-{number}.pdf', building, defects)
+        caller_seconds += time.perf_counter() - call_started
+    store.flush()
+    ingest_seconds = time.perf_counter() - started
+    print(f"{documents} documents, {documents * args.per_document} defects: {ingest_seconds:.1f}s to write "
+          f"({documents * args.per_document / ingest_seconds:,.0f} defects/s), "
+          f"{caller_seconds / documents * 1e6:.0f} us per record_document call, "
+          f"{os.path.getsize(store.path) / 1e6:.0f} MB", flush=True)
+
+    building = reports[len(reports) // 2][0]
+    room = reports[len(reports) // 2][1][0]['location'][len(building):].strip()
+    last_page_cursor = args.per_document
+    queries = {
+        'newest page': {},
+        'common word': {'query': 'okno'},
+        'two words': {'query': 'zawilgocenie przy oknie'},
+        'rare word': {'query': RARE_WORD},
+        'diacritics folded': {'query': 'pekniecie sciana'},
+        'building': {'building': building},
+        'room': {'room': room},
+        'word + building': {'query': 'korozja', 'building': building},
+        'word + room': {'query': 'okno', 'room': room},
+        'document': {'document': f'{documents // 2:064x}'},
+        'last page': {'before': last_page_cursor},
+        'word, last page': {'query': 'okno', 'before': last_page_cursor},
+    }
+    service = DefectStoreService(store)
+    for name, arguments in queries.items():
+        service.search(**arguments)  # warm the page cache
+        seconds, result = timed(lambda: service.search(**arguments), args.repeat)
+        print(f"{name:>18}: {seconds * 1000:7.2f} ms, {len(result['defects'])} defects", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Workbook reading: one pd.read_excel call per sheet versus a single pass over the workbook.
+
+Usage: python -m benchmarks.bench_excel_reading [--sheets 20] [--rows 5000] [--columns 8]
+"""
+import argparse
+import io
+import logging
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.shared.cache import MemoryLRUCache
+from benchmarks.memory import measure
+from tests.synthetic_documents import make_workbook
+
+# Measure real parses, not result cache hits
+NO_CACHE = MemoryLRUCache(0)
+
+
+def process_excel_per_sheet(service, data):
+    """The reader used before, which re-opened the workbook for every sheet."""
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    summary = {'sheet_names': workbook.sheetnames, 'active_sheet': workbook.active.title, 'sheet_summaries': {}}
+    for sheet_name in workbook.sheetnames:
+        df = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name)
+        summary['sheet_summaries'][sheet_name] = service._generate_summary_from_dataframe(df, sheet_name)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sheets', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=5000, help='rows per sheet')
+    parser.add_argument('--columns', type=int, default=8)
+    args = parser.parse_args()
+    # Keep the service's debug logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    data = make_workbook(args.sheets, args.rows, args.columns)
+    print(f"{args.sheets} sheets x {args.rows} rows x {args.columns} columns, {len(data) / 1e6:.1f} MB")
+
+    service = ExcelProcessorService(result_cache=NO_CACHE)
+    measure('per sheet', lambda: process_excel_per_sheet(service, data))
+    measure('single pass', lambda: service.process_excel(io.BytesIO(data), filename='benchmark.xlsx'))
+
+
+if __name__ == '__main__':
+    main()
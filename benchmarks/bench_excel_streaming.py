@@ -0,0 +1,52 @@
+"""Exact versus streaming summaries of a large CSV file: time, peak memory and quartile error.
+
+Usage: python -m benchmarks.bench_excel_streaming [--rows 1000000] [--columns 10]
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.shared.cache import MemoryLRUCache
+from benchmarks.memory import measure
+
+# Measure real parses, not result cache hits
+NO_CACHE = MemoryLRUCache(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--columns', type=int, default=10)
+    args = parser.parse_args()
+    # Keep the service's debug logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({f'kolumna_{column}': rng.lognormal(3, 1, args.rows) for column in range(args.columns)})
+    frame.insert(0, 'pomieszczenie', [f'P.{n % 500}' for n in range(args.rows)])
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    frame.to_csv(path, index=False)
+    del frame
+    print(f"{args.rows} rows x {args.columns + 1} columns, {os.path.getsize(path) / 1e6:.0f} MB")
+
+    exact = ExcelProcessorService(summary_mode='exact', result_cache=NO_CACHE)
+    streaming = ExcelProcessorService(summary_mode='streaming', result_cache=NO_CACHE)
+    measure('exact', lambda: exact.process_excel(path))
+    measure('streaming', lambda: streaming.process_excel(path))
+
+    expected = exact.process_excel(path)['summary']['statistics']
+    actual = streaming.process_excel(path)['summary']['statistics']
+    worst = max(abs(actual[column][stat] - value) / value
+                for column, stats in expected.items() for stat, value in stats.items() if stat.endswith('%'))
+    print(f"largest relative quartile error: {worst:.2%}")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
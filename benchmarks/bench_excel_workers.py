@@ -0,0 +1,48 @@
+"""Sheet summarization scaling across worker processes.
+
+Usage: python -m benchmarks.bench_excel_workers [--sheets 16] [--rows 10000] [--workers 1 2 4 8]
+"""
+import argparse
+import io
+import logging
+import os
+import time
+
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.shared.cache import MemoryLRUCache
+from app.features.shared.pools import get_process_pool
+from tests.synthetic_documents import make_workbook
+
+# Measure real parses, not result cache hits
+NO_CACHE = MemoryLRUCache(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sheets', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=10000, help='rows per sheet')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    # Keep the service's debug logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    data = make_workbook(args.sheets, args.rows)
+    print(f"{args.sheets} sheets x {args.rows} rows, {len(data) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in args.workers:
+        service = ExcelProcessorService(summary_mode='exact', workers=workers, parallel_min_bytes=0,
+                                        result_cache=NO_CACHE)
+        if workers > 1:
+            # Start the worker processes outside of the measurement
+            pool = get_process_pool('excel-summaries', workers, modules=('app.features.excel_processor.services',))
+            list(pool.map(int, range(workers)))
+        started = time.perf_counter()
+        service.process_excel(io.BytesIO(data), filename='benchmark.xlsx')
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(f"{workers:>2} worker(s): {elapsed:6.2f}s, speedup x{baseline / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
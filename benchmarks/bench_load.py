@@ -0,0 +1,110 @@
+"""Latency of concurrent PDF uploads: an event loop per request versus the shared event loop.
+
+Each client thread stands for a request thread of a worker and processes
+small, distinct PDFs one after another. With ``per-request`` every upload
+runs in its own ``asyncio.run`` loop, as the async Flask views did, so the
+client's pooled connections belong to other loops, which fails or stalls
+requests until they time out and are retried; ``shared`` runs
+every upload on the worker's long-lived loop and keeps its connections.
+With more than one thread the per-request loops also stall on each
+other's connections, so expect that mode to take minutes.
+
+Usage: python -m benchmarks.bench_load [--requests 100] [--threads 1] [--modes per-request shared]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import tempfile
+import threading
+import time
+
+from app.features.pdf_processor.scheduler import LLMRequestScheduler
+from app.features.pdf_processor.services import PDFProcessorService
+from app.features.shared.cache import SQLiteCache
+from app.features.shared.event_loop import run_coroutine
+from tests.fake_openai import FakeOpenAIServer
+from tests.synthetic_documents import make_pdf, report_pages
+
+
+def build_service(base_url, request_timeout):
+    cache_dir = tempfile.mkdtemp()
+    service = PDFProcessorService(
+        scheduler=LLMRequestScheduler(requests_per_minute=100000, tokens_per_minute=50000000,
+                                      request_timeout=request_timeout),
+        result_cache=SQLiteCache(f'{cache_dir}/results.sqlite3', max_entries=0),
+        chunk_cache=SQLiteCache(f'{cache_dir}/chunks.sqlite3', max_entries=0),
+        page_cache=SQLiteCache(f'{cache_dir}/pages.sqlite3', max_entries=0),
+        api_key='benchmark',
+        base_url=base_url,
+    )
+    service.extraction_workers = 1
+    return service
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_load(mode, service, documents, threads):
+    latencies = []
+    lock = threading.Lock()
+    queue = list(enumerate(documents))
+
+    def client():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                n, data = queue.pop()
+            started = time.perf_counter()
+            upload = service.process_pdf(io.BytesIO(data), filename=f'protokol{n}.pdf')
+            if mode == 'per-request':
+                asyncio.run(upload)
+            else:
+                run_coroutine(upload)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=1, help='concurrent requests: 1 for a sync worker, more for gthread')
+    parser.add_argument('--modes', nargs='+', choices=['per-request', 'shared'], default=['per-request', 'shared'])
+    parser.add_argument('--latency', type=float, default=0.05, help='fake LLM latency per request in seconds')
+    # Requests stuck on a connection of another loop only recover through the timeout (LLM_REQUEST_TIMEOUT)
+    parser.add_argument('--request-timeout', type=float, default=5.0)
+    args = parser.parse_args()
+    # Keep per-request debug logging and retry messages from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    documents = [make_pdf(report_pages(1, lines_per_page=10 + n % 20)) for n in range(args.requests)]
+    with FakeOpenAIServer(latency=args.latency) as server:
+        for mode in args.modes:
+            service = build_service(server.base_url, args.request_timeout)
+            before = server.stats()
+            started = time.perf_counter()
+            latencies = run_load(mode, service, documents, args.threads)
+            elapsed = time.perf_counter() - started
+            after = server.stats()
+            stats = service.scheduler.stats()
+            print(f"{mode:>11} loop: p50 {percentile(latencies, 0.5) * 1000:.0f}ms, "
+                  f"p99 {percentile(latencies, 0.99) * 1000:.0f}ms, "
+                  f"mean {statistics.mean(latencies) * 1000:.0f}ms, {args.requests / elapsed:.1f} uploads/s, "
+                  f"{after['requests'] - before['requests']} LLM requests, "
+                  f"{after['connections'] - before['connections']} connections, "
+                  f"{stats['retries']} retries ({stats['timeouts']} timeouts)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Critical path of location + defect extraction, sequential versus speculative.
+
+Usage: python -m benchmarks.bench_location_pipeline [--latency 0.5] [--pages 5]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from app.features.pdf_processor.services import PDFProcessorService
+from app.features.shared.cache import SQLiteCache
+from tests.fake_openai import FakeOpenAIServer
+from tests.synthetic_documents import make_pdf, report_pages
+
+
+def build_service(base_url, speculative):
+    cache_dir = tempfile.mkdtemp()
+    service = PDFProcessorService(
+        result_cache=SQLiteCache(f'{cache_dir}/results.sqlite3', max_entries=0),
+        chunk_cache=SQLiteCache(f'{cache_dir}/chunks.sqlite3', max_entries=0),
+        page_cache=SQLiteCache(f'{cache_dir}/pages.sqlite3', max_entries=0),
+        api_key='benchmark',
+        base_url=base_url,
+    )
+    service.speculative_location = speculative
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.5, help='fake LLM latency per request in seconds')
+    parser.add_argument('--pages', type=int, default=5, help='pages of 40 defect lines in the synthetic report')
+    args = parser.parse_args()
+
+    fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(make_pdf(report_pages(args.pages)))
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        for speculative in (False, True):
+            service = build_service(server.base_url, speculative)
+            timings = asyncio.run(service.process_pdf(pdf_path)).timings
+            mode = 'speculative' if speculative else 'sequential'
+            print(f"{mode:>12}: total {timings['total']:.2f}s "
+                  f"(text extracted at {timings['read_pdf']:.2f}s, location at {timings['location']:.2f}s, "
+                  f"defects at {timings['defects']:.2f}s)")
+    os.remove(pdf_path)
+
+
+if __name__ == '__main__':
+    main()
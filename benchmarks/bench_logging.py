@@ -0,0 +1,101 @@
+"""Request-thread CPU spent on logging per Excel upload under different logging setups.
+
+Analyses a wide workbook (200 columns by default) once, then replays the
+records the upload route logs for it, including the analysis itself, and
+reports the CPU time of the calling thread (``time.thread_time``), which is
+what logging takes away from request handling. The analysis itself is timed
+once for scale.
+
+- ``basicConfig``: the old setup, a DEBUG root logger writing synchronously
+- ``production``: INFO records handed to the background listener
+- ``debug_queue``: DEBUG records, formatted on the listener thread
+- ``debug_sampled``: as above, keeping 10% of DEBUG and INFO records
+
+Log output goes to ``/dev/null``.
+
+Usage: python -m benchmarks.bench_logging [--columns 200] [--rows 100] [--requests 200]
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from app.features.excel_processor import views
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.shared import log_config
+from app.features.shared.cache import MemoryLRUCache
+from tests.synthetic_documents import make_workbook
+
+SETUPS = {
+    'basicConfig': None,
+    'production': {'LOG_LEVEL': 'INFO', 'LOG_QUEUE': True},
+    'debug_queue': {'LOG_LEVEL': 'DEBUG', 'LOG_QUEUE': True},
+    'debug_sampled': {'LOG_LEVEL': 'DEBUG', 'LOG_QUEUE': True, 'LOG_SAMPLE_RATE': 0.1},
+}
+
+
+def use_setup(settings, devnull):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    log_config.stop_logging()
+    if settings is None:
+        logging.basicConfig(level=logging.DEBUG, stream=devnull, force=True)
+        return
+    # configure_logging writes to sys.stderr when it builds the handler
+    stderr, sys.stderr = sys.stderr, devnull
+    try:
+        log_config.configure_logging(SimpleNamespace(config=settings))
+    finally:
+        sys.stderr = stderr
+
+
+def log_upload(analysis):
+    """The records ``upload_excel`` logs for a successful upload."""
+    views.logger.debug("Received request to upload file.")
+    views.logger.debug("Checking if a file is selected.")
+    views.logger.debug("File selected: %s", 'zestawienie.xlsx')
+    views.logger.debug("Processing file...")
+    views.logger.debug("File processed successfully. Analysis: %s", analysis)
+
+
+def measure(analysis, requests):
+    started = time.thread_time()
+    for _ in range(requests):
+        log_upload(analysis)
+    return (time.thread_time() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--columns', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    data = make_workbook(1, args.rows, columns=args.columns)
+    started = time.thread_time()
+    # Measure a real parse, not a result cache hit
+    analysis = ExcelProcessorService(result_cache=MemoryLRUCache(0)).process_excel(
+        io.BytesIO(data), filename='zestawienie.xlsx')
+    print(f"{args.columns} columns x {args.rows} rows: {(time.thread_time() - started) * 1000:.0f} ms CPU to "
+          f"analyse, {len(str(analysis)) / 1024:.0f} KB analysis, logging measured over {args.requests} requests")
+
+    with open(os.devnull, 'w') as devnull:
+        baseline = None
+        for name, settings in SETUPS.items():
+            use_setup(settings, devnull)
+            cpu = measure(analysis, args.requests)
+            log_config.stop_logging()
+            baseline = baseline or cpu
+            print(f"{name:>14}: {cpu * 1000:7.3f} ms CPU per request ({(baseline - cpu) * 1000:+.3f} ms saved)",
+                  flush=True)
+        use_setup({'LOG_LEVEL': 'WARNING', 'LOG_QUEUE': False}, devnull)
+
+
+if __name__ == '__main__':
+    main()
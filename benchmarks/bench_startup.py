@@ -0,0 +1,101 @@
+"""Cold start: time to import the app and latency of the first requests of a fresh process.
+
+Every run starts a new interpreter, as a worker does after a deploy or a
+Render spin-down, imports ``app`` (which builds the application) and sends
+one request of each kind in order, timing each. It also reports which heavy
+libraries had to be loaded by then.
+
+``--preload`` measures gunicorn's ``preload_app``: the interpreter imports
+the app and runs ``preload_features()`` (as ``gunicorn.conf.py`` does in
+the master), then forks; the first requests are timed in the forked
+"worker".
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--preload]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ('pandas', 'openpyxl', 'PyPDF2', 'openai', 'numpy')
+
+CHILD = r'''
+import io, json, os, sys, time
+started = time.perf_counter()
+from app import app
+results = {'import_app': time.perf_counter() - started}
+if PRELOAD:
+    from app.features import preload_features
+    started = time.perf_counter()
+    preload_features()
+    results['preload'] = time.perf_counter() - started
+    read_end, write_end = os.pipe()
+    if os.fork():
+        os.close(write_end)
+        with os.fdopen(read_end) as f:
+            results.update(json.loads(f.read()))
+        os.wait()
+        print(json.dumps(results))
+        sys.exit(0)
+    os.close(read_end)
+    results = {}
+
+client = app.test_client()
+requests = [
+    ('home', 'GET', '/', None),
+    ('pdf_page', 'GET', '/pdf-processor/', None),
+    ('defect_search', 'GET', '/defects/search?q=okno', None),
+]
+for name, method, url, data in requests:
+    started = time.perf_counter()
+    response = client.open(url, method=method, data=data)
+    results[name] = time.perf_counter() - started
+    assert response.status_code == 200, (url, response.status_code)
+results['heavy_after_pages'] = sorted(name for name in HEAVY_MODULES if name in sys.modules)
+
+started = time.perf_counter()
+response = client.post('/excel-processor/upload',
+                       data={'file': (io.BytesIO(b'room,area\nP.1,12.5\n'), 'rooms.csv')})
+results['first_csv_upload'] = time.perf_counter() - started
+assert response.status_code == 200, response.get_data(as_text=True)
+
+if PRELOAD:
+    with os.fdopen(write_end, 'w') as f:
+        f.write(json.dumps(results))
+    os._exit(0)
+print(json.dumps(results))
+'''
+
+
+def run_once(preload):
+    env = {
+        **os.environ,
+        'CACHE_DIR': tempfile.mkdtemp(prefix='bench-startup-'),
+        'LOG_LEVEL': 'WARNING',
+    }
+    code = f'HEAVY_MODULES = {HEAVY_MODULES!r}\nPRELOAD = {preload!r}\n' + CHILD
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--preload', action='store_true', help='fork a worker after preload_features()')
+    args = parser.parse_args()
+
+    runs = [run_once(args.preload) for _ in range(args.runs)]
+    print(f"median of {args.runs} fresh processes{' (preloaded, forked worker)' if args.preload else ''}:")
+    for name in runs[0]:
+        if name == 'heavy_after_pages':
+            print(f"{'loaded by pages':>18}: {', '.join(runs[0][name]) or 'none'}")
+            continue
+        print(f"{name:>18}: {statistics.median(run[name] for run in runs) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Time and peak memory of a function, measured in a forked child (Linux only)."""
+import json
+import os
+import time
+
+
+def read_status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+
+def run_in_child(run):
+    """Run ``run`` in a forked child and return its wall time, memory and the metrics it returns.
+
+    ``run`` may return a dict of JSON-serializable metrics; an exception in
+    the child is raised again as a ``RuntimeError``.
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        try:
+            # Reset the peak RSS counter so only this run is measured
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            start_rss = read_status_kb('VmRSS')
+            started = time.perf_counter()
+            metrics = run() or {}
+            result = {
+                'wall_seconds': time.perf_counter() - started,
+                'peak_rss_mb': read_status_kb('VmHWM') / 1024,
+                'rss_growth_mb': (read_status_kb('VmHWM') - start_rss) / 1024,
+                **metrics,
+            }
+        except BaseException as e:
+            result = {'error': f'{type(e).__name__}: {e}'}
+        with os.fdopen(write_end, 'w') as f:
+            json.dump(result, f)
+        os._exit(0)
+
+    os.close(write_end)
+    with os.fdopen(read_end) as f:
+        output = f.read()
+    os.waitpid(pid, 0)
+    result = json.loads(output) if output else {'error': 'The benchmark process died'}
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+
+def measure(name, run):
+    """Run ``run`` in a forked child and print its wall time and memory growth."""
+    def run_ignoring_result():
+        run()
+
+    result = run_in_child(run_ignoring_result)
+    print(f"{name:>12}: {result['wall_seconds']:6.2f}s, peak memory +{result['rss_growth_mb']:.1f} MB", flush=True)
@@ -0,0 +1,150 @@
+"""End-to-end benchmark suite compared against a JSON baseline.
+
+Every scenario builds its synthetic inspection report or workbook, runs it
+through ``PDFProcessorService.process_pdf`` or
+``ExcelProcessorService.process_excel`` in a forked child, with the PDF
+service talking to the fake OpenAI server at the scenario's latency and
+error rate, and records wall time, LLM requests, tokens sent, peak RSS and
+defects extracted.
+
+Results are compared with ``benchmarks/baseline.json``: a metric more than
+``--tolerance`` worse than its baseline (slower, more requests, tokens or
+memory, fewer defects) is reported as a regression and the command exits
+with status 1. ``--update-baseline`` writes the results as the new baseline.
+
+Usage: python -m benchmarks.suite [--scenarios pdf_report excel_workbook] [--tolerance 0.25] [--update-baseline]
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+
+from app.features.excel_processor.services import ExcelProcessorService
+from app.features.pdf_processor.scheduler import LLMRequestScheduler
+from app.features.pdf_processor.services import PDFProcessorService
+from app.features.shared.cache import MemoryLRUCache, SQLiteCache
+from benchmarks.memory import run_in_child
+from tests.fake_openai import FakeOpenAIServer
+from tests.synthetic_documents import make_pdf, make_workbook, report_pages
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+SCENARIOS = {
+    'pdf_report': {'kind': 'pdf', 'pages': 4, 'latency': 0.1},
+    'pdf_long_report': {'kind': 'pdf', 'pages': 40, 'latency': 0.1},
+    'pdf_rate_limited': {'kind': 'pdf', 'pages': 8, 'latency': 0.1, 'error_rate': 0.3},
+    'excel_workbook': {'kind': 'excel', 'sheets': 4, 'rows': 10000},
+}
+
+# Metrics where a higher value is a regression; fewer defects is one as well
+HIGHER_IS_WORSE = ('wall_seconds', 'llm_requests', 'prompt_tokens', 'peak_rss_mb')
+
+
+def run_pdf(data):
+    cache_dir = tempfile.mkdtemp()
+    service = PDFProcessorService(
+        # Only the fake server's latency and 429s should limit the run, with short backoffs
+        scheduler=LLMRequestScheduler(requests_per_minute=10000, tokens_per_minute=5000000, backoff_base=0.1),
+        result_cache=SQLiteCache(f'{cache_dir}/results.sqlite3', max_entries=0),
+        chunk_cache=SQLiteCache(f'{cache_dir}/chunks.sqlite3', max_entries=0),
+        page_cache=SQLiteCache(f'{cache_dir}/pages.sqlite3', max_entries=0),
+        api_key='benchmark',
+        base_url=os.environ['BENCHMARK_OPENAI_BASE_URL'],
+    )
+
+    async def count_defects():
+        defects = 0
+        async for event, payload in service.stream_pdf(io.BytesIO(data), filename='protokol.pdf'):
+            if event == 'defects':
+                defects += len(payload['defects'])
+        return defects
+
+    return {'defects': asyncio.run(count_defects())}
+
+
+def run_excel(data):
+    service = ExcelProcessorService(result_cache=MemoryLRUCache(0))
+    analysis = service.process_excel(io.BytesIO(data), filename='zestawienie.xlsx')
+    return {'sheets': len(analysis['summary']['sheet_summaries'])}
+
+
+def run_scenario(name):
+    scenario = SCENARIOS[name]
+    if scenario['kind'] == 'excel':
+        data = make_workbook(scenario['sheets'], scenario['rows'])
+        return run_in_child(lambda: run_excel(data))
+
+    data = make_pdf(report_pages(scenario['pages']))
+    with FakeOpenAIServer(latency=scenario['latency'], error_rate=scenario.get('error_rate', 0.0)) as server:
+        os.environ['BENCHMARK_OPENAI_BASE_URL'] = server.base_url
+        result = run_in_child(lambda: run_pdf(data))
+        stats = server.stats()
+    return {
+        **result,
+        'llm_requests': stats['requests'],
+        'rate_limited': stats['rate_limited'],
+        'prompt_tokens': stats['prompt_tokens'],
+        'completion_tokens': stats['completion_tokens'],
+    }
+
+
+def find_regressions(name, result, baseline, tolerance):
+    regressions = []
+    for metric in HIGHER_IS_WORSE:
+        if metric in result and baseline.get(metric) and result[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{name}: {metric} {result[metric]:.2f} vs baseline {baseline[metric]:.2f}")
+    if 'defects' in baseline and result.get('defects', 0) < baseline['defects']:
+        regressions.append(f"{name}: defects {result.get('defects', 0)} vs baseline {baseline['defects']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown or growth')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+    # Keep per-request debug logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results, regressions = {}, []
+    for name in args.scenarios:
+        result = results[name] = run_scenario(name)
+        print(f"{name:>16}: {result['wall_seconds']:6.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB"
+              + (f", {result['llm_requests']} LLM requests ({result['rate_limited']} rate limited), "
+                 f"{result['prompt_tokens']} prompt tokens, {result['defects']} defects"
+                 if 'llm_requests' in result else ''), flush=True)
+        if name in baseline.get('scenarios', {}):
+            regressions += find_regressions(name, result, baseline['scenarios'][name], args.tolerance)
+
+    if args.update_baseline:
+        scenarios = {**baseline.get('scenarios', {}), **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'environment': {'python': platform.python_version(), 'cpus': os.cpu_count()},
+                'scenarios': {name: {metric: round(value, 3) if isinstance(value, float) else value
+                                     for metric, value in metrics.items()}
+                              for name, metrics in sorted(scenarios.items())},
+            }, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
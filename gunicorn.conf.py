@@ -0,0 +1,42 @@
+"""Gunicorn settings, read from the working directory by ``gunicorn app:app``.
+
+The app imports without its heavy libraries, so a worker answers its first
+page quickly after a deploy or a Render spin-down. ``WARM_UP`` decides when
+the services and the libraries they load (pandas, openpyxl, PyPDF2, the
+OpenAI SDK) are prepared:
+
+- ``background`` (default): each worker builds them on a thread right after
+  it starts, while it already serves requests.
+- ``preload``: the master also imports them before forking the workers,
+  which then share those pages copy-on-write (needs ``GUNICORN_PRELOAD``).
+- ``off``: on the first request that needs them.
+
+Workers serve requests on threads (``GUNICORN_THREADS``), so a long
+``/pdf-processor/stream`` or synchronous upload does not block the health
+check and other requests, and the worker keeps heart-beating while it runs.
+"""
+import os
+import threading
+
+WARM_UP = os.getenv('WARM_UP', 'background').strip().lower()
+
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+# Seconds a worker may go silent before the master restarts it; with gthread this is not a request limit
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Load the app once in the master and fork workers from it
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if WARM_UP == 'preload' and preload_app:
+        from app.features import preload_features
+        preload_features()
+
+
+def post_worker_init(worker):
+    if WARM_UP in ('background', 'preload'):
+        from app.features import warm_up_features
+        threading.Thread(target=warm_up_features, name='warm-up', daemon=True).start()
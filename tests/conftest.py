@@ -1,4 +1,13 @@
+import os
+import tempfile
+
 import pytest
+
+# Keep on-disk caches out of the source tree while testing
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='test-cache-'))
+# Background PDF job workers are exercised directly in the feature tests
+os.environ.setdefault('PDF_JOB_WORKERS', '0')
+
 from app import create_app
 
 @pytest.fixture
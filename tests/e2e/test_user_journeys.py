@@ -1,13 +1,48 @@
-def test_complete_user_journey(client):
+import json
+from io import BytesIO
+
+from openai import AsyncOpenAI, OpenAI
+
+from app.features.pdf_processor import views as pdf_views
+from tests.fake_openai import FAKE_LOCATION, FakeOpenAIServer
+from tests.synthetic_documents import make_pdf, report_pages
+
+
+def test_complete_user_journey(client, monkeypatch):
     """Test a complete user journey through the application."""
     # Visit homepage
     response = client.get('/')
     assert response.status_code == 200
-    
-    # Navigate to feature one
-    response = client.get('/feature-one/')
+
+    # Navigate to the PDF processor
+    response = client.get('/pdf-processor/')
     assert response.status_code == 200
-    
-    # Navigate to feature two
-    response = client.get('/feature-two/')
+
+    # Navigate to the Excel processor
+    response = client.get('/excel-processor/')
     assert response.status_code == 200
+
+    # Analyse a spreadsheet
+    response = client.post('/excel-processor/upload', data={'file': (BytesIO(b'room,area\nP.1,12.5\n'), 'rooms.csv')})
+    assert response.status_code == 200
+    assert response.get_json()['analysis']['summary']['rows'] == 1
+
+    # Extract the defects of an inspection report, answered by a local fake OpenAI server
+    with FakeOpenAIServer() as server:
+        monkeypatch.setattr(pdf_views.service, 'client', OpenAI(api_key='test', base_url=server.base_url))
+        monkeypatch.setattr(pdf_views.service, 'client_async',
+                            AsyncOpenAI(api_key='test', base_url=server.base_url, max_retries=0))
+        report = make_pdf(report_pages(1, lines_per_page=5))
+        response = client.post('/pdf-processor/upload', data={'file': (BytesIO(report), 'protokol.pdf')})
+
+    assert response.status_code == 200
+    defects = json.loads(response.get_json()['summary'])
+    assert 'P.4 - pekniecie plytki terakoty przy oknie nr 4' in [defect['name'] for defect in defects]
+    assert {defect['location'] for defect in defects} == {FAKE_LOCATION}
+
+    # Find the extracted defects again in the defect store
+    assert pdf_views.service.defect_store.flush(timeout=5)
+    response = client.get('/defects/search', query_string={'q': 'terakoty nr 4', 'building': FAKE_LOCATION})
+    assert response.status_code == 200
+    assert 'P.4 - pekniecie plytki terakoty przy oknie nr 4' in [
+        defect['name'] for defect in response.get_json()['defects']]
@@ -0,0 +1,164 @@
+"""Local OpenAI-compatible chat completions server for tests and benchmarks."""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DOCUMENT_PATTERN = re.compile(r'<document>(.*?)</document>', re.DOTALL)
+CHUNK_PATTERN = re.compile(r'<chunk id="([^"]+)">(.*?)</chunk>', re.DOTALL)
+FAKE_LOCATION = 'Sąd Okręgowy i Rejonowy w Zamościu'
+
+
+def defects_of(text):
+    return [{'name': line.strip(), 'location': FAKE_LOCATION} for line in text.split('\n') if line.strip()]
+
+
+def default_responder(messages):
+    """Answer location prompts with a fixed place and defect prompts with one defect per line.
+
+    Defects come as ``{"defects": [...]}`` when the prompt asks for that form, and
+    batched prompts get a json object with the defects of each ``<chunk id="...">`` section.
+    """
+    prompt = messages[-1]['content']
+    if 'provide a location' in prompt:
+        return FAKE_LOCATION
+
+    match = DOCUMENT_PATTERN.search(prompt)
+    document = match.group(1) if match else ''
+    sections = CHUNK_PATTERN.findall(document)
+    if sections:
+        return json.dumps({chunk_id: defects_of(text) for chunk_id, text in sections}, ensure_ascii=False)
+    if '"defects"' in prompt:
+        # JSON mode answers are objects
+        return json.dumps({'defects': defects_of(document)}, ensure_ascii=False)
+    return json.dumps(defects_of(document), ensure_ascii=False)
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server imitating ``POST /v1/chat/completions``.
+
+    ``latency`` seconds are added to every response, the first
+    ``fail_first`` requests and a random ``error_rate`` share of the rest
+    are answered with 429 (carrying ``retry_after`` when given).
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, fail_first=0, retry_after=None,
+                 responder=default_responder, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.responder = responder
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'rate_limited': self.rate_limited,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'max_in_flight': self.max_in_flight,
+                'connections': self.connections,
+            }
+
+    def _handle(self, body):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            throttle = self.requests <= self.fail_first or self._random.random() < self.error_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if throttle:
+                with self._lock:
+                    self.rate_limited += 1
+                return 429, {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}}
+
+            request = json.loads(body)
+            content = self.responder(request['messages'])
+            prompt_tokens = sum(len(m.get('content') or '') for m in request['messages']) // 4
+            completion_tokens = len(content) // 4
+            with self._lock:
+                self.prompt_tokens += prompt_tokens
+                self.completion_tokens += completion_tokens
+            return 200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'gpt-4o-mini'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens,
+                },
+            }
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, payload = server._handle(body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if status == 429 and server.retry_after is not None:
+                    self.send_header('Retry-After', str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
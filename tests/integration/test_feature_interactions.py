@@ -1,5 +1,146 @@
+import hashlib
+import os
+import subprocess
+import sys
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from app.features import FEATURES
+
+
 def test_features_integration(client):
-    """Test interactions between features."""
-    # Example test that checks if both features are working together
+    """Test that the home page links to every feature and their pages render."""
     response = client.get('/')
     assert response.status_code == 200
+
+    for url in ('/pdf-processor/', '/excel-processor/', '/defects/'):
+        assert f'href="{url}"'.encode() in response.data
+        assert client.get(url).status_code == 200
+
+
+def test_feature_manifest_and_lazy_services():
+    """Test that the manifest lists every feature and that pages are served without the heavy libraries or job workers."""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    features_path = os.path.join(root, 'app', 'features')
+    on_disk = {name for name in os.listdir(features_path) if os.path.exists(os.path.join(features_path, name, 'views.py'))}
+    assert {feature.name for feature in FEATURES} == on_disk
+
+    # A fresh interpreter, as this one has long imported them
+    code = ("import sys, threading\n"
+            "from app import app\n"
+            "client = app.test_client()\n"
+            "assert all(client.get(url).status_code == 200 for url in ('/', '/pdf-processor/', '/defects/search?q=okno'))\n"
+            "print(sorted(name for name in ('pandas', 'openpyxl', 'PyPDF2', 'openai') if name in sys.modules))\n"
+            "print([thread.name for thread in threading.enumerate() if thread.name.startswith('pdf-job')])")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=root, env={**os.environ, 'PDF_JOB_WORKERS': '1'})
+    assert output.stdout.strip().splitlines()[-2:] == ['[]', '[]']
+
+
+def test_pdf_job_lifecycle(client):
+    """Test queueing, polling and cancelling a PDF processing job."""
+    response = client.post('/pdf-processor/jobs', data={'file': (BytesIO(b'%PDF-1.4'), 'protokol.pdf')})
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    response = client.get(f'/pdf-processor/jobs/{job_id}')
+    assert response.get_json()['status'] == 'queued'
+
+    response = client.get(f'/pdf-processor/jobs/{job_id}/result')
+    assert response.status_code == 409
+
+    response = client.delete(f'/pdf-processor/jobs/{job_id}')
+    assert response.get_json()['status'] == 'cancelled'
+
+    assert client.get('/pdf-processor/jobs/missing').status_code == 404
+
+
+def test_excel_upload_is_processed_without_saving_the_file(app, client, monkeypatch):
+    """Test that uploads are read from the request stream and oversized uploads are rejected."""
+    import pandas as pd
+    from werkzeug.datastructures import FileStorage
+
+    workbook = BytesIO()
+    pd.DataFrame({'room': ['P.1', 'P.2'], 'area': [12.5, 20.0]}).to_excel(workbook, index=False)
+    monkeypatch.setattr(FileStorage, 'save', lambda *args, **kwargs: pytest.fail('upload saved to disk'))
+
+    response = client.post('/excel-processor/upload', data={'file': (BytesIO(workbook.getvalue()), 'rooms.xlsx')})
+    assert response.status_code == 200
+    assert response.get_json()['analysis']['summary']['sheet_summaries']['Sheet1']['rows'] == 2
+    assert 'UPLOAD_FOLDER' not in app.config
+
+    app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024
+    response = client.post('/excel-processor/upload', data={'file': (BytesIO(b'0' * 2 * 1024 * 1024), 'big.xlsx')})
+    assert response.status_code == 413
+    assert 'too large' in response.get_json()['error']
+
+
+def test_excel_processor_accepts_compressed_csv(client):
+    """Test that CSV, TSV and gzip-compressed uploads reach the delimited reader."""
+    import gzip
+
+    data = gzip.compress(b"room,area\nP.1,12.5\nP.2,20\n")
+    response = client.post('/excel-processor/upload', data={'file': (BytesIO(data), 'rooms.csv.gz')})
+    assert response.status_code == 200
+    assert response.get_json()['analysis']['summary']['rows'] == 2
+
+    response = client.post('/excel-processor/upload', data={'file': (BytesIO(data), 'rooms.gz')})
+    assert response.status_code == 400
+
+
+def test_excel_results_can_be_looked_up_by_hash(client):
+    data = b'room,area\nP.1,12.5\nP.2,20.0\n'
+    content_hash = hashlib.sha256(data).hexdigest()
+    url = f'/excel-processor/results/{content_hash}?filename=rooms.csv'
+    assert client.head(url).status_code == 404
+
+    upload = client.post('/excel-processor/upload', data={'file': (BytesIO(data), 'rooms.csv')})
+    assert upload.status_code == 200
+    assert upload.get_json()['content_hash'] == content_hash
+
+    cached = client.get(url)
+    assert cached.status_code == 200
+    assert cached.get_json()['analysis'] == upload.get_json()['analysis']
+    assert cached.headers['ETag'] == upload.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': upload.headers['ETag']}).status_code == 304
+
+
+def test_excel_batch_accepts_files_and_zip_archives(client):
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w') as f:
+        f.writestr('parter.csv', 'room,area\nP.1,12.5\n')
+        f.writestr('pietro.tsv', 'room\tarea\n1.1\t10\n1.2\t11\n')
+    archive.seek(0)
+
+    response = client.post('/excel-processor/batch', data={'files': [
+        (BytesIO(b'room,area\nP.2,20.0\n'), 'rooms.csv'),
+        (archive, 'budynek.zip'),
+        (BytesIO(b'x'), 'notatki.txt'),
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [f['filename'] for f in body['files']] == ['rooms.csv', 'parter.csv', 'pietro.tsv', 'notatki.txt']
+    assert body['files'][2]['analysis']['summary']['rows'] == 2
+    assert (body['succeeded'], body['failed']) == (3, 1)
+    assert set(body['timings']) == {'wall', 'sum_of_files', 'slowest_file'}
+
+
+def test_metrics_and_upload_timings(client):
+    data = b'room,area\nP.7,17.5\n'
+    response = client.post('/excel-processor/upload?timings=1', data={'file': (BytesIO(data), 'timed.csv')})
+    assert response.status_code == 200
+    assert {'hash_upload', 'process_excel', 'read_csv'} <= set(response.get_json()['timings']['spans'])
+    untimed = client.post('/excel-processor/upload', data={'file': (BytesIO(data), 'timed.csv')})
+    assert 'timings' not in untimed.get_json()
+
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert metrics.mimetype == 'text/plain'
+    text = metrics.get_data(as_text=True)
+    assert '# TYPE span_duration_seconds histogram' in text
+    assert 'span_duration_seconds_count{span="read_csv"}' in text
+    assert 'cache_lookups_total{cache="excel_results",result="hit"}' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="excel_processor.upload_excel",method="POST",status="200"' in text
@@ -0,0 +1,94 @@
+"""Synthetic inspection reports for tests and benchmarks, written without any PDF library."""
+from typing import List
+
+REPORT_BEGINNING = [
+    "Zamosc, dnia 08 kwietnia 2022 r.",
+    "PROTOKOL",
+    "z przegladu stanu technicznego branzy budowlanej w okresie gwarancyjnym",
+    "budynku Sadu Okregowego i Rejonowego w Zamosciu przeprowadzonego w dniach 21",
+    "25.03.2022 r. sporzadzony w dniu 08.04.2022 r.",
+]
+
+
+def defect_lines(count: int, start: int = 0) -> List[str]:
+    return [f"P.{n} - pekniecie plytki terakoty przy oknie nr {n}" for n in range(start, start + count)]
+
+
+def report_pages(page_count: int, lines_per_page: int = 40) -> List[List[str]]:
+    """Pages of a report: the usual beginning followed by numbered defect lines."""
+    pages = []
+    for page in range(page_count):
+        lines = defect_lines(lines_per_page, page * lines_per_page)
+        pages.append(REPORT_BEGINNING + lines if page == 0 else lines)
+    return pages
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Build a PDF with one Helvetica text line per string (Latin-1 text only)."""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # Pages, filled in once the page object numbers are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    page_refs = []
+    for lines in pages:
+        stream = b'BT /F1 10 Tf 12 TL 40 800 Td ' + b' '.join(
+            b'(' + _escape(line).encode('latin-1') + b') Tj T*' for line in lines
+        ) + b' ET'
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >>'
+            b' /Contents %d 0 R >>' % len(objects)
+        )
+        page_refs.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(page_refs) + b'] /Count %d >>' % len(pages)
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+def make_workbook(sheets: int, rows: int, columns: int = 8, seed: int = 0) -> bytes:
+    """Build an xlsx workbook of numeric and text columns, streamed with openpyxl's write-only mode.
+
+    Write-only mode leaves out the ``<dimension>`` element that Excel writes,
+    without which openpyxl scans every sheet when opening the workbook, so it
+    is added back to keep the files representative of real uploads.
+    """
+    import io
+    import random
+    import zipfile
+
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    for sheet in range(sheets):
+        worksheet = workbook.create_sheet(f'Arkusz{sheet + 1}')
+        worksheet.append(['pomieszczenie'] + [f'kolumna_{column}' for column in range(1, columns)])
+        for row in range(rows):
+            worksheet.append([f'P.{row % 500}'] + [round(rng.uniform(0, 1000), 2) for _ in range(1, columns)])
+    written = io.BytesIO()
+    workbook.save(written)
+
+    dimension = f'<dimension ref="A1:{get_column_letter(columns)}{rows + 1}" />'.encode()
+    output = io.BytesIO()
+    with zipfile.ZipFile(written) as source, zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            content = source.read(item.filename)
+            if item.filename.startswith('xl/worksheets/sheet'):
+                content = content.replace(b'</sheetPr>', b'</sheetPr>' + dimension, 1)
+            target.writestr(item, content)
+    return output.getvalue()